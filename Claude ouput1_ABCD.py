@@ -12,7 +12,6 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import asyncio
-from dataclasses import dataclass
 
 # Strands imports
 from strands import Agent, tool
@@ -25,6 +24,21 @@ from bs4 import BeautifulSoup
 import mammoth
 import pandas as pd
 
+# Persistent treatment knowledge base
+from knowledge_store import TreatmentKnowledgeStore
+
+# Vectorized revenue projections
+from revenue_engine import analyze_revenue
+
+# Demographic segment sizing
+from segmentation_engine import SegmentationEngine
+
+# Slotted treatment records with lazy text and a spill-to-disk results window
+from data_model import TreatmentData, ProcessingResults
+
+# Pre-styled report templates cloned per export
+from report_rendering import load_report_template
+
 # Configure logging
 logging.getLogger("strands").setLevel(logging.DEBUG)
 logging.basicConfig(
@@ -32,23 +46,6 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()]
 )
 
-@dataclass
-class TreatmentData:
-    """Data structure for treatment information"""
-    treatment_id: str
-    source: str
-    raw_content: str
-    structured_content: str = ""
-    risk_assessment: str = ""
-    revenue_analysis: str = ""
-
-@dataclass
-class ProcessingResults:
-    """Container for all processing results"""
-    treatments: List[TreatmentData]
-    final_report: str = ""
-    approval_status: str = "pending"
-
 class HealthcareAgentSystem:
     """Main system orchestrator for the healthcare agent hackathon"""
     
@@ -74,13 +71,19 @@ class HealthcareAgentSystem:
         self.revenue_identification_agent = None
         self.emailing_agent = None
         
-        # Initialize data storage
-        self.processing_results = ProcessingResults(treatments=[])
-        
         # Setup output directory
         self.output_dir = Path("./hackathon_output")
         self.output_dir.mkdir(exist_ok=True)
         
+        # Processing results spill to a file of their own under output_dir
+        self.processing_results = ProcessingResults(treatments=[], data_dir=str(self.output_dir / "data_model"))
+        
+        # Open (and seed on first use) the treatment knowledge store
+        self.knowledge_store = TreatmentKnowledgeStore(db_path=str(self.output_dir / "treatment_knowledge.db"))
+        
+        # Segment sizing over a local demographic table, cached per treatment category
+        self.segmentation_engine = SegmentationEngine(cache_path=str(self.output_dir / "segmentation_cache_abcd.json"))
+        
         self._initialize_agents()
     
     def _initialize_agents(self):
@@ -593,66 +596,16 @@ class HealthcareAgentSystem:
                 Medical knowledge consultation results
             """
             try:
-                # Simulated medical knowledge base
-                medical_knowledge = {
-                    "treatment_1": {
-                        "category": "Cardiovascular",
-                        "complexity": "High",
-                        "typical_duration": "6-12 months",
-                        "success_rate": "85%",
-                        "common_complications": ["bleeding", "infection"]
-                    },
-                    "treatment_2": {
-                        "category": "Orthopedic",
-                        "complexity": "Medium",
-                        "typical_duration": "3-6 months",
-                        "success_rate": "90%",
-                        "common_complications": ["swelling", "limited mobility"]
-                    },
-                    "treatment_3": {
-                        "category": "Neurological",
-                        "complexity": "High",
-                        "typical_duration": "12-24 months",
-                        "success_rate": "70%",
-                        "common_complications": ["cognitive effects", "fatigue"]
-                    },
-                    "treatment_4": {
-                        "category": "Oncological",
-                        "complexity": "Very High",
-                        "typical_duration": "6-18 months",
-                        "success_rate": "75%",
-                        "common_complications": ["nausea", "hair loss", "immunosuppression"]
-                    },
-                    "treatment_7": {
-                        "category": "Endocrine",
-                        "complexity": "Medium",
-                        "typical_duration": "Lifelong",
-                        "success_rate": "95%",
-                        "common_complications": ["weight changes", "mood changes"]
-                    },
-                    "treatment_8": {
-                        "category": "Respiratory",
-                        "complexity": "Medium",
-                        "typical_duration": "1-3 months",
-                        "success_rate": "88%",
-                        "common_complications": ["cough", "throat irritation"]
-                    }
-                }
-                
-                knowledge = medical_knowledge.get(treatment_id, {
-                    "category": "General",
-                    "complexity": "Unknown",
-                    "typical_duration": "Variable",
-                    "success_rate": "Unknown",
-                    "common_complications": []
-                })
+                # Resolve by exact id, then fuzzy name, then full-text query
+                result = self.knowledge_store.lookup(treatment_id, query)
                 
                 return {
                     "treatment_id": treatment_id,
                     "query": query,
-                    "knowledge_base_info": knowledge,
+                    "knowledge_base_info": result["knowledge"],
+                    "match_type": result["match_type"],
                     "consultation_timestamp": datetime.now().isoformat(),
-                    "confidence_level": "simulated_data"
+                    "confidence_level": "knowledge_store" if result["match_type"] != "none" else "unknown"
                 }
                 
             except Exception as e:
@@ -676,94 +629,9 @@ class HealthcareAgentSystem:
                 Revenue opportunity analysis
             """
             try:
-                revenue_analysis = {
-                    "treatment_id": treatment_data.get("treatment_id", "Unknown"),
-                    "market_potential": {},
-                    "pricing_strategy": {},
-                    "customer_segments": {},
-                    "revenue_projections": {},
-                    "business_case": {},
-                    "analysis_timestamp": datetime.now().isoformat()
-                }
-                
-                # Analyze market potential based on treatment complexity and success rate
+                # Same rules as before, evaluated by the vectorized projection engine
                 risk_score = risk_data.get("overall_risk_score", 5)
-                
-                if risk_score <= 3:
-                    market_potential = "High"
-                    base_price_multiplier = 1.2
-                elif risk_score <= 6:
-                    market_potential = "Medium"
-                    base_price_multiplier = 1.0
-                else:
-                    market_potential = "Low"
-                    base_price_multiplier = 0.8
-                
-                revenue_analysis["market_potential"] = {
-                    "level": market_potential,
-                    "risk_adjusted_score": 10 - risk_score,
-                    "market_readiness": "ready" if risk_score <= 5 else "requires_evaluation"
-                }
-                
-                # Pricing strategy
-                base_coverage_amount = 10000  # Base amount in USD
-                suggested_coverage = base_coverage_amount * base_price_multiplier
-                
-                revenue_analysis["pricing_strategy"] = {
-                    "base_coverage_amount": base_coverage_amount,
-                    "risk_multiplier": base_price_multiplier,
-                    "suggested_coverage_limit": suggested_coverage,
-                    "premium_adjustment": f"{int((base_price_multiplier - 1) * 100)}%"
-                }
-                
-                # Customer segmentation
-                customer_segments = {
-                    "new_customers": {
-                        "target_demographic": "Age 25-65, health-conscious",
-                        "estimated_size": 50000 if market_potential == "High" else 25000,
-                        "conversion_rate": "15%" if risk_score <= 4 else "8%"
-                    },
-                    "existing_customers": {
-                        "upgrade_potential": "High" if risk_score <= 4 else "Medium",
-                        "estimated_candidates": 20000 if market_potential == "High" else 10000,
-                        "upsell_rate": "25%" if risk_score <= 4 else "15%"
-                    }
-                }
-                
-                revenue_analysis["customer_segments"] = customer_segments
-                
-                # Revenue projections
-                new_customer_revenue = (customer_segments["new_customers"]["estimated_size"] * 
-                                      (0.15 if risk_score <= 4 else 0.08) * suggested_coverage * 0.1)
-                existing_customer_revenue = (customer_segments["existing_customers"]["estimated_candidates"] * 
-                                           (0.25 if risk_score <= 4 else 0.15) * suggested_coverage * 0.05)
-                
-                total_projected_revenue = new_customer_revenue + existing_customer_revenue
-                
-                revenue_analysis["revenue_projections"] = {
-                    "new_customer_revenue": new_customer_revenue,
-                    "existing_customer_revenue": existing_customer_revenue,
-                    "total_annual_projection": total_projected_revenue,
-                    "roi_estimate": f"{int(total_projected_revenue / suggested_coverage * 100)}%"
-                }
-                
-                # Business case
-                business_case_strength = "Strong" if total_projected_revenue > 1000000 else "Moderate" if total_projected_revenue > 500000 else "Weak"
-                
-                revenue_analysis["business_case"] = {
-                    "strength": business_case_strength,
-                    "key_benefits": [
-                        f"Market potential: {market_potential}",
-                        f"Projected revenue: ${total_projected_revenue:,.2f}",
-                        f"Risk level: {'Acceptable' if risk_score <= 5 else 'Requires mitigation'}"
-                    ],
-                    "recommendations": [
-                        "Proceed with coverage" if business_case_strength == "Strong" else "Conduct further analysis",
-                        "Target new customer acquisition" if new_customer_revenue > existing_customer_revenue else "Focus on existing customer upsell"
-                    ]
-                }
-                
-                return revenue_analysis
+                return analyze_revenue(treatment_data.get("treatment_id", "Unknown"), risk_score)
                 
             except Exception as e:
                 return {"error": f"Error analyzing revenue opportunities: {str(e)}"}
@@ -823,7 +691,19 @@ class HealthcareAgentSystem:
                     }
                 }
                 
+                # Replace the fixed size estimates with sized segments for the treatment category
+                sizing = self.segmentation_engine.segment_category(treatment_analysis.get("category", ""))
+                for name, segment in segments.items():
+                    sized = sizing["segments"].get(name)
+                    if sized:
+                        segment["size_estimate"] = f"{sized['share_of_population']:.0%}"
+                        segment["estimated_population"] = sized["population"]
+                        segment["existing_customers"] = sized["existing_customers"]
+                        segment["expected_uptake"] = sized["expected_uptake"]
+                
                 segmentation["segments"] = segments
+                segmentation["segment_overlap"] = sizing["overlap"]
+                segmentation["category_profile"] = sizing["category"]
                 
                 # Targeting strategy
                 segmentation["targeting_strategy"] = {
@@ -940,11 +820,8 @@ class HealthcareAgentSystem:
                 Export status
             """
             try:
-                # Create a new Word document
-                doc = docx.Document()
-                
-                # Add title
-                doc.add_heading('Healthcare Treatment Analysis Report', 0)
+                # Clone the cached template (styles and title heading are built once per process)
+                doc = self._report_template().new_document()
                 
                 # Add timestamp
                 doc.add_paragraph(f"Generated: {aggregated_doc['timestamp']}")
@@ -994,6 +871,16 @@ class HealthcareAgentSystem:
         
         return export_to_word
 
+    def _report_template(self):
+        return load_report_template(
+            "treatment_analysis",
+            self._build_report_template,
+            cache_dir=str(self.output_dir / "templates")
+        )
+
+    def _build_report_template(self, doc):
+        doc.add_heading('Healthcare Treatment Analysis Report', 0)
+
     # ==================== MAIN EXECUTION ====================
     
     async def process_treatment(self, treatment_id: str, input_files: List[str]) -> Dict[str, Any]:
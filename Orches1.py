@@ -1,9 +1,11 @@
 import streamlit as st
 import time
-import json
 from datetime import datetime
 from typing import List, Dict, Any
 
+# Format-independent report model (HTML, Markdown, JSON, DOCX)
+from report_model import Report, FORMATS, render_report
+
 # Page configuration
 st.set_page_config(
     page_title="AI Assistant",
@@ -145,6 +147,10 @@ FLOWS = {
     }
 }
 
+# Report download formats (DOCX is built only when selected)
+DOWNLOAD_FORMATS = ["html", "md", "json", "docx"]
+DOWNLOAD_FORMAT_LABELS = {"html": "HTML", "md": "Markdown", "json": "JSON", "docx": "Word (.docx)"}
+
 # Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
@@ -315,17 +321,28 @@ def main():
             
             # Add download button for assistant messages
             if "flow" in message:
-                report_data = {
-                    "query": message["content"],
-                    "timestamp": message["timestamp"].isoformat(),
-                    "analysis": message["content"]
-                }
-                report_json = json.dumps(report_data, indent=2)
+                report = Report.from_markdown(
+                    "AI Orchestration Report",
+                    message["content"],
+                    metadata={
+                        "query": FLOWS.get(message["flow"], {}).get("query", ""),
+                        "flow": message["flow"],
+                        "timestamp": message["timestamp"].isoformat()
+                    }
+                )
+                report.generated_at = message["timestamp"].isoformat()
+                report_format = st.selectbox(
+                    "Report format",
+                    DOWNLOAD_FORMATS,
+                    format_func=lambda fmt: DOWNLOAD_FORMAT_LABELS[fmt],
+                    key=f"format_{message['timestamp']}",
+                    label_visibility="collapsed"
+                )
                 st.download_button(
                     label="📥 Download Report",
-                    data=report_json,
-                    file_name=f"report_{message['timestamp'].strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
+                    data=render_report(report, report_format),
+                    file_name=f"report_{message['timestamp'].strftime('%Y%m%d_%H%M%S')}{FORMATS[report_format]['extension']}",
+                    mime=FORMATS[report_format]["mime"],
                     key=f"download_{message['timestamp']}"
                 )
     
@@ -12,7 +12,6 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import asyncio
-from dataclasses import dataclass
 import sys
 
 # Strands imports
@@ -26,6 +25,12 @@ from bs4 import BeautifulSoup
 import mammoth
 import pandas as pd
 
+# Persistent treatment knowledge base
+from knowledge_store import TreatmentKnowledgeStore
+
+# Slotted treatment records with lazy text and a spill-to-disk results window
+from data_model import TreatmentData, ProcessingResults
+
 # Configure logging
 logging.getLogger("strands").setLevel(logging.DEBUG)
 logging.basicConfig(
@@ -33,23 +38,6 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()]
 )
 
-@dataclass
-class TreatmentData:
-    """Data structure for treatment information"""
-    treatment_id: str
-    source: str
-    raw_content: str
-    structured_content: str = ""
-    risk_assessment: str = ""
-    revenue_analysis: str = ""
-
-@dataclass
-class ProcessingResults:
-    """Container for all processing results"""
-    treatments: List[TreatmentData]
-    final_report: str = ""
-    approval_status: str = "pending"
-
 class HealthcareAgentSystem:
     """Main system orchestrator for the healthcare agent hackathon"""
     
@@ -77,13 +65,16 @@ class HealthcareAgentSystem:
         self.revenue_identification_agent = None
         self.emailing_agent = None
         
-        # Initialize data storage
-        self.processing_results = ProcessingResults(treatments=[])
-        
         # Setup output directory
         self.output_dir = Path("./hackathon_output")
         self.output_dir.mkdir(exist_ok=True)
         
+        # Processing results spill to a file of their own under output_dir
+        self.processing_results = ProcessingResults(treatments=[], data_dir=str(self.output_dir / "data_model"))
+        
+        # Open (and seed on first use) the treatment knowledge store
+        self.knowledge_store = TreatmentKnowledgeStore(db_path=str(self.output_dir / "treatment_knowledge.db"))
+        
         self._initialize_agents()
     
     def _initialize_agents(self):
@@ -445,12 +436,23 @@ class HealthcareAgentSystem:
 
     def _create_medical_knowledge_tool(self):
         @tool
-        def consult_medical_knowledge_stub(*args, **kwargs):
+        def consult_medical_knowledge(treatment_id: str, query: str = "") -> Dict[str, Any]:
             """
-            Stub for medical knowledge tool (not used in LLM pipeline, but required for agent initialization).
+            Look up treatment attributes (category, complexity, duration, success rate, complications)
+            in the persistent treatment knowledge store by id, fuzzy name or full-text query.
             """
-            return {"info": "Medical knowledge tool is not used in this pipeline."}
-        return consult_medical_knowledge_stub
+            try:
+                result = self.knowledge_store.lookup(treatment_id, query)
+                return {
+                    "treatment_id": treatment_id,
+                    "query": query,
+                    "knowledge_base_info": result["knowledge"],
+                    "match_type": result["match_type"],
+                    "consultation_timestamp": datetime.now().isoformat()
+                }
+            except Exception as e:
+                return {"error": f"Error consulting medical knowledge: {str(e)}"}
+        return consult_medical_knowledge
 
     def _create_customer_segmentation_tool(self):
         @tool
@@ -483,6 +485,7 @@ class HealthcareAgentSystem:
             research_tool = self._create_research_agent_tool()
             treatments = research_tool(file_contents)
             print_debug(f"Treatments extracted: {len(treatments)}")
+            self.knowledge_store.record_extracted_treatments(treatments, run_label=treatment_id)
             print_debug("Generating treatment descriptions with LLM...")
             doc_tool = self._create_document_structuring_tool()
             structured_treatments = doc_tool(treatments)
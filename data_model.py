@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Treatment Data Model - compact slotted records for long batch runs
+One explicit schema covering both TreatmentData variants, large text fields
+spilled to a content-addressed store and loaded lazily, and a bounded results
+window that spills older treatments to disk so memory stays flat
+"""
+
+import gzip
+import json
+import uuid
+import weakref
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Iterable
+
+from results_store import TextStore
+
+# Text fields longer than this are kept on disk and loaded on access
+LAZY_TEXT_THRESHOLD = 16 * 1024
+DEFAULT_WINDOW_SIZE = 100
+DEFAULT_DATA_DIR = "./hackathon_output/data_model"
+
+_text_stores: Dict[str, TextStore] = {}
+
+
+def _text_store(root: str) -> TextStore:
+    store = _text_stores.get(root)
+    if store is None:
+        store = _text_stores[root] = TextStore(root)
+    return store
+
+
+class LazyText:
+    """Reference to a text blob in the text store; loaded on every access, never cached"""
+
+    __slots__ = ("ref", "root", "length")
+
+    def __init__(self, ref: str, root: str, length: int):
+        self.ref = ref
+        self.root = root
+        self.length = length
+
+    def load(self) -> str:
+        return _text_store(self.root).get(self.ref)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f"LazyText({self.ref[:12]}, {self.length} chars)"
+
+
+class _TextField:
+    """Descriptor storing short text inline and long text as a LazyText reference"""
+
+    __slots__ = ("slot",)
+
+    def __set_name__(self, owner, name):
+        self.slot = f"_{name}"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        return value.load() if isinstance(value, LazyText) else value
+
+    def __set__(self, instance, value):
+        if value is None:
+            value = ""
+        if not isinstance(value, str):
+            # Structured payloads (the ABCD variants store dicts here) are kept as JSON text
+            value = json.dumps(value, default=str)
+        if len(value) > LAZY_TEXT_THRESHOLD:
+            root = instance.text_root
+            value = LazyText(_text_store(root).put(value), root, len(value))
+        setattr(instance, self.slot, value)
+
+
+class TreatmentData:
+    """Slotted treatment record accepting both the enhanced and the ABCD/asds schemas"""
+
+    TEXT_FIELDS = ("raw_content", "structured_content", "detailed_description")
+    VALUE_FIELDS = ("treatment_id", "treatment_name", "source", "source_files",
+                    "risk_assessment", "revenue_analysis", "customer_impact")
+
+    __slots__ = ("treatment_id", "treatment_name", "source", "source_files",
+                 "risk_assessment", "revenue_analysis", "customer_impact", "text_root",
+                 "_raw_content", "_structured_content", "_detailed_description")
+
+    raw_content = _TextField()
+    structured_content = _TextField()
+    detailed_description = _TextField()
+
+    def __init__(self, treatment_id: str, treatment_name: str = "", source: str = "",
+                 source_files: Optional[List[str]] = None, raw_content: str = "",
+                 structured_content: Any = "", detailed_description: str = "",
+                 risk_assessment: Any = None, revenue_analysis: Any = None,
+                 customer_impact: Any = None, text_root: str = DEFAULT_DATA_DIR + "/texts"):
+        self.treatment_id = treatment_id
+        self.treatment_name = treatment_name
+        self.source = source
+        self.source_files = list(source_files or [])
+        self.risk_assessment = risk_assessment
+        self.revenue_analysis = revenue_analysis
+        self.customer_impact = customer_impact
+        self.text_root = text_root
+        self.raw_content = raw_content
+        self.structured_content = structured_content
+        self.detailed_description = detailed_description
+
+    def __repr__(self) -> str:
+        return f"TreatmentData(treatment_id={self.treatment_id!r}, treatment_name={self.treatment_name!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TreatmentData):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def to_dict(self, resolve_text: bool = True) -> Dict[str, Any]:
+        """
+        Serialize the record.
+
+        Args:
+            resolve_text: Load lazy text fields; when False they are written as {"$text_ref": ...}
+        """
+        data = {name: getattr(self, name) for name in self.VALUE_FIELDS}
+        for name in self.TEXT_FIELDS:
+            stored = getattr(self, f"_{name}")
+            if isinstance(stored, LazyText) and not resolve_text:
+                data[name] = {"$text_ref": stored.ref, "length": stored.length}
+            else:
+                data[name] = getattr(self, name)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], text_root: str = DEFAULT_DATA_DIR + "/texts") -> "TreatmentData":
+        """Rebuild a record, keeping spilled text references lazy"""
+        values = {name: data.get(name) for name in cls.VALUE_FIELDS if name in data}
+        record = cls(text_root=text_root, **values)
+        for name in cls.TEXT_FIELDS:
+            value = data.get(name, "")
+            if isinstance(value, dict) and "$text_ref" in value:
+                setattr(record, f"_{name}", LazyText(value["$text_ref"], text_root, value.get("length", 0)))
+            else:
+                setattr(record, name, value)
+        return record
+
+
+class ResultsWindow:
+    """Bounded in-memory window of results; older entries spill to a gzip JSONL file"""
+
+    __slots__ = ("max_in_memory", "spill_path", "text_root", "_recent", "_spilled")
+
+    def __init__(self, max_in_memory: int = DEFAULT_WINDOW_SIZE, spill_path: Optional[str] = None,
+                 text_root: str = DEFAULT_DATA_DIR + "/texts"):
+        self.max_in_memory = max(1, max_in_memory)
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.text_root = text_root
+        self._recent: deque = deque()
+        self._spilled = 0
+        if self.spill_path and self.spill_path.exists():
+            # Resume an existing spill file rather than shadowing (or deleting) its entries
+            with gzip.open(self.spill_path, "rt", encoding="utf-8") as f:
+                self._spilled = sum(1 for _ in f)
+
+    def append(self, item: Any):
+        self._recent.append(item)
+        while len(self._recent) > self.max_in_memory:
+            self._spill(self._recent.popleft())
+
+    def extend(self, items: Iterable[Any]):
+        for item in items:
+            self.append(item)
+
+    def clear(self):
+        self._recent.clear()
+        self._spilled = 0
+        if self.spill_path and self.spill_path.exists():
+            self.spill_path.unlink()
+
+    def recent(self) -> List[Any]:
+        """Entries still held in memory (newest last)"""
+        return list(self._recent)
+
+    def _spill(self, item: Any):
+        if self.spill_path is None:
+            # No spill file configured: the window simply drops the oldest entry
+            return
+        if isinstance(item, TreatmentData):
+            record = {"type": "TreatmentData", "data": item.to_dict(resolve_text=False)}
+        else:
+            record = {"type": "dict", "data": item}
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.spill_path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+        self._spilled += 1
+
+    def iter_spilled(self) -> Iterator[Any]:
+        if not self.spill_path or not self.spill_path.exists():
+            return
+        with gzip.open(self.spill_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["type"] == "TreatmentData":
+                    yield TreatmentData.from_dict(record["data"], text_root=self.text_root)
+                else:
+                    yield record["data"]
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over every result, spilled ones first (streamed from disk)"""
+        yield from self.iter_spilled()
+        yield from list(self._recent)
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._recent)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        """Index over every result; spilled entries are streamed from disk up to the requested one"""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("results index out of range")
+        if index >= self._spilled:
+            return self._recent[index - self._spilled]
+        return next(islice(self.iter_spilled(), index, None))
+
+
+def _remove_spill_file(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class ProcessingResults:
+    """Container for all processing results, memory-bounded through a ResultsWindow"""
+
+    __slots__ = ("_treatments", "final_report", "approval_status", "__weakref__")
+
+    def __init__(self, treatments: Optional[Iterable[Any]] = None, final_report: str = "",
+                 approval_status: str = "pending", max_in_memory: int = DEFAULT_WINDOW_SIZE,
+                 spill_path: Optional[str] = None, data_dir: str = DEFAULT_DATA_DIR,
+                 text_root: Optional[str] = None):
+        # Without a spill_path each instance spills to its own scratch file, so concurrent
+        # systems never share (or clear) one; it is deleted when the instance is collected
+        # or the process exits. Pass spill_path to keep results on disk and resume them.
+        scratch = spill_path is None
+        if scratch:
+            spill_path = str(Path(data_dir) / f"processing_results_{uuid.uuid4().hex}.jsonl.gz")
+        self._treatments = ResultsWindow(max_in_memory, spill_path, text_root or str(Path(data_dir) / "texts"))
+        if scratch:
+            weakref.finalize(self, _remove_spill_file, self._treatments.spill_path)
+        self._treatments.extend(treatments or [])
+        self.final_report = final_report
+        self.approval_status = approval_status
+
+    @property
+    def treatments(self) -> ResultsWindow:
+        return self._treatments
+
+    @treatments.setter
+    def treatments(self, items: Iterable[Any]):
+        # Assigning a list replaces the window contents (as the per-run pipelines do)
+        self._treatments.clear()
+        self._treatments.extend(items)
+
+    def __repr__(self) -> str:
+        return (f"ProcessingResults(treatments={len(self._treatments)}, "
+                f"final_report={self.final_report!r}, approval_status={self.approval_status!r})")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Source Document Deduplication - exact and near-duplicate collapsing
+Removes exact copies by content hash and near-identical pages by shingled MinHash + LSH
+before documents are sent to the LLM, keeping provenance of every collapsed path
+"""
+
+import hashlib
+import re
+import struct
+from typing import List, Dict, Any, Tuple
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+CHARS_PER_TOKEN = 4
+
+
+def normalize_content(text: str) -> str:
+    """Collapse whitespace and case so trivially different copies hash the same"""
+    return " ".join(text.lower().split())
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate used for savings reports"""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Word n-gram shingles of the normalized text"""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signature generator using universal hashing over 32-bit shingle hashes"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        params = []
+        for i in range(num_perm):
+            digest = hashlib.blake2b(f"{seed}:{i}".encode("utf-8"), digest_size=16).digest()
+            a, b = struct.unpack("<QQ", digest)
+            params.append((a % (MERSENNE_PRIME - 1) + 1, b % MERSENNE_PRIME))
+        self.params = params
+
+    def signature(self, shingle_set: set) -> Tuple[int, ...]:
+        if not shingle_set:
+            return tuple([MAX_HASH] * self.num_perm)
+        hashed = [
+            struct.unpack("<I", hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest())[0]
+            for s in shingle_set
+        ]
+        return tuple(
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashed)
+            for a, b in self.params
+        )
+
+
+def estimated_jaccard(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    matches = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+    return matches / len(sig_a) if sig_a else 0.0
+
+
+def deduplicate_documents(file_contents: List[Dict[str, Any]], threshold: float = 0.85,
+                          num_perm: int = 64, bands: int = 16,
+                          shingle_size: int = 5) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Collapse exact and near-duplicate documents.
+
+    Args:
+        file_contents: File content dicts as returned by read_file
+        threshold: Minimum estimated Jaccard similarity for a near-duplicate
+        num_perm: MinHash signature length
+        bands: Number of LSH bands (num_perm must be divisible by bands)
+        shingle_size: Words per shingle
+
+    Returns:
+        (kept documents, dedup report). Kept documents carry "duplicate_paths"
+        and "duplicate_files" listing every collapsed copy.
+    """
+    docs = [doc for doc in file_contents if isinstance(doc, dict) and "error" not in doc]
+    report = {
+        "documents_in": len(docs),
+        "documents_out": 0,
+        "exact_duplicates": 0,
+        "near_duplicates": 0,
+        "tokens_saved": 0,
+        "collapsed": {}
+    }
+    if not docs:
+        return [], report
+
+    # Union-find over document positions
+    parent = list(range(len(docs)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    # Exact duplicates by normalized content hash
+    first_by_hash: Dict[str, int] = {}
+    exact_of = set()
+    for i, doc in enumerate(docs):
+        digest = hashlib.sha256(normalize_content(doc.get("content", "")).encode("utf-8")).hexdigest()
+        if digest in first_by_hash:
+            union(first_by_hash[digest], i)
+            exact_of.add(i)
+        else:
+            first_by_hash[digest] = i
+
+    # Near duplicates by MinHash with LSH banding (only over exact-unique docs)
+    hasher = MinHasher(num_perm=num_perm)
+    rows = num_perm // bands
+    unique_positions = sorted(first_by_hash.values())
+    signatures = {i: hasher.signature(shingles(docs[i].get("content", ""), shingle_size)) for i in unique_positions}
+
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for i in unique_positions:
+        sig = signatures[i]
+        for band in range(bands):
+            key = (band, sig[band * rows:(band + 1) * rows])
+            buckets.setdefault(key, []).append(i)
+
+    checked = set()
+    for members in buckets.values():
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                pair = (members[x], members[y])
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                if estimated_jaccard(signatures[pair[0]], signatures[pair[1]]) >= threshold:
+                    union(*pair)
+
+    # Keep the longest document of each cluster as its representative
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(docs)):
+        clusters.setdefault(find(i), []).append(i)
+
+    kept = []
+    for members in sorted(clusters.values(), key=lambda m: m[0]):
+        representative = max(members, key=lambda i: (len(docs[i].get("content", "")), -i))
+        doc = dict(docs[representative])
+        duplicates = [docs[i] for i in members if i != representative]
+        doc["duplicate_paths"] = [d.get("file_path", "") for d in duplicates]
+        doc["duplicate_files"] = [d.get("file_name", d.get("file_path", "")) for d in duplicates]
+        kept.append(doc)
+
+        if duplicates:
+            report["collapsed"][doc.get("file_path", "")] = doc["duplicate_paths"]
+            report["tokens_saved"] += sum(estimate_tokens(d.get("content", "")) for d in duplicates)
+
+    report["exact_duplicates"] = len(exact_of)
+    report["near_duplicates"] = len(docs) - len(kept) - len(exact_of)
+    report["documents_out"] = len(kept)
+    return kept, report
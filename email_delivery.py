@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Email Delivery - persistent outbox and SMTP delivery worker for finished reports
+Messages are queued in SQLite, batched per recipient, streamed to the server with
+attachments read from disk in chunks, and retried with exponential backoff over
+one reused SMTP session per drain
+"""
+
+import base64
+import json
+import mimetypes
+import os
+import random
+import re
+import smtplib
+import sqlite3
+import ssl
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from email.header import Header
+from email.utils import formataddr, formatdate, make_msgid, encode_rfc2231
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, NamedTuple, BinaryIO
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attachments_json TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    last_error TEXT,
+    message_id TEXT,
+    created_at TEXT,
+    sent_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+# Messages claimed by a worker that died mid-send become due again after this many seconds
+CLAIM_TIMEOUT = 900
+# Generated messages stay in memory up to this size, then spill to a temporary file
+SPOOL_MEMORY_BYTES = 1024 * 1024
+# Multiple of 57 so every encoded chunk ends on a full 76-character base64 line
+ATTACHMENT_CHUNK_BYTES = 57 * 1024
+SOCKET_WRITE_BYTES = 64 * 1024
+# ASCII addresses only: the session does not negotiate SMTPUTF8 (domains are IDNA-encoded first)
+ADDRESS_PATTERN = re.compile(
+    r"^[A-Za-z0-9.!#$%&'*+/=?^_`{|}~-]+@[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?(?:\.[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?)+$"
+)
+
+
+@dataclass
+class SmtpConfig:
+    """SMTP server, session and retry settings (a local sink needs only host and port)"""
+    host: str = "localhost"
+    port: int = 25
+    sender: str = "reports@localhost"
+    username: Optional[str] = None
+    password: Optional[str] = None
+    starttls: bool = False
+    use_ssl: bool = False
+    timeout: float = 30.0
+    # Reconnect after this many emails so long drains do not hit server session limits
+    max_messages_per_connection: int = 100
+    max_attempts: int = 5
+    backoff_base: float = 30.0
+    backoff_max: float = 3600.0
+    # Queued messages to the same recipient are combined into one email within these limits
+    batch_per_recipient: bool = True
+    max_batch_attachments: int = 10
+    max_batch_bytes: int = 20 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls, prefix: str = "SMTP_") -> "SmtpConfig":
+        """Read SMTP_HOST, SMTP_PORT, SMTP_SENDER, SMTP_USERNAME, SMTP_PASSWORD, SMTP_STARTTLS and SMTP_SSL"""
+        def flag(name: str) -> bool:
+            return os.environ.get(prefix + name, "").lower() in ("1", "true", "yes")
+
+        config = cls()
+        config.host = os.environ.get(prefix + "HOST", config.host)
+        config.port = int(os.environ.get(prefix + "PORT", config.port))
+        config.sender = os.environ.get(prefix + "SENDER", config.sender)
+        config.username = os.environ.get(prefix + "USERNAME") or None
+        config.password = os.environ.get(prefix + "PASSWORD") or None
+        config.starttls = flag("STARTTLS")
+        config.use_ssl = flag("SSL")
+        return config
+
+
+class OutboxMessage(NamedTuple):
+    id: int
+    recipient: str
+    subject: str
+    body: str
+    attachments: List[str]
+    attempts: int
+
+
+class Batch(NamedTuple):
+    """One email to one recipient, covering one or more queued messages"""
+    recipient: str
+    message_ids: List[int]
+    subject: str
+    body: str
+    attachments: List[str]
+    attempts: int
+
+
+def normalize_address(address: str) -> str:
+    """
+    Validate a recipient address for the outbox, IDNA-encoding a non-ASCII domain.
+
+    Raises:
+        ValueError: the address cannot be sent over this SMTP session
+    """
+    address = address.strip()
+    local, at, domain = address.rpartition("@")
+    if at and not domain.isascii():
+        try:
+            domain = domain.encode("idna").decode("ascii")
+        except UnicodeError:
+            raise ValueError(f"Invalid email address: {address!r}")
+    address = f"{local}@{domain}" if at else address
+    if not ADDRESS_PATTERN.match(address):
+        raise ValueError(f"Invalid email address: {address!r}")
+    return address
+
+
+class EmailOutbox:
+    """Persistent queue of outbound messages, one row per recipient"""
+
+    def __init__(self, db_path: str = "./hackathon_output/email_outbox.db"):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, recipients: Iterable[str], subject: str, body: str,
+                attachments: Iterable[str] = (), send_at: Optional[float] = None) -> List[int]:
+        """
+        Queue a message for each recipient.
+
+        Args:
+            recipients: Email addresses
+            subject: Subject line
+            body: Plain-text body
+            attachments: Files attached at send time (read from disk then, not now)
+            send_at: Earliest delivery time as a Unix timestamp (default now)
+
+        Returns:
+            Outbox ids, one per recipient
+
+        Raises:
+            ValueError: a recipient is not a valid ASCII address (nothing is queued)
+        """
+        recipients = [normalize_address(recipient) for recipient in recipients if recipient.strip()]
+        attachments_json = json.dumps([str(Path(path).resolve()) for path in attachments])
+        now = datetime.now().isoformat()
+        send_at = time.time() if send_at is None else send_at
+        ids = []
+        with self.conn:
+            for recipient in recipients:
+                cursor = self.conn.execute(
+                    "INSERT INTO outbox (recipient, subject, body, attachments_json, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (recipient, subject, body, attachments_json, send_at, now)
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def claim_due(self, limit: Optional[int] = None, now: Optional[float] = None) -> List[OutboxMessage]:
+        """Mark due messages (and stale claims) as sending and return them in queue order"""
+        now = time.time() if now is None else now
+        with self.conn:
+            rows = self.conn.execute(
+                "SELECT id, recipient, subject, body, attachments_json, attempts FROM outbox "
+                "WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND claimed_at <= ?) "
+                "ORDER BY id LIMIT ?",
+                (now, now - CLAIM_TIMEOUT, -1 if limit is None else limit)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ?",
+                [(now, row["id"]) for row in rows]
+            )
+        return [
+            OutboxMessage(row["id"], row["recipient"], row["subject"], row["body"],
+                          json.loads(row["attachments_json"]), row["attempts"])
+            for row in rows
+        ]
+
+    def mark_sent(self, ids: List[int], message_id: str):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET status = 'sent', attempts = attempts + 1, message_id = ?, sent_at = ?, "
+                "last_error = NULL WHERE id = ?",
+                [(message_id, datetime.now().isoformat(), outbox_id) for outbox_id in ids]
+            )
+
+    def mark_retry(self, ids: List[int], error: str, retry_at: float):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET status = 'pending', attempts = attempts + 1, next_attempt_at = ?, "
+                "last_error = ? WHERE id = ?",
+                [(retry_at, error, message_id) for message_id in ids]
+            )
+
+    def mark_failed(self, ids: List[int], error: str):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                [(error, message_id) for message_id in ids]
+            )
+
+    def requeue_failed(self) -> int:
+        """Give failed messages a fresh set of attempts; returns how many were requeued"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE status = 'failed'",
+                (time.time(),)
+            )
+        return cursor.rowcount
+
+    def status(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        ids = list(ids)
+        if not ids:
+            return {}
+        rows = self.conn.execute(
+            f"SELECT id, recipient, status, attempts, last_error, message_id, sent_at FROM outbox "
+            f"WHERE id IN ({', '.join('?' * len(ids))})", ids
+        ).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _combine(messages: List[OutboxMessage]) -> Batch:
+    first = messages[0]
+    if len(messages) == 1:
+        return Batch(first.recipient, [first.id], first.subject, first.body, list(first.attachments), first.attempts)
+
+    subjects = list(dict.fromkeys(message.subject for message in messages))
+    subject = subjects[0] if len(subjects) == 1 else f"{subjects[0]} (+{len(subjects) - 1} more)"
+    body = "\n\n---\n\n".join(f"{message.subject}\n\n{message.body}" for message in messages)
+    attachments = list(dict.fromkeys(path for message in messages for path in message.attachments))
+    return Batch(first.recipient, [message.id for message in messages], subject, body, attachments,
+                 max(message.attempts for message in messages))
+
+
+def batch_messages(messages: List[OutboxMessage], config: SmtpConfig) -> List[Batch]:
+    """
+    Group queued messages into emails, one recipient per email.
+
+    With batch_per_recipient, messages to the same recipient are combined (in queue
+    order) until max_batch_attachments or max_batch_bytes would be exceeded; a single
+    message over the limits still goes out on its own.
+    """
+    if not config.batch_per_recipient:
+        return [_combine([message]) for message in messages]
+
+    by_recipient: Dict[str, List[List[OutboxMessage]]] = {}
+    for message in messages:
+        groups = by_recipient.setdefault(message.recipient.lower(), [[]])
+        current = groups[-1]
+        attachments = [path for item in current for path in item.attachments] + message.attachments
+        size = sum(_file_size(path) for path in set(attachments))
+        if current and (len(set(attachments)) > config.max_batch_attachments or size > config.max_batch_bytes):
+            groups.append([message])
+        else:
+            current.append(message)
+    return [_combine(group) for groups in by_recipient.values() for group in groups]
+
+
+def _header(value: str) -> str:
+    return value if value.isascii() else Header(value, "utf-8").encode()
+
+
+def _filename_parameter(name: str) -> str:
+    if name.isascii():
+        return 'filename="{}"'.format(name.replace("\\", "\\\\").replace('"', '\\"'))
+    return f"filename*={encode_rfc2231(name, 'utf-8')}"
+
+
+def write_message(out: BinaryIO, sender: str, batch: Batch, message_id: str) -> int:
+    """
+    Write a batch as a multipart MIME message with CRLF line endings.
+
+    Attachments are base64-encoded from disk in ATTACHMENT_CHUNK_BYTES chunks, so
+    memory use does not grow with attachment size.
+
+    Returns:
+        Bytes written
+    """
+    boundary = f"=={make_msgid().strip('<>').replace('@', '.')}=="
+    written = 0
+
+    def emit(data: bytes):
+        nonlocal written
+        out.write(data)
+        written += len(data)
+
+    headers = [
+        f"From: {formataddr(('Healthcare Treatment Reports', sender))}",
+        f"To: {batch.recipient}",
+        f"Subject: {_header(batch.subject)}",
+        f"Date: {formatdate(localtime=True)}",
+        f"Message-ID: {message_id}",
+        "MIME-Version: 1.0",
+        f'Content-Type: multipart/mixed; boundary="{boundary}"',
+        "",
+        f"--{boundary}",
+        'Content-Type: text/plain; charset="utf-8"',
+        "Content-Transfer-Encoding: base64",
+        "",
+    ]
+    emit("\r\n".join(headers).encode("ascii") + b"\r\n")
+    emit(base64.encodebytes(batch.body.encode("utf-8")).replace(b"\n", b"\r\n"))
+
+    for path in batch.attachments:
+        name = Path(path).name
+        mime_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        part_headers = [
+            f"--{boundary}",
+            f"Content-Type: {mime_type}",
+            "Content-Transfer-Encoding: base64",
+            f"Content-Disposition: attachment; {_filename_parameter(name)}",
+            "",
+        ]
+        emit("\r\n".join(part_headers).encode("utf-8") + b"\r\n")
+        with open(path, "rb") as file:
+            while True:
+                chunk = file.read(ATTACHMENT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                emit(base64.encodebytes(chunk).replace(b"\n", b"\r\n"))
+
+    emit(f"--{boundary}--\r\n".encode("ascii"))
+    return written
+
+
+def send_stream(smtp: smtplib.SMTP, sender: str, recipient: str, message: BinaryIO, size: int):
+    """
+    Send one spooled message over an open SMTP session.
+
+    smtplib.sendmail() needs the whole message in memory; this runs the same
+    MAIL/RCPT/DATA exchange but writes the message to the socket in chunks,
+    dot-stuffing lines as it goes. Raises the smtplib exceptions sendmail() would.
+    """
+    options = [f"SIZE={size}"] if smtp.does_esmtp and smtp.has_extn("size") else []
+    code, response = smtp.mail(sender, options)
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPSenderRefused(code, response, sender)
+    code, response = smtp.rcpt(recipient)
+    if code not in (250, 251):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused({recipient: (code, response)})
+    code, response = smtp.docmd("data")
+    if code != 354:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, response)
+
+    message.seek(0)
+    buffer = bytearray()
+    for line in message:
+        if line.startswith(b"."):
+            buffer += b"."
+        buffer += line
+        if len(buffer) >= SOCKET_WRITE_BYTES:
+            smtp.send(bytes(buffer))
+            buffer.clear()
+    buffer += b".\r\n"
+    smtp.send(bytes(buffer))
+    code, response = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, response)
+
+
+def is_permanent(error: Exception) -> bool:
+    """5xx replies, unreadable attachments and unencodable messages are not retried; everything else is"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return isinstance(error, (FileNotFoundError, IsADirectoryError, PermissionError, ValueError))
+
+
+class DeliveryWorker:
+    """Drains an EmailOutbox over one SMTP session, with retry and backoff"""
+
+    def __init__(self, outbox: EmailOutbox, config: Optional[SmtpConfig] = None, seed: Optional[int] = None):
+        self.outbox = outbox
+        self.config = config or SmtpConfig()
+        self.smtp: Optional[smtplib.SMTP] = None
+        self.sent_on_connection = 0
+        self.unreachable: Optional[Exception] = None
+        self.random = random.Random(seed)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with jitter for a message that has failed `attempts` times"""
+        delay = min(self.config.backoff_base * (2 ** max(attempts - 1, 0)), self.config.backoff_max)
+        return delay * self.random.uniform(0.5, 1.0)
+
+    def connect(self) -> smtplib.SMTP:
+        config = self.config
+        if config.use_ssl:
+            smtp = smtplib.SMTP_SSL(config.host, config.port, timeout=config.timeout,
+                                    context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(config.host, config.port, timeout=config.timeout)
+        smtp.ehlo_or_helo_if_needed()
+        if config.starttls and not config.use_ssl:
+            smtp.starttls(context=ssl.create_default_context())
+            smtp.ehlo()
+        if config.username:
+            smtp.login(config.username, config.password or "")
+        return smtp
+
+    def disconnect(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self.smtp.close()
+        self.smtp = None
+        self.sent_on_connection = 0
+
+    def _session(self, stats: Dict[str, Any]) -> smtplib.SMTP:
+        if self.smtp is not None and self.sent_on_connection >= self.config.max_messages_per_connection:
+            self.disconnect()
+        if self.smtp is None:
+            self.smtp = self.connect()
+            stats["connections"] += 1
+        return self.smtp
+
+    def _fail(self, batch: Batch, error: Exception, stats: Dict[str, Any]):
+        message = f"{type(error).__name__}: {error}"
+        attempts = batch.attempts + 1
+        if is_permanent(error) or attempts >= self.config.max_attempts:
+            self.outbox.mark_failed(batch.message_ids, message)
+            stats["failed"] += len(batch.message_ids)
+        else:
+            self.outbox.mark_retry(batch.message_ids, message, time.time() + self.retry_delay(attempts))
+            stats["retried"] += len(batch.message_ids)
+        stats["errors"].append({"recipient": batch.recipient, "error": message})
+
+    def deliver(self, batch: Batch, stats: Dict[str, Any]):
+        domain = self.config.sender.rpartition("@")[2] or None
+        message_id = make_msgid(domain=domain)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as spool:
+            try:
+                size = write_message(spool, self.config.sender, batch, message_id)
+            except (OSError, ValueError) as e:
+                # Unreadable attachments and unencodable headers (UnicodeError is a ValueError)
+                self._fail(batch, e, stats)
+                return
+            try:
+                smtp = self._session(stats)
+            except (smtplib.SMTPException, OSError) as e:
+                self.unreachable = e
+                self._fail(batch, e, stats)
+                return
+            try:
+                limit = smtp.esmtp_features.get("size", "")
+                if limit.isdigit() and 0 < int(limit) < size:
+                    raise smtplib.SMTPDataError(552, f"message of {size} bytes exceeds server limit {limit}")
+                send_stream(smtp, self.config.sender, batch.recipient, spool, size)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError) as e:
+                # The session is unusable; the next batch reconnects
+                self.smtp = None
+                self.sent_on_connection = 0
+                self._fail(batch, e, stats)
+                return
+            except (smtplib.SMTPException, ValueError) as e:
+                if isinstance(e, ValueError):
+                    # Address the server cannot take (smtplib encodes commands as ASCII); reset the transaction
+                    try:
+                        smtp.rset()
+                    except (smtplib.SMTPException, OSError):
+                        self.disconnect()
+                self._fail(batch, e, stats)
+                return
+        self.sent_on_connection += 1
+        self.outbox.mark_sent(batch.message_ids, message_id)
+        stats["emails"] += 1
+        stats["sent"] += len(batch.message_ids)
+        stats["bytes"] += size
+
+    def drain(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Deliver every due message once.
+
+        Returns:
+            {"claimed", "emails", "sent", "retried", "failed", "connections", "bytes", "seconds", "errors"}
+        """
+        start = time.perf_counter()
+        messages = self.outbox.claim_due(limit)
+        stats = {"claimed": len(messages), "emails": 0, "sent": 0, "retried": 0, "failed": 0,
+                 "connections": 0, "bytes": 0, "errors": []}
+        self.unreachable = None
+        try:
+            for batch in batch_messages(messages, self.config):
+                if self.unreachable is not None:
+                    # Server down: back the rest off without paying a connect timeout for each
+                    self._fail(batch, self.unreachable, stats)
+                else:
+                    self.deliver(batch, stats)
+        finally:
+            self.disconnect()
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def run(self, poll_interval: float = 30.0, stop=None):
+        """Drain the outbox every poll_interval seconds until stop (a threading.Event) is set"""
+        while stop is None or not stop.is_set():
+            self.drain()
+            if stop is None:
+                time.sleep(poll_interval)
+            else:
+                stop.wait(poll_interval)
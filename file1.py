@@ -6,13 +6,13 @@ Complete implementation using AWS Strands SDK with detailed treatment analysis
 
 import os
 import json
+import hashlib
 import logging
 import boto3
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import asyncio
-from dataclasses import dataclass
 import sys
 import re
 
@@ -31,6 +31,50 @@ from bs4 import BeautifulSoup
 import mammoth
 import pandas as pd
 
+# Local retrieval over ingested chunks
+from retrieval_index import BM25Index
+# Persistent treatment knowledge base
+from knowledge_store import TreatmentKnowledgeStore
+# Directory and archive crawler
+from file_crawler import FileCrawler, CrawlBudget, CrawledFile
+# Exact and near-duplicate source collapsing
+from dedup import deduplicate_documents
+# Memory-mapped streaming of large text inputs
+from streaming_reader import iter_clean_text, StreamingChunker, file_digest
+# Seeded Monte Carlo revenue bands
+from revenue_engine import revenue_sensitivity, format_revenue_bands
+# Deterministic risk scoring
+from risk_engine import RiskScoringEngine, RISK_CATEGORIES
+# Portfolio ranking and pilot selection
+from portfolio import rank_portfolio, PortfolioConfig
+# Demographic segment sizing
+from segmentation_engine import SegmentationEngine, format_segmentation
+# Columnar per-run results sink
+from results_store import ResultsStore
+# Slotted treatment records with lazy text and a spill-to-disk results window
+from data_model import ProcessingResults
+# Stable treatment IDs across runs and per-stage result reuse
+from treatment_identity import TreatmentIdentityIndex
+# Build-system style stage fingerprints
+from stage_cache import StageCache, hash_value, code_fingerprint
+# Versioned, precompiled prompt templates
+from prompt_templates import TemplateRegistry
+# Treatment sections rendered on worker processes and streamed into the .docx in order
+import report_rendering
+from report_rendering import StreamingDocxWriter, stream_treatment_sections, load_report_template
+# Lightweight report formats (HTML, Markdown, JSON) from one report model
+from report_model import report_from_treatments, write_report, load_report, FORMATS as REPORT_FORMATS
+# Whole-table WordprocessingML builder for metric and ranking tables
+from markdown_docx import add_table
+# Persistent outbox and SMTP delivery worker for finished reports
+from email_delivery import EmailOutbox, DeliveryWorker, SmtpConfig
+# "What changed" reports against the previous run's report model
+from report_diff import diff_reports, diff_report, email_body
+# Requested report sections decide which per-treatment stages run
+from report_spec import ReportSpec, DEFAULT_SECTIONS
+# Stage outputs registered once by content hash and referenced, not copied, by the report
+from stage_outputs import StageOutputs, TreatmentReport, ReportDocument, INPUT_STAGE
+
 # Configure logging
 logging.getLogger("strands").setLevel(logging.DEBUG)
 logging.basicConfig(
@@ -38,24 +82,33 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()]
 )
 
-@dataclass
-class TreatmentData:
-    """Enhanced data structure for treatment information"""
-    treatment_id: str
-    treatment_name: str
-    source_files: List[str]
-    raw_content: str
-    detailed_description: str = ""
-    risk_assessment: Dict[str, Any] = None
-    revenue_analysis: Dict[str, Any] = None
-    customer_impact: Dict[str, Any] = None
-
-@dataclass
-class ProcessingResults:
-    """Container for all processing results"""
-    treatments: List[TreatmentData]
-    final_report: str = ""
-    approval_status: str = "pending"
+SUPPORTED_EXTENSIONS = ('.html', '.htm', '.txt', '.pdf', '.docx')
+STREAMABLE_EXTENSIONS = ('.html', '.htm', '.txt')
+# Text inputs above this size are memory-mapped and streamed instead of read whole
+STREAMING_THRESHOLD_BYTES = 32 * 1024 * 1024
+# Characters of a streamed file kept inline for LLM extraction; the rest is reachable via retrieval
+STREAMING_PREVIEW_CHARS = 200000
+# Treatment fields every per-treatment stage reads
+TREATMENT_INPUT_FIELDS = ('treatment_name', 'category', 'raw_details', 'cost_info', 'target_demographics', 'source_files')
+# Upstream per-treatment stage outputs each stage depends on
+STAGE_DEPENDENCIES = {
+    'detailed_description': (),
+    'risk_assessment': (),
+    'revenue_analysis': ('risk_assessment',),
+    'customer_impact': (),
+    'enhanced_report': ('detailed_description', 'risk_assessment', 'revenue_analysis', 'customer_impact')
+}
+# Prompt templates behind each cached stage (their versions are part of the stage fingerprint)
+STAGE_PROMPTS = {
+    'extract': ('treatment_extraction',),
+    'group': ('treatment_grouping',),
+    'detailed_description': ('detailed_description',),
+    'risk_assessment': ('risk_narrative',),
+    'revenue_analysis': ('revenue_analysis',),
+    'customer_impact': ('customer_impact',),
+    'enhanced_report': ('enhanced_report',),
+    'export': ()
+}
 
 class HealthcareAgentSystem:
     """Enhanced system orchestrator for the healthcare agent hackathon"""
@@ -86,16 +139,108 @@ class HealthcareAgentSystem:
         self.emailing_agent = None
         
         # Initialize data storage
-        self.processing_results = ProcessingResults(treatments=[])
+        self.last_dedup_report = {}
         
         # Setup output directory
         self.output_dir = Path("./hackathon_output")
         self.output_dir.mkdir(exist_ok=True)
         
+        # Processing results spill to a file of their own under output_dir
+        self.processing_results = ProcessingResults(treatments=[], data_dir=str(self.output_dir / "data_model"))
+        
+        # Setup retrieval index over ingested chunks (persisted between runs)
+        self.retrieval_index = BM25Index(index_path=str(self.output_dir / "retrieval_index.json.gz"))
+        self.retrieval_top_k = 5
+        self.retrieval_max_chars = 4000
+        
+        # Treatment knowledge store; each run writes its extracted treatments back
+        self.knowledge_store = TreatmentKnowledgeStore(db_path=str(self.output_dir / "treatment_knowledge.db"))
+        
+        # Risk scores are computed locally; the LLM only writes the narrative
+        self.risk_engine = RiskScoringEngine()
+        self.precomputed_risk = {}
+        
+        # Portfolio ranking assumptions (pilot budget, risk discount, table size)
+        self.portfolio_config = PortfolioConfig()
+        
+        # Segment sizing over a local demographic table (illustrative defaults when none is present)
+        demographic_tables = [self.output_dir / name for name in ("demographics.parquet", "demographics.csv")]
+        demographic_table = next((str(path) for path in demographic_tables if path.exists()), None)
+        self.segmentation_engine = SegmentationEngine(
+            table_path=demographic_table,
+            cache_path=str(self.output_dir / "segmentation_cache.json")
+        )
+        
+        # Cross-run identity index; stages of treatments with unchanged sources are reused
+        self.identity_index = TreatmentIdentityIndex(db_path=str(self.output_dir / "treatment_identity.db"))
+        self.reused_stages = 0
+        
+        # Prompt templates, loaded once; files in output_dir/prompts/<name>.txt override the defaults
+        self.prompts = TemplateRegistry(template_dir=str(self.output_dir / "prompts"))
+        
+        # Stage outputs keyed by input fingerprints; re-runs only recompute invalidated stages
+        self.stage_cache = StageCache(db_path=str(self.output_dir / "stage_cache.db"), on_record=self._record_stage_lookup)
+        # This run's per-treatment stage outputs; the report document references them by ID
+        self.stage_outputs = StageOutputs()
+        self.report_document = None
+        self.stage_templates = {
+            'extract': self._stage_template('extract', self._create_treatment_extraction_tool, self._fallback_treatment_extraction),
+            'group': self._stage_template('group', self._create_treatment_grouping_tool),
+            'detailed_description': self._stage_template('detailed_description', self._create_detailed_description_tool),
+            'risk_assessment': self._stage_template('risk_assessment', self._create_comprehensive_risk_analysis_tool),
+            'revenue_analysis': self._stage_template('revenue_analysis', self._create_detailed_revenue_analysis_tool),
+            'customer_impact': self._stage_template('customer_impact', self._create_customer_impact_analysis_tool),
+            'enhanced_report': self._stage_template('enhanced_report', self._create_enhanced_report_generator_tool),
+            'export': self._stage_template(
+                'export', self._create_enhanced_word_export_tool, self._setup_document_styles, self._add_title_page,
+                self._add_executive_summary, self._add_conclusions, self._add_recommendations,
+                self._add_portfolio_ranking, self._add_appendix, report_rendering.add_treatment_section,
+                report_rendering.add_enhanced_report_section, report_rendering.add_risk_section,
+                report_rendering.add_revenue_section, report_rendering.add_customer_impact_section,
+                report_rendering.render_treatment_part, report_rendering.StreamingDocxWriter.flush
+            )
+        }
+        
+        # Report sections to produce; only the stages feeding them run (see report_spec.SECTION_STAGES)
+        self.report_spec = ReportSpec()
+        self.active_report_spec = self.report_spec
+        
+        # Worker processes for report section rendering (None = one per CPU)
+        self.render_workers = None
+        
+        # Extra report formats written next to the .docx (e.g. ["html", "json"]); none by default
+        self.report_formats = []
+        
+        # Outbound email: queued in a persistent outbox, delivered over one reused SMTP session (SMTP_* settings)
+        self.email_outbox = EmailOutbox(db_path=str(self.output_dir / "email_outbox.db"))
+        self.smtp_config = SmtpConfig.from_env()
+        # Addresses the finished report is emailed to after each run; none by default
+        self.report_recipients = []
+        # Once a previous report exists, email only the changes (and nothing when nothing changed)
+        self.email_changes_only = True
+        
+        # Per-treatment results of every run, appended to partitioned Parquet for later analysis
+        self.results_store = ResultsStore(root=str(self.output_dir / "results"))
+        
         self._initialize_agents()
     
+    def _stage_template(self, stage: str, *functions) -> str:
+        """Template identity of a stage: its prompt template versions plus the code that builds and parses them"""
+        return hash_value({
+            "prompts": self.prompts.identities(STAGE_PROMPTS[stage]),
+            "code": code_fingerprint(*functions)
+        })
+    
+    def _record_stage_lookup(self, stage: str, hit: bool):
+        """Attribute stage cache hits and misses to the prompt template versions behind the stage"""
+        for name in STAGE_PROMPTS.get(stage, ()):
+            self.prompts.record_cache(name, hit)
+    
     def _initialize_agents(self):
-        """Initialize all specialized agents"""
+        """Initialize all specialized agents, with only the analysis tools the active report spec needs"""
+        stages = self.active_report_spec.required_stages(STAGE_DEPENDENCIES)
+        self.agents_report_spec = self.active_report_spec
+        
         # Create tools first
         read_file_tool = self._create_file_reader_tool()
         extract_treatments_tool = self._create_treatment_extraction_tool()
@@ -106,6 +251,7 @@ class HealthcareAgentSystem:
         revenue_tool = self._create_detailed_revenue_analysis_tool()
         customer_tool = self._create_customer_impact_analysis_tool()
         export_tool = self._create_enhanced_word_export_tool()
+        email_tool = self._create_email_delivery_tool()
 
         # Initialize agents with their tools
         self.research_agent = Agent(
@@ -113,9 +259,10 @@ class HealthcareAgentSystem:
             tools=[read_file_tool, extract_treatments_tool, group_treatments_tool]
         )
         
+        # Analysis tools of unrequested sections are left out, so the agents cannot spend LLM calls on them
         self.documenting_agent = Agent(
             model=self.bedrock_model,
-            tools=[description_tool, report_tool]
+            tools=[description_tool] + ([report_tool] if 'enhanced_report' in stages else [])
         )
         
         self.risk_assessment_agent = Agent(
@@ -125,12 +272,13 @@ class HealthcareAgentSystem:
         
         self.revenue_identification_agent = Agent(
             model=self.bedrock_model,
-            tools=[revenue_tool, customer_tool]
+            tools=[stage_tool for stage, stage_tool in (('revenue_analysis', revenue_tool), ('customer_impact', customer_tool))
+                   if stage in stages]
         )
         
         self.emailing_agent = Agent(
             model=self.bedrock_model,
-            tools=[export_tool]
+            tools=[export_tool, email_tool]
         )
 
     # ==================== ENHANCED FILE PROCESSING ====================
@@ -147,52 +295,134 @@ class HealthcareAgentSystem:
                     return {"error": f"File not found: {file_path}"}
                 
                 file_extension = path.suffix.lower()
-                content = ""
-                
-                if file_extension == '.html':
-                    with open(path, 'r', encoding='utf-8') as f:
-                        html_content = f.read()
-                        soup = BeautifulSoup(html_content, 'html.parser')
-                        # Remove script and style elements
-                        for script in soup(["script", "style"]):
-                            script.extract()
-                        content = soup.get_text()
-                        # Clean up whitespace
-                        content = re.sub(r'\n\s*\n', '\n\n', content)
-                        content = re.sub(r' +', ' ', content)
-                        
-                elif file_extension == '.txt':
-                    with open(path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        
-                elif file_extension == '.pdf':
-                    with open(path, 'rb') as f:
-                        pdf_reader = PyPDF2.PdfReader(f)
-                        content = ""
-                        for page in pdf_reader.pages:
-                            content += page.extract_text() + "\n"
-                            
-                elif file_extension == '.docx':
-                    doc = docx.Document(path)
-                    content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-                else:
+                if file_extension not in SUPPORTED_EXTENSIONS:
                     return {"error": f"Unsupported file format: {file_extension}"}
                 
-                return {
-                    "file_path": str(path),
-                    "file_name": path.name,
-                    "file_type": file_extension,
-                    "content": content.strip(),
-                    "word_count": len(content.split()),
-                    "size": len(content),
-                    "timestamp": datetime.now().isoformat()
-                }
+                if file_extension in STREAMABLE_EXTENSIONS and path.stat().st_size > STREAMING_THRESHOLD_BYTES:
+                    return self._read_large_text_file(str(path), path.name, file_extension)
+                
+                with open(path, 'rb') as f:
+                    content = self._extract_file_content(file_extension, f)
+                
+                return self._build_file_record(str(path), path.name, file_extension, content)
                 
             except Exception as e:
                 return {"error": f"Error reading file {file_path}: {str(e)}"}
         
         return read_file
     
+    def _extract_file_content(self, file_extension: str, stream) -> str:
+        """Extract plain text from an open binary stream (disk file or archive member)"""
+        if file_extension in ('.html', '.htm'):
+            html_content = stream.read().decode('utf-8')
+            soup = BeautifulSoup(html_content, 'html.parser')
+            # Remove script and style elements
+            for script in soup(["script", "style"]):
+                script.extract()
+            content = soup.get_text()
+            # Clean up whitespace
+            content = re.sub(r'\n\s*\n', '\n\n', content)
+            content = re.sub(r' +', ' ', content)
+            return content
+        elif file_extension == '.txt':
+            return stream.read().decode('utf-8')
+        elif file_extension == '.pdf':
+            pdf_reader = PyPDF2.PdfReader(stream)
+            content = ""
+            for page in pdf_reader.pages:
+                content += page.extract_text() + "\n"
+            return content
+        elif file_extension == '.docx':
+            doc = docx.Document(stream)
+            return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        raise ValueError(f"Unsupported file format: {file_extension}")
+    
+    def _build_file_record(self, file_path: str, file_name: str, file_extension: str, content: str) -> Dict[str, Any]:
+        """Index extracted content and build the file content dict used by the pipeline"""
+        # Index chunks so later prompts can pull relevant passages
+        self.retrieval_index.add_document(file_path, content)
+        
+        return {
+            "file_path": file_path,
+            "file_name": file_name,
+            "file_type": file_extension,
+            "content": content.strip(),
+            "word_count": len(content.split()),
+            "size": len(content),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _read_large_text_file(self, file_path: str, file_name: str, file_extension: str,
+                              source_path: Optional[str] = None, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Stream a large .txt/.html file through mmap decoding, cleaning and chunking.
+        
+        Chunk text goes to the retrieval index's on-disk chunk store (the index keeps
+        postings and offsets for a capped number of chunks); only a bounded preview is
+        kept inline, so peak memory follows the chunk size rather than the file size.
+        A file whose byte hash matches the indexed copy is not re-indexed: only its
+        preview is read. source_path names the source when file_path is a temporary
+        copy (a crawled archive member); content_hash skips re-hashing a known file.
+        """
+        source_path = source_path or file_path
+        content_hash = content_hash or file_digest(file_path)
+        indexed = self.retrieval_index.source_info(source_path, content_hash)
+        if indexed is None:
+            self.retrieval_index.remove_document(source_path)
+            chunker = StreamingChunker(self.retrieval_index.chunk_words, self.retrieval_index.overlap)
+        
+        preview = []
+        preview_chars = 0
+        total_chars = 0
+        for text in iter_clean_text(file_path, file_extension):
+            total_chars += len(text)
+            if preview_chars < STREAMING_PREVIEW_CHARS:
+                piece = text[:STREAMING_PREVIEW_CHARS - preview_chars]
+                preview.append(piece)
+                preview_chars += len(piece)
+            if indexed is not None:
+                if preview_chars >= STREAMING_PREVIEW_CHARS:
+                    break
+                continue
+            self.retrieval_index.add_chunks(source_path, chunker.feed(text))
+        
+        if indexed is None:
+            self.retrieval_index.add_chunks(source_path, chunker.flush())
+            indexed = {"word_count": chunker.word_count, "size": total_chars}
+            self.retrieval_index.finish_source(source_path, content_hash, **indexed)
+        
+        content = "".join(preview)
+        return {
+            "file_path": source_path,
+            "file_name": file_name,
+            "file_type": file_extension,
+            "content": content.strip(),
+            "content_hash": content_hash,
+            "word_count": indexed.get("word_count", 0),
+            "size": indexed.get("size", total_chars),
+            "streamed": True,
+            "truncated": indexed.get("size", total_chars) > preview_chars,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _parse_crawled_file(self, crawled: CrawledFile) -> Dict[str, Any]:
+        """Parse a file produced by the crawler (runs on the crawler's parse pool)"""
+        try:
+            if (crawled.disk_path and crawled.file_extension in STREAMABLE_EXTENSIONS
+                    and crawled.size > STREAMING_THRESHOLD_BYTES):
+                # Archive members are streamed from their temporary extraction, indexed under the member path
+                return self._read_large_text_file(crawled.disk_path, crawled.file_name, crawled.file_extension,
+                                                  source_path=crawled.display_path,
+                                                  content_hash=crawled.content_hash)
+            
+            with crawled.open() as stream:
+                content = self._extract_file_content(crawled.file_extension, stream)
+            record = self._build_file_record(crawled.display_path, crawled.file_name, crawled.file_extension, content)
+            record["content_hash"] = crawled.content_hash
+            return record
+        except Exception as e:
+            return {"error": f"Error reading file {crawled.display_path}: {str(e)}"}
+    
     def _create_treatment_extraction_tool(self):
         @tool
         def extract_treatments_from_files(file_contents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -203,49 +433,32 @@ class HealthcareAgentSystem:
                 all_content = ""
                 source_mapping = {}
                 
-                for file_data in file_contents:
-                    if "error" not in file_data:
-                        content = file_data["content"]
-                        file_name = file_data["file_name"]
-                        all_content += f"\n\n=== SOURCE: {file_name} ===\n{content}"
-                        source_mapping[file_name] = content
-                
-                prompt = f"""
-                You are an expert medical treatment analyst for CareCredit, a healthcare financing company. 
-                Analyze the following documents and extract ALL DISTINCT medical treatments mentioned.
-                
-                For each treatment found:
-                1. Assign a unique treatment_id (e.g., TREAT_001, TREAT_002, etc.)
-                2. Provide a clear treatment_name
-                3. List ALL source files that mention this treatment
-                4. Extract detailed information about the treatment
-                5. Note any competitor financing options mentioned
-                6. Identify target demographics or patient populations
-                
-                IMPORTANT: 
-                - Each treatment should be separate and distinct
-                - Do not group everything under one treatment
-                - Look for medical procedures, therapies, surgeries, diagnostic tests, etc.
-                - Include both established and emerging treatments
-                - Note any pricing or cost information mentioned
-                
-                Return a JSON array of treatments with this structure:
-                {{
-                    "treatment_id": "TREAT_XXX",
-                    "treatment_name": "Clear Name of Treatment",
-                    "source_files": ["file1.html", "file2.pdf"],
-                    "category": "surgery/therapy/diagnostic/etc",
-                    "raw_details": "All relevant information extracted",
-                    "competitor_info": "Any competitor financing mentioned",
-                    "cost_info": "Any cost/pricing information",
-                    "target_demographics": "Patient population info"
-                }}
-                
-                Documents to analyze:
-                {all_content}
-                """
+                # Collapse exact and near-duplicate pages so each copy is only paid for once
+                unique_files, dedup_report = deduplicate_documents(file_contents)
+                self.last_dedup_report = dedup_report
+                print_debug(
+                    f"Dedup: {dedup_report['documents_in']} -> {dedup_report['documents_out']} documents "
+                    f"({dedup_report['exact_duplicates']} exact, {dedup_report['near_duplicates']} near), "
+                    f"~{dedup_report['tokens_saved']} tokens saved"
+                )
                 
-                result = self.llm_agent(prompt)
+                duplicate_sources = {}
+                for file_data in unique_files:
+                    content = file_data["content"]
+                    # Sources are named by path: same-named files in different folders or archives stay distinct
+                    source = file_data.get("file_path") or file_data["file_name"]
+                    duplicates = [path for path in file_data.get("duplicate_paths", []) if path]
+                    header = f"=== SOURCE: {source} ==="
+                    if duplicates:
+                        header = f"=== SOURCE: {source} (also published as: {', '.join(duplicates)}) ==="
+                        duplicate_sources[source] = duplicates
+                    all_content += f"\n\n{header}\n{content}"
+                    source_mapping[source] = content
+                
+                result = self.prompts.call(
+                    'treatment_extraction', self.llm_agent,
+                    all_content=all_content
+                )
                 response = result.output if hasattr(result, 'output') else str(result)
                 
                 try:
@@ -259,6 +472,16 @@ class HealthcareAgentSystem:
                     # Fallback: create treatments based on text analysis
                     treatments = self._fallback_treatment_extraction(response, list(source_mapping.keys()))
                 
+                # Restore provenance of collapsed duplicates into source_files
+                for treatment in treatments:
+                    if isinstance(treatment, dict) and isinstance(treatment.get("source_files"), list):
+                        expanded = []
+                        for source in treatment["source_files"]:
+                            for name in [source] + duplicate_sources.get(source, []):
+                                if name not in expanded:
+                                    expanded.append(name)
+                        treatment["source_files"] = expanded
+                
                 return treatments
                 
             except Exception as e:
@@ -305,6 +528,20 @@ class HealthcareAgentSystem:
             "target_demographics": ""
         }]
 
+    def _get_relevant_passages(self, treatment: Dict[str, Any]) -> str:
+        """Retrieve the top-k indexed passages for a treatment, bounded by the prompt budget"""
+        query = " ".join([
+            str(treatment.get('treatment_name', '')),
+            str(treatment.get('category', '')),
+            str(treatment.get('target_demographics', ''))
+        ])
+        context = self.retrieval_index.get_context(
+            query,
+            top_k=self.retrieval_top_k,
+            max_chars=self.retrieval_max_chars
+        )
+        return context if context else "No additional passages available"
+
     def _create_treatment_grouping_tool(self):
         @tool
         def group_similar_treatments(treatments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -312,24 +549,10 @@ class HealthcareAgentSystem:
             Group semantically similar treatments and merge their information.
             """
             try:
-                prompt = f"""
-                You are a medical treatment analyst. Review the following treatments and group any that are semantically similar.
-                
-                For each final group:
-                1. Merge information from similar treatments
-                2. Create a comprehensive description
-                3. Combine source files
-                4. Preserve all unique details
-                5. Assign a clear, descriptive name
-                
-                Treatments to analyze:
-                {json.dumps(treatments, indent=2)}
-                
-                Return a JSON array of grouped treatments with merged information.
-                Ensure each treatment has comprehensive details and all source files are preserved.
-                """
-                
-                result = self.llm_agent(prompt)
+                result = self.prompts.call(
+                    'treatment_grouping', self.llm_agent,
+                    treatments_json=json.dumps(treatments, indent=2)
+                )
                 response = result.output if hasattr(result, 'output') else str(result)
                 
                 try:
@@ -359,30 +582,14 @@ class HealthcareAgentSystem:
             Create a comprehensive, detailed description for each treatment (minimum 1 page).
             """
             try:
-                prompt = f"""
-                You are a medical writer creating detailed treatment documentation for CareCredit's business team.
-                
-                Create a comprehensive, detailed description (minimum 500 words) for the following treatment:
-                
-                Treatment: {treatment.get('treatment_name', 'Unknown')}
-                Details: {treatment.get('raw_details', '')}
-                Category: {treatment.get('category', '')}
-                Sources: {treatment.get('source_files', [])}
-                
-                Your description should include:
-                1. **Overview** (2-3 paragraphs): What is this treatment, why is it important
-                2. **Medical Details** (2-3 paragraphs): How it works, who needs it, medical benefits
-                3. **Market Context** (2 paragraphs): Current market trends, competitor offerings
-                4. **Patient Demographics** (1-2 paragraphs): Target patient population, age groups, income levels
-                5. **Treatment Process** (2 paragraphs): Typical procedure steps, duration, follow-up care
-                6. **Cost Considerations** (1-2 paragraphs): Typical price ranges, insurance coverage, out-of-pocket costs
-                7. **CareCredit Opportunity** (1-2 paragraphs): How CareCredit can help, financing benefits
-                
-                Write in a professional, business-friendly tone that helps executives understand the opportunity.
-                Make it engaging and informative, with specific details and market insights.
-                """
-                
-                result = self.llm_agent(prompt)
+                result = self.prompts.call(
+                    'detailed_description', self.llm_agent,
+                    treatment_name=treatment.get('treatment_name', 'Unknown'),
+                    raw_details=treatment.get('raw_details', ''),
+                    category=treatment.get('category', ''),
+                    source_files=treatment.get('source_files', []),
+                    passages=self._get_relevant_passages(treatment)
+                )
                 response = result.output if hasattr(result, 'output') else str(result)
                 
                 return response
@@ -399,56 +606,15 @@ class HealthcareAgentSystem:
             Generate an enhanced report section for a treatment with detailed analysis and formatting.
             """
             try:
-                prompt = f"""
-                You are a healthcare business analyst creating a detailed report section for CareCredit.
-                
-                Generate a comprehensive report section for this treatment:
-                
-                Treatment: {treatment_data.get('treatment_name', 'Unknown')}
-                Category: {treatment_data.get('category', '')}
-                Description: {treatment_data.get('detailed_description', '')}
-                Risk Assessment: {treatment_data.get('risk_assessment', {})}
-                Revenue Analysis: {treatment_data.get('revenue_analysis', {})}
-                Customer Impact: {treatment_data.get('customer_impact', {})}
-                
-                Create a well-structured report section that includes:
-                
-                1. Treatment Overview
-                   - Clear description of the treatment
-                   - Medical significance
-                   - Current market position
-                
-                2. Market Analysis
-                   - Market size and growth
-                   - Competitive landscape
-                   - Regulatory environment
-                
-                3. Risk Assessment
-                   - Detailed risk factors
-                   - Risk mitigation strategies
-                   - Monitoring requirements
-                
-                4. Revenue Analysis
-                   - Market opportunity
-                   - Revenue projections
-                   - Cost structure
-                   - Profitability analysis
-                
-                5. Customer Impact
-                   - Target demographics
-                   - Customer benefits
-                   - Market penetration strategy
-                
-                6. Strategic Recommendations
-                   - Implementation approach
-                   - Resource requirements
-                   - Success metrics
-                
-                Format the content professionally with clear sections, bullet points, and key metrics.
-                Include specific numbers and percentages where possible.
-                """
-                
-                result = self.llm_agent(prompt)
+                result = self.prompts.call(
+                    'enhanced_report', self.llm_agent,
+                    treatment_name=treatment_data.get('treatment_name', 'Unknown'),
+                    category=treatment_data.get('category', ''),
+                    detailed_description=treatment_data.get('detailed_description', ''),
+                    risk_assessment=treatment_data.get('risk_assessment', {}),
+                    revenue_analysis=treatment_data.get('revenue_analysis', {}),
+                    customer_impact=treatment_data.get('customer_impact', {})
+                )
                 response = result.output if hasattr(result, 'output') else str(result)
                 
                 # Structure the response into sections
@@ -511,62 +677,42 @@ class HealthcareAgentSystem:
             Perform comprehensive risk analysis with detailed explanations and logic.
             """
             try:
-                prompt = f"""
-                You are a risk assessment expert for CareCredit. Perform a comprehensive risk analysis for this treatment.
-                
-                Treatment: {treatment.get('treatment_name', 'Unknown')}
-                Details: {treatment.get('raw_details', '')}
-                Category: {treatment.get('category', '')}
-                
-                Provide a detailed risk analysis with the following structure:
-                
-                1. **RISK PARAMETERS EXPLANATION**:
-                   - Market Risk (0-10): Competition, market saturation, regulatory changes
-                   - Medical Risk (0-10): Safety concerns, malpractice potential, adverse events
-                   - Financial Risk (0-10): Default rates, collection challenges, cost volatility
-                   - Regulatory Risk (0-10): FDA approval status, changing regulations
-                   - Technology Risk (0-10): Innovation obsolescence, equipment requirements
-                   - Provider Risk (0-10): Provider network stability, training requirements
-                
-                2. **DETAILED RISK SCORING WITH LOGIC**:
-                   For each parameter, provide:
-                   - Score (0-10)
-                   - Detailed explanation of why this score was assigned
-                   - Supporting evidence or reasoning
-                   - Comparison to similar treatments
-                
-                3. **OVERALL RISK ASSESSMENT**:
-                   - Combined risk score (weighted average)
-                   - Risk category (Low: 0-3, Medium: 4-6, High: 7-10)
-                   - Key risk factors to monitor
-                   - Risk mitigation strategies
-                
-                4. **RECOMMENDATIONS**:
-                   - Should CareCredit proceed? (Yes/No/Conditional)
-                   - Conditions or safeguards needed
-                   - Monitoring requirements
-                   - Exit strategies if needed
-                
-                Return as JSON with detailed explanations for each section.
-                """
-                
-                result = self.llm_agent(prompt)
+                risk_analysis = self._get_risk_scores(treatment)
+                scores_text = "\n".join(
+                    f"- {category}: {risk_analysis['risk_parameters'][category]}/10"
+                    for category in RISK_CATEGORIES
+                )
+                evidence_text = "; ".join(
+                    f"{feature}: {', '.join(phrases)}" for feature, phrases in risk_analysis['risk_features'].items()
+                ) or "No specific risk signals found in the source text"
+                
+                result = self.prompts.call(
+                    'risk_narrative', self.llm_agent,
+                    treatment_name=treatment.get('treatment_name', 'Unknown'),
+                    raw_details=treatment.get('raw_details', ''),
+                    category=treatment.get('category', ''),
+                    passages=self._get_relevant_passages(treatment),
+                    scores_text=scores_text,
+                    overall_risk_score=risk_analysis['overall_risk_score'],
+                    risk_category=risk_analysis['risk_category'],
+                    evidence_text=evidence_text
+                )
                 response = result.output if hasattr(result, 'output') else str(result)
                 
                 try:
                     json_match = re.search(r'\{.*\}', response, re.DOTALL)
                     if json_match:
-                        risk_analysis = json.loads(json_match.group())
+                        narrative = json.loads(json_match.group())
                     else:
-                        risk_analysis = json.loads(response)
+                        narrative = json.loads(response)
                 except json.JSONDecodeError:
-                    # Create structured response from text
-                    risk_analysis = {
-                        "overall_risk_score": 5.0,
-                        "risk_category": "Medium",
-                        "detailed_analysis": response,
-                        "recommendation": "Conditional approval with monitoring"
-                    }
+                    narrative = {"detailed_analysis": response}
+                
+                # Scores always come from the engine, whatever the narrative contains
+                for key in ("risk_explanations", "detailed_analysis", "key_risk_factors",
+                            "mitigation_strategies", "monitoring_requirements"):
+                    if key in narrative:
+                        risk_analysis[key] = narrative[key]
                 
                 return risk_analysis
                 
@@ -575,6 +721,13 @@ class HealthcareAgentSystem:
         
         return analyze_treatment_risks_comprehensive
 
+    def _get_risk_scores(self, treatment: Dict[str, Any]) -> Dict[str, Any]:
+        """Return engine risk scores for a treatment, using the batch pre-scored results when available"""
+        key = (treatment.get('treatment_id', ''), treatment.get('treatment_name', ''))
+        if key in self.precomputed_risk:
+            return dict(self.precomputed_risk[key])
+        return self.risk_engine.assess_one(treatment)
+
     # ==================== DETAILED REVENUE ANALYSIS ====================
     
     def _create_detailed_revenue_analysis_tool(self):
@@ -584,58 +737,22 @@ class HealthcareAgentSystem:
             Perform detailed revenue analysis with customer segmentation and profitability calculations.
             """
             try:
-                prompt = f"""
-                You are a business analyst for CareCredit. Perform a comprehensive revenue analysis for this treatment.
-                
-                Treatment: {treatment.get('treatment_name', 'Unknown')}
-                Category: {treatment.get('category', '')}
-                Risk Score: {risk_analysis.get('overall_risk_score', 5)}
-                
-                Provide detailed revenue analysis with:
-                
-                1. **MARKET SIZE ESTIMATION**:
-                   - Total addressable market (TAM)
-                   - Serviceable addressable market (SAM)
-                   - Market growth rate
-                   - Competitive landscape analysis
-                
-                2. **CUSTOMER SEGMENTATION & IMPACT**:
-                   - Age group breakdown (18-30, 31-45, 46-60, 60+)
-                   - Income level distribution
-                   - Geographic distribution
-                   - Insurance coverage patterns
-                   - Estimated patient volumes per segment
-                
-                3. **EXISTING CUSTOMER IMPACT**:
-                   - How many current CareCredit customers would benefit
-                   - Cross-selling opportunities
-                   - Customer lifetime value impact
-                   - Retention improvements
-                
-                4. **NEW CUSTOMER ACQUISITION**:
-                   - Potential new customers per year
-                   - Customer acquisition cost
-                   - Conversion rates by segment
-                   - Marketing channel effectiveness
-                
-                5. **FINANCIAL PROJECTIONS**:
-                   - Average transaction size
-                   - Transaction volume projections (Year 1-3)
-                   - Revenue projections (Year 1-3)
-                   - Cost structure analysis
-                   - Profitability timeline
-                   - ROI calculations
-                
-                6. **DETAILED LOGIC & ASSUMPTIONS**:
-                   - Explain methodology for each calculation
-                   - Key assumptions and their rationale
-                   - Sensitivity analysis for key variables
-                   - Comparison to similar treatments in portfolio
-                
-                Return comprehensive JSON with all calculations and detailed explanations.
-                """
-                
-                result = self.llm_agent(prompt)
+                # Revenue bands are computed locally so the LLM only interprets them
+                try:
+                    risk_score = float(risk_analysis.get('overall_risk_score', 5))
+                except (TypeError, ValueError):
+                    risk_score = 5.0
+                sensitivity = revenue_sensitivity(treatment.get('treatment_id', 'Unknown'), risk_score)
+                
+                result = self.prompts.call(
+                    'revenue_analysis', self.llm_agent,
+                    treatment_name=treatment.get('treatment_name', 'Unknown'),
+                    category=treatment.get('category', ''),
+                    risk_score=risk_analysis.get('overall_risk_score', 5),
+                    passages=self._get_relevant_passages(treatment),
+                    simulations=sensitivity['simulations'],
+                    revenue_bands=format_revenue_bands(sensitivity)
+                )
                 response = result.output if hasattr(result, 'output') else str(result)
                 
                 try:
@@ -654,6 +771,7 @@ class HealthcareAgentSystem:
                         "recommendation": "Proceed with pilot program"
                     }
                 
+                revenue_analysis["sensitivity_analysis"] = sensitivity
                 return revenue_analysis
                 
             except Exception as e:
@@ -668,23 +786,30 @@ class HealthcareAgentSystem:
             Analyze detailed customer impact and segmentation.
             """
             try:
-                prompt = f"""
-                Analyze the customer impact for treatment: {treatment.get('treatment_name', 'Unknown')}
-                
-                Provide detailed breakdown of:
-                1. Existing customer segments that would benefit
-                2. New customer acquisition potential
-                3. Demographic analysis with population estimates
-                4. Geographic considerations
-                5. Seasonal trends and timing factors
+                # Population and uptake figures come from the segmentation engine, not the LLM
+                segmentation = self.segmentation_engine.segment_category(treatment.get('category', ''))
                 
-                Include specific numbers and percentages where possible.
-                """
-                
-                result = self.llm_agent(prompt)
+                result = self.prompts.call(
+                    'customer_impact', self.llm_agent,
+                    treatment_name=treatment.get('treatment_name', 'Unknown'),
+                    segmentation=format_segmentation(segmentation)
+                )
                 response = result.output if hasattr(result, 'output') else str(result)
                 
-                return {"customer_impact_analysis": response}
+                return {
+                    "customer_impact_analysis": response,
+                    "segmentation": segmentation,
+                    "demographics": {
+                        segment: f"{data['population']:,} people, expected uptake {data['expected_uptake']:,}"
+                        for segment, data in segmentation['segments'].items()
+                    },
+                    "impact_metrics": {
+                        "Addressable population": f"{segmentation['total_population']:,}",
+                        "Existing customers": f"{segmentation['total_existing_customers']:,}",
+                        "Expected uptake (existing customers)": f"{segmentation['expected_existing_uptake']:,}",
+                        "Expected uptake (new customers)": f"{segmentation['expected_new_uptake']:,}"
+                    }
+                }
                 
             except Exception as e:
                 return {"error": f"Error in customer impact analysis: {str(e)}"}
@@ -700,35 +825,29 @@ class HealthcareAgentSystem:
             Create a comprehensive, visually appealing Word document with detailed treatment analysis.
             """
             try:
-                doc = docx.Document()
-                
-                # Set up document styles
-                self._setup_document_styles(doc)
-                
-                # Add title page
-                self._add_title_page(doc)
-                
-                # Add executive summary
-                self._add_executive_summary(doc, treatments_data)
-                
-                # Add detailed treatment sections
-                for i, treatment_data in enumerate(treatments_data, 1):
-                    self._add_treatment_section(doc, treatment_data, i)
+                # Document XML is streamed into the .docx section by section, starting from the
+                # cached template that already holds the styles and the title page
+                with StreamingDocxWriter(output_path, template=self._report_template()) as writer:
+                    doc = writer.scratch
+                    sections = self.active_report_spec.sections
                     
-                    # Add page break between treatments
-                    if i < len(treatments_data):
-                        doc.add_page_break()
-                
-                # Add conclusions and recommendations
-                self._add_conclusions(doc, treatments_data)
-                
-                # Save document
-                doc.save(output_path)
+                    # Add executive summary
+                    self._add_executive_summary(doc, treatments_data)
+                    writer.flush()
+                    
+                    # Add detailed treatment sections (built on worker processes for large reports)
+                    rendering = stream_treatment_sections(writer, treatments_data, workers=self.render_workers,
+                                                          sections=sections)
+                    print_debug(f"Rendered {rendering['sections']} treatment sections ({rendering['mode']}, {rendering['workers']} workers)")
+                    
+                    # Add conclusions and recommendations, then the metrics appendix
+                    self._add_conclusions(doc, treatments_data, flush=writer.flush, sections=sections)
                 
                 return {
                     "status": "success",
                     "output_path": output_path,
                     "treatments_count": len(treatments_data),
+                    "rendering": rendering,
                     "timestamp": datetime.now().isoformat()
                 }
                 
@@ -737,6 +856,20 @@ class HealthcareAgentSystem:
         
         return export_enhanced_word_document
     
+    def _report_template(self):
+        """Styled template with the title page, built once per day and cloned for every export"""
+        return load_report_template(
+            "enhanced_report",
+            self._build_report_template,
+            dependencies=(self._setup_document_styles, self._add_title_page),
+            key=datetime.now().strftime("%Y-%m-%d"),
+            cache_dir=str(self.output_dir / "templates")
+        )
+    
+    def _build_report_template(self, doc):
+        self._setup_document_styles(doc)
+        self._add_title_page(doc)
+    
     def _setup_document_styles(self, doc):
         """Set up custom styles for the document"""
         try:
@@ -799,93 +932,29 @@ class HealthcareAgentSystem:
     
     def _add_treatment_section(self, doc, treatment_data, treatment_number):
         """Add detailed section for each treatment"""
-        treatment_name = treatment_data.get('treatment_name', f'Treatment {treatment_number}')
-        
-        # Main treatment heading
-        doc.add_heading(f'Treatment {treatment_number}: {treatment_name}', level=1)
-        
-        # Treatment overview
-        doc.add_heading('Overview', level=2)
-        overview = treatment_data.get('detailed_description', 'No detailed description available')
-        doc.add_paragraph(overview)
-        
-        # Source information
-        doc.add_heading('Data Sources', level=2)
-        sources = treatment_data.get('source_files', [])
-        if sources:
-            for source in sources:
-                doc.add_paragraph(f'• {source}', style='List Bullet')
-        else:
-            doc.add_paragraph('• Multiple research sources analyzed')
-        
-        # Risk Analysis Section
-        self._add_risk_section(doc, treatment_data.get('risk_assessment', {}))
-        
-        # Revenue Analysis Section
-        self._add_revenue_section(doc, treatment_data.get('revenue_analysis', {}))
-        
-        # Customer Impact Section
-        self._add_customer_impact_section(doc, treatment_data.get('customer_impact', {}))
+        report_rendering.add_treatment_section(doc, treatment_data, treatment_number)
     
     def _add_risk_section(self, doc, risk_data):
         """Add detailed risk analysis section"""
-        doc.add_heading('Risk Assessment', level=2)
-        
-        if isinstance(risk_data, dict) and 'detailed_analysis' in risk_data:
-            doc.add_paragraph(risk_data['detailed_analysis'])
-        elif isinstance(risk_data, str):
-            doc.add_paragraph(risk_data)
-        else:
-            doc.add_paragraph("Comprehensive risk analysis includes market, medical, financial, regulatory, technology, and provider risk factors. Each parameter is scored on a 0-10 scale with detailed justification and mitigation strategies.")
-        
-        # Add risk metrics table if available
-        if isinstance(risk_data, dict):
-            doc.add_heading('Risk Metrics Summary', level=3)
-            
-            # Create a simple risk summary
-            risk_score = risk_data.get('overall_risk_score', 'Not calculated')
-            risk_category = risk_data.get('risk_category', 'Under review')
-            
-            doc.add_paragraph(f'Overall Risk Score: {risk_score}')
-            doc.add_paragraph(f'Risk Category: {risk_category}')
-            
-            recommendation = risk_data.get('recommendation', 'Further analysis required')
-            doc.add_paragraph(f'Recommendation: {recommendation}')
+        report_rendering.add_risk_section(doc, risk_data)
     
     def _add_revenue_section(self, doc, revenue_data):
         """Add detailed revenue analysis section"""
-        doc.add_heading('Revenue Analysis', level=2)
-        
-        if isinstance(revenue_data, dict) and 'detailed_analysis' in revenue_data:
-            doc.add_paragraph(revenue_data['detailed_analysis'])
-        elif isinstance(revenue_data, str):
-            doc.add_paragraph(revenue_data)
-        else:
-            doc.add_paragraph("Revenue analysis includes market sizing, customer segmentation, financial projections, and profitability assessment. Projections are based on market research, competitive analysis, and CareCredit's historical performance data.")
-        
-        # Add revenue projections if available
-        if isinstance(revenue_data, dict):
-            doc.add_heading('Financial Projections', level=3)
-            
-            market_size = revenue_data.get('market_size', 'Under analysis')
-            doc.add_paragraph(f'Market Size: {market_size}')
-            
-            revenue_proj = revenue_data.get('revenue_projection_year1', 'To be determined')
-            doc.add_paragraph(f'Year 1 Revenue Projection: {revenue_proj}')
+        report_rendering.add_revenue_section(doc, revenue_data)
     
     def _add_customer_impact_section(self, doc, customer_data):
         """Add customer impact analysis section"""
-        doc.add_heading('Customer Impact Analysis', level=2)
-        
-        if isinstance(customer_data, dict) and 'customer_impact_analysis' in customer_data:
-            doc.add_paragraph(customer_data['customer_impact_analysis'])
-        elif isinstance(customer_data, str):
-            doc.add_paragraph(customer_data)
-        else:
-            doc.add_paragraph("Customer impact analysis examines how this treatment affects existing CareCredit customers and potential for new customer acquisition. Analysis includes demographic segmentation, geographic distribution, and behavioral patterns.")
+        report_rendering.add_customer_impact_section(doc, customer_data)
     
-    def _add_conclusions(self, doc, treatments_data):
-        """Add conclusions and recommendations section"""
+    def _add_conclusions(self, doc, treatments_data, flush=None, sections=DEFAULT_SECTIONS):
+        """Add the recommendations and appendix sections requested in sections"""
+        if 'recommendations' in sections:
+            self._add_recommendations(doc, treatments_data, flush=flush)
+        if 'appendix' in sections:
+            self._add_appendix(doc, treatments_data, flush=flush, sections=sections)
+    
+    def _add_recommendations(self, doc, treatments_data, flush=None):
+        """Add conclusions and recommendations section (flush is called after each per-treatment block)"""
         doc.add_heading('Conclusions and Strategic Recommendations', level=1)
         
         # Add overall summary
@@ -903,6 +972,10 @@ class HealthcareAgentSystem:
         """
         doc.add_paragraph(summary_text)
         
+        # Rank the portfolio and select pilots within budget
+        portfolio = rank_portfolio(treatments_data, self.portfolio_config)
+        self._add_portfolio_ranking(doc, portfolio)
+        
         # Add treatment-specific recommendations
         doc.add_heading('Treatment-Specific Recommendations', level=2)
         for treatment in treatments_data:
@@ -929,17 +1002,20 @@ class HealthcareAgentSystem:
                • {self._get_customer_engagement_strategy(treatment.get('customer_impact', {}))}
             """
             doc.add_paragraph(recommendation_text)
+            if flush:
+                flush()
         
         # Add final recommendations
         doc.add_heading('Final Strategic Recommendations', level=2)
-        final_recommendations = """
+        priorities = ", ".join(row['treatment_name'] for row in portfolio['ranked'][:3]) or "the highest-ranked treatments"
+        final_recommendations = f"""
         1. Immediate Actions:
-           • Prioritize treatments with highest revenue potential and lowest risk
+           • Prioritize {priorities} (highest risk-adjusted revenue)
            • Develop targeted marketing campaigns for high-impact treatments
            • Establish monitoring systems for risk metrics
         
         2. Short-term Goals (3-6 months):
-           • Launch pilot programs for top 3 treatments
+           • Launch pilot programs for the {len(portfolio['selected'])} treatments selected within the pilot budget
            • Develop provider partnerships
            • Create customer education materials
         
@@ -949,9 +1025,44 @@ class HealthcareAgentSystem:
            • Develop advanced analytics for treatment performance
         """
         doc.add_paragraph(final_recommendations)
+    
+    def _add_portfolio_ranking(self, doc, portfolio: Dict[str, Any]):
+        """Add the ranked portfolio table and the budget-constrained pilot selection"""
+        doc.add_heading('Portfolio Prioritization', level=2)
+        if not portfolio['ranked']:
+            doc.add_paragraph('No treatments available for ranking.')
+            return
+        
+        doc.add_paragraph(
+            f"Treatments are ranked by risk-adjusted projected revenue. "
+            f"{portfolio['pareto_optimal']} treatment(s) sit on the risk/revenue Pareto front "
+            f"(no other treatment has both lower risk and higher revenue)."
+        )
+        
+        add_table(doc, [('Rank', 'Treatment', 'Risk Score', 'Projected Revenue', 'Pareto Front', 'Pilot')] + [
+            (
+                row['rank'],
+                row['treatment_name'],
+                f"{row['risk_score']:.1f}",
+                f"${row['projected_revenue']:,.0f}",
+                row['pareto_front'] + 1,
+                'Selected' if row['selected_for_pilot'] else '-',
+            )
+            for row in portfolio['ranked']
+        ])
+        doc.add_paragraph("")
         
-        # Add appendix with detailed metrics
-        self._add_appendix(doc, treatments_data)
+        doc.add_heading('Pilot Selection Within Budget', level=3)
+        doc.add_paragraph(
+            f"Budget ${portfolio['budget']:,.0f}: {len(portfolio['selected'])} pilot(s) selected at a total cost of "
+            f"${portfolio['total_pilot_cost']:,.0f}, covering ${portfolio['total_selected_revenue']:,.0f} "
+            f"in projected annual revenue."
+        )
+        for row in portfolio['selected']:
+            doc.add_paragraph(
+                f"• {row['treatment_name']}: pilot cost ${row['pilot_cost']:,.0f}, risk {row['risk_score']:.1f}",
+                style='List Bullet'
+            )
     
     def _get_implementation_strategy(self, risk_data: Dict[str, Any], revenue_data: Dict[str, Any]) -> str:
         """Generate implementation strategy based on risk and revenue data"""
@@ -998,8 +1109,8 @@ class HealthcareAgentSystem:
         else:
             return "Basic engagement with focus on education and awareness"
     
-    def _add_appendix(self, doc, treatments_data):
-        """Add detailed appendix with metrics and analysis"""
+    def _add_appendix(self, doc, treatments_data, flush=None, sections=DEFAULT_SECTIONS):
+        """Add detailed appendix with the metrics of the included analyses (flush is called after each treatment)"""
         doc.add_page_break()
         doc.add_heading('Appendix: Detailed Analysis Metrics', level=1)
         
@@ -1008,15 +1119,26 @@ class HealthcareAgentSystem:
             doc.add_heading(f'{treatment_name} - Detailed Metrics', level=2)
             
             # Add risk metrics
-            self._add_detailed_risk_metrics(doc, treatment.get('risk_assessment', {}))
+            if 'risk' in sections:
+                self._add_detailed_risk_metrics(doc, treatment.get('risk_assessment', {}))
             
             # Add revenue metrics
-            self._add_detailed_revenue_metrics(doc, treatment.get('revenue_analysis', {}))
+            if 'revenue' in sections:
+                self._add_detailed_revenue_metrics(doc, treatment.get('revenue_analysis', {}))
             
             # Add customer metrics
-            self._add_detailed_customer_metrics(doc, treatment.get('customer_impact', {}))
+            if 'customer_impact' in sections:
+                self._add_detailed_customer_metrics(doc, treatment.get('customer_impact', {}))
             
             doc.add_page_break()
+            if flush:
+                flush()
+    
+    def _add_metric_table(self, doc, label: str, header: tuple, items: Dict[str, Any], suffix: str = ''):
+        """Add a labelled two-column metric table, built in one step"""
+        doc.add_paragraph(label)
+        if items:
+            add_table(doc, [header] + [(key, f'{value}{suffix}') for key, value in items.items()], bold_header=True)
     
     def _add_detailed_risk_metrics(self, doc, risk_data: Dict[str, Any]):
         """Add detailed risk metrics to appendix"""
@@ -1024,15 +1146,13 @@ class HealthcareAgentSystem:
         
         if isinstance(risk_data, dict):
             # Add risk parameters
-            doc.add_paragraph('Risk Parameters:')
-            for param, score in risk_data.get('risk_parameters', {}).items():
-                doc.add_paragraph(f'• {param}: {score}/10', style='List Bullet')
+            self._add_metric_table(doc, 'Risk Parameters:', ('Parameter', 'Score'),
+                                   risk_data.get('risk_parameters', {}), suffix='/10')
             
             # Add risk explanations
             if 'risk_explanations' in risk_data:
-                doc.add_paragraph('Risk Explanations:')
-                for param, explanation in risk_data['risk_explanations'].items():
-                    doc.add_paragraph(f'• {param}: {explanation}', style='List Bullet')
+                self._add_metric_table(doc, 'Risk Explanations:', ('Parameter', 'Explanation'),
+                                       risk_data['risk_explanations'])
     
     def _add_detailed_revenue_metrics(self, doc, revenue_data: Dict[str, Any]):
         """Add detailed revenue metrics to appendix"""
@@ -1040,14 +1160,11 @@ class HealthcareAgentSystem:
         
         if isinstance(revenue_data, dict):
             # Add market metrics
-            doc.add_paragraph('Market Metrics:')
-            for metric, value in revenue_data.get('market_metrics', {}).items():
-                doc.add_paragraph(f'• {metric}: {value}', style='List Bullet')
+            self._add_metric_table(doc, 'Market Metrics:', ('Metric', 'Value'), revenue_data.get('market_metrics', {}))
             
             # Add financial projections
-            doc.add_paragraph('Financial Projections:')
-            for year, projection in revenue_data.get('projections', {}).items():
-                doc.add_paragraph(f'• {year}: {projection}', style='List Bullet')
+            self._add_metric_table(doc, 'Financial Projections:', ('Year', 'Projection'),
+                                   revenue_data.get('projections', {}))
     
     def _add_detailed_customer_metrics(self, doc, customer_data: Dict[str, Any]):
         """Add detailed customer metrics to appendix"""
@@ -1055,22 +1172,85 @@ class HealthcareAgentSystem:
         
         if isinstance(customer_data, dict):
             # Add demographic metrics
-            doc.add_paragraph('Demographic Metrics:')
-            for segment, data in customer_data.get('demographics', {}).items():
-                doc.add_paragraph(f'• {segment}: {data}', style='List Bullet')
+            self._add_metric_table(doc, 'Demographic Metrics:', ('Segment', 'Details'),
+                                   customer_data.get('demographics', {}))
             
             # Add impact metrics
-            doc.add_paragraph('Impact Metrics:')
-            for metric, value in customer_data.get('impact_metrics', {}).items():
-                doc.add_paragraph(f'• {metric}: {value}', style='List Bullet')
+            self._add_metric_table(doc, 'Impact Metrics:', ('Metric', 'Value'), customer_data.get('impact_metrics', {}))
 
-    def process_files(self, input_files: List[str], output_path: str) -> Dict[str, Any]:
+    # ==================== REPORT EMAIL DELIVERY ====================
+    
+    def _create_email_delivery_tool(self):
+        @tool
+        def email_report(recipients: List[str], subject: str, body: str, attachments: List[str]) -> Dict[str, Any]:
+            """
+            Queue a report email for each recipient and deliver everything due in the outbox.
+            """
+            try:
+                missing = [path for path in attachments if not Path(path).is_file()]
+                if missing:
+                    return {"error": f"Attachments not found: {', '.join(missing)}"}
+                
+                outbox_ids = self.email_outbox.enqueue(recipients, subject, body, attachments)
+                if not outbox_ids:
+                    return {"error": "No recipients given"}
+                
+                delivery = DeliveryWorker(self.email_outbox, self.smtp_config).drain()
+                return {
+                    "status": "success",
+                    "queued": len(outbox_ids),
+                    "delivery": delivery,
+                    "messages": self.email_outbox.status(outbox_ids),
+                    "timestamp": datetime.now().isoformat()
+                }
+                
+            except Exception as e:
+                return {"error": f"Error sending report email: {str(e)}"}
+        
+        return email_report
+    
+    def _email_report(self, subject: str, body: str, attachments: List[str]) -> Dict[str, Any]:
+        """Queue a report email for report_recipients and drain the outbox; failed sends stay queued for retry"""
+        outbox_ids = self.email_outbox.enqueue(
+            self.report_recipients, subject, body, [path for path in attachments if Path(path).is_file()]
+        )
+        delivery = DeliveryWorker(self.email_outbox, self.smtp_config).drain()
+        print_debug(
+            f"Emailed report: {delivery['sent']} sent, {delivery['retried']} queued for retry, "
+            f"{delivery['failed']} failed over {delivery['connections']} SMTP connection(s)"
+        )
+        return {"queued": outbox_ids, "delivery": delivery, "outbox": self.email_outbox.counts()}
+    
+    def _diff_against_last_report(self, report, output_path: str) -> Dict[str, Any]:
+        """
+        Diff this run's report model against the one saved by the previous run for the same output,
+        write the "what changed" report next to the .docx and save the current model for the next run.
+        """
+        snapshot_path = self.output_dir / "reports" / f"{Path(output_path).stem}.last.json"
+        changes = {}
+        if snapshot_path.exists():
+            diff = diff_reports(load_report(str(snapshot_path)), report)
+            changes_path = str(Path(output_path).with_name(f"{Path(output_path).stem}_changes.md"))
+            write_report(diff_report(diff), "md", changes_path)
+            changes = {
+                "summary": diff.summary(),
+                "has_changes": diff.has_changes,
+                "changes_path": changes_path,
+                "email_body": email_body(diff)
+            }
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        write_report(report, "json", str(snapshot_path))
+        return changes
+
+    def process_files(self, input_files: List[str], output_path: str,
+                      report_spec: Optional[ReportSpec] = None) -> Dict[str, Any]:
         """
         Process input files and generate comprehensive treatment analysis report.
         
         Args:
             input_files: List of file paths to process
             output_path: Path where the final report will be saved
+            report_spec: Report sections to produce (defaults to self.report_spec)
             
         Returns:
             Dict containing processing results and status
@@ -1088,85 +1268,369 @@ class HealthcareAgentSystem:
                 else:
                     print_debug(f"Error reading file {file_path}: {result}")
             
-            if not file_contents:
-                raise Exception("No valid file contents were extracted")
-            
-            # Extract treatments from files
-            result = self.research_agent.run(
-                f"Extract all distinct medical treatments from these files: {json.dumps(file_contents)}"
-            )
-            treatments = result if isinstance(result, list) else []
+            return self._run_analysis_pipeline(file_contents, output_path, report_spec)
             
-            if not treatments:
-                raise Exception("No treatments were extracted from the files")
+        except Exception as e:
+            error_msg = f"Error processing files: {str(e)}"
+            print_debug(error_msg)
+            return {
+                "status": "error",
+                "error": error_msg,
+                "timestamp": datetime.now().isoformat()
+            }
+    
+    def process_directory(self, roots: List[str], output_path: str, include: Optional[List[str]] = None,
+                          exclude: Optional[List[str]] = None, max_files: Optional[int] = None,
+                          max_bytes: Optional[int] = None, max_seconds: Optional[float] = None,
+                          workers: int = 4, report_spec: Optional[ReportSpec] = None) -> Dict[str, Any]:
+        """
+        Crawl directories and zip archives, then run the full analysis pipeline on what was found.
+        
+        Args:
+            roots: Directories, zip archives or single files to crawl
+            output_path: Path where the final report will be saved
+            include: Glob patterns to include (defaults to supported document types)
+            exclude: Glob patterns to skip
+            max_files: Stop after this many unique files
+            max_bytes: Stop before exceeding this many bytes of input
+            max_seconds: Stop crawling after this many seconds
+            workers: Number of parse worker threads
+            report_spec: Report sections to produce (defaults to self.report_spec)
             
-            # Group similar treatments
-            result = self.research_agent.run(
-                f"Group any semantically similar treatments from this list: {json.dumps(treatments)}"
+        Returns:
+            Dict containing processing results, status and crawl statistics
+        """
+        try:
+            crawler = FileCrawler(
+                roots,
+                include=include,
+                exclude=exclude,
+                budget=CrawlBudget(max_files=max_files, max_bytes=max_bytes, max_seconds=max_seconds)
             )
-            grouped_treatments = result if isinstance(result, list) else treatments
+            results = crawler.run(self._parse_crawled_file, workers=workers)
             
-            # Process each treatment
-            processed_treatments = []
-            for treatment in grouped_treatments:
-                try:
-                    # Create detailed description
-                    result = self.documenting_agent.run(
-                        f"Create a detailed description for this treatment: {json.dumps(treatment)}"
-                    )
-                    treatment['detailed_description'] = result if isinstance(result, str) else str(result)
-                    
-                    # Perform risk assessment
-                    result = self.risk_assessment_agent.run(
-                        f"Analyze risks for this treatment: {json.dumps(treatment)}"
-                    )
-                    treatment['risk_assessment'] = result if isinstance(result, dict) else {}
-                    
-                    # Analyze revenue opportunities
-                    result = self.revenue_identification_agent.run(
-                        f"Analyze revenue opportunities for this treatment: {json.dumps(treatment)}"
-                    )
-                    treatment['revenue_analysis'] = result if isinstance(result, dict) else {}
-                    
-                    # Analyze customer impact
-                    result = self.revenue_identification_agent.run(
-                        f"Analyze customer impact for this treatment: {json.dumps(treatment)}"
-                    )
-                    treatment['customer_impact'] = result if isinstance(result, dict) else {}
-                    
-                    processed_treatments.append(treatment)
-                except Exception as e:
-                    print_debug(f"Error processing treatment {treatment.get('treatment_name', 'Unknown')}: {str(e)}")
-                    continue
-            
-            if not processed_treatments:
-                raise Exception("No treatments were successfully processed")
+            file_contents = []
+            for result in results:
+                if "error" in result:
+                    print_debug(result["error"])
+                else:
+                    file_contents.append(result)
             
-            # Generate final report
-            result = self.emailing_agent.run(
-                f"Generate a Word document report for these treatments: {json.dumps(processed_treatments)}"
+            stats = crawler.stats
+            print_debug(
+                f"Crawled {stats.files_seen} files: {stats.files_queued} queued, "
+                f"{stats.duplicates_skipped} duplicates, {stats.filtered_out} filtered, {stats.errors} unreadable"
+                + (f", budget exhausted ({stats.budget_exhausted})" if stats.budget_exhausted else "")
             )
             
-            # Update processing results
-            self.processing_results.treatments = processed_treatments
-            self.processing_results.final_report = output_path
-            self.processing_results.approval_status = "completed"
-            
-            return {
-                "status": "success",
-                "treatments_processed": len(processed_treatments),
-                "output_path": output_path,
-                "timestamp": datetime.now().isoformat()
+            result = self._run_analysis_pipeline(file_contents, output_path, report_spec)
+            result["crawl_stats"] = {
+                "files_seen": stats.files_seen,
+                "files_queued": stats.files_queued,
+                "duplicates_skipped": stats.duplicates_skipped,
+                "filtered_out": stats.filtered_out,
+                "bytes_queued": stats.bytes_queued,
+                "errors": stats.errors,
+                "error_paths": stats.error_paths,
+                "budget_exhausted": stats.budget_exhausted
             }
+            return result
             
         except Exception as e:
-            error_msg = f"Error processing files: {str(e)}"
+            error_msg = f"Error processing directory: {str(e)}"
             print_debug(error_msg)
             return {
                 "status": "error",
                 "error": error_msg,
                 "timestamp": datetime.now().isoformat()
             }
+    
+    def _run_analysis_pipeline(self, file_contents: List[Dict[str, Any]], output_path: str,
+                               report_spec: Optional[ReportSpec] = None) -> Dict[str, Any]:
+        """Run extraction, grouping, the per-treatment stages the report spec needs and export over already-read file contents"""
+        if not file_contents:
+            raise Exception("No valid file contents were extracted")
+        
+        # Stages feeding no requested section are skipped; agents are rebuilt without their tools
+        self.active_report_spec = report_spec or self.report_spec
+        if self.active_report_spec != self.agents_report_spec:
+            self._initialize_agents()
+        stages = self.active_report_spec.required_stages(STAGE_DEPENDENCIES)
+        
+        # Persist the retrieval index so later runs only add new files
+        self.retrieval_index.save()
+        self.stage_cache.reset_stats()
+        self.prompts.reset_stats()
+        
+        # Streamed and crawled files carry a hash of their whole content; 'content' may be only a preview
+        source_hashes = {
+            (file_data.get('file_path') or file_data['file_name']): (
+                file_data.get('content_hash')
+                or hashlib.sha256(file_data.get('content', '').encode('utf-8')).hexdigest()
+            )
+            for file_data in file_contents
+            if isinstance(file_data, dict) and 'file_name' in file_data
+        }
+        
+        # Extract treatments from files (reused while every source hash is unchanged)
+        def extract():
+            result = self.research_agent.run(
+                f"Extract all distinct medical treatments from these files: {json.dumps(file_contents)}"
+            )
+            return {
+                "treatments": result if isinstance(result, list) else [],
+                "dedup_report": self.last_dedup_report
+            }
+        
+        extracted, _ = self.stage_cache.run(
+            'extract', {"sources": sorted(source_hashes.items())}, self.stage_templates['extract'], extract,
+            cacheable=lambda output: bool(output["treatments"]) and not any(
+                isinstance(t, dict) and "error" in t for t in output["treatments"]
+            )
+        )
+        treatments = extracted["treatments"]
+        self.last_dedup_report = extracted["dedup_report"]
+        
+        if not treatments:
+            raise Exception("No treatments were extracted from the files")
+        
+        # Group similar treatments
+        def group():
+            result = self.research_agent.run(
+                f"Group any semantically similar treatments from this list: {json.dumps(treatments)}"
+            )
+            return result if isinstance(result, list) else treatments
+        
+        grouped_treatments, _ = self.stage_cache.run(
+            'group', {"treatments": hash_value(treatments)}, self.stage_templates['group'], group
+        )
+        
+        # Score every treatment's risk in one batch before the per-treatment agents run
+        self.precomputed_risk = {}
+        if 'risk_assessment' in stages:
+            self.precomputed_risk = {
+                (treatment.get('treatment_id', ''), treatment.get('treatment_name', '')): assessment
+                for treatment, assessment in zip(grouped_treatments, self.risk_engine.assess(grouped_treatments))
+            }
+        
+        # Map extractions to stable IDs and fingerprint their source content
+        self.identity_index.register_batch(grouped_treatments, source_hashes)
+        
+        # Write extracted treatments back into the knowledge store (keyed by name / stable ID, not the per-run id)
+        run_label = f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.knowledge_store.record_extracted_treatments(grouped_treatments, run_label=run_label)
+        self.reused_stages = 0
+        self.stage_outputs.clear()
+        
+        # Process each treatment
+        processed_treatments = []
+        treatment_reports = []
+        for treatment in grouped_treatments:
+            try:
+                # Output IDs of this treatment's inputs and stages; fingerprints use them instead of re-hashing
+                refs = {INPUT_STAGE: self.stage_outputs.put(
+                    INPUT_STAGE, {field: treatment.get(field) for field in TREATMENT_INPUT_FIELDS}
+                )}
+                # Create detailed description
+                if 'detailed_description' in stages:
+                    treatment['detailed_description'] = self._run_treatment_stage(
+                        treatment, refs, 'detailed_description',
+                        lambda: self.documenting_agent.run(
+                            f"Create a detailed description for this treatment: {json.dumps(treatment)}"
+                        ),
+                        lambda result: result if isinstance(result, str) else str(result)
+                    )
+                
+                # Perform risk assessment
+                if 'risk_assessment' in stages:
+                    treatment['risk_assessment'] = self._run_treatment_stage(
+                        treatment, refs, 'risk_assessment',
+                        lambda: self.risk_assessment_agent.run(
+                            f"Analyze risks for this treatment: {json.dumps(treatment)}"
+                        ),
+                        lambda result: result if isinstance(result, dict) else {}
+                    )
+                
+                # Analyze revenue opportunities
+                if 'revenue_analysis' in stages:
+                    treatment['revenue_analysis'] = self._run_treatment_stage(
+                        treatment, refs, 'revenue_analysis',
+                        lambda: self.revenue_identification_agent.run(
+                            f"Analyze revenue opportunities for this treatment: {json.dumps(treatment)}"
+                        ),
+                        lambda result: result if isinstance(result, dict) else {}
+                    )
+                
+                # Analyze customer impact
+                if 'customer_impact' in stages:
+                    treatment['customer_impact'] = self._run_treatment_stage(
+                        treatment, refs, 'customer_impact',
+                        lambda: self.revenue_identification_agent.run(
+                            f"Analyze customer impact for this treatment: {json.dumps(treatment)}"
+                        ),
+                        lambda result: result if isinstance(result, dict) else {}
+                    )
+                
+                # Generate the enhanced report from all of the above (opt-in section)
+                if 'enhanced_report' in stages:
+                    treatment['enhanced_report'] = self._run_treatment_stage(
+                        treatment, refs, 'enhanced_report',
+                        lambda: self.documenting_agent.run(
+                            f"Generate an enhanced report section for this treatment: {json.dumps(treatment)}"
+                        ),
+                        lambda result: result if isinstance(result, dict) else {"raw_content": str(result)}
+                    )
+                
+                processed_treatments.append(treatment)
+                treatment_reports.append(TreatmentReport.of(
+                    treatment.get('stable_id') or treatment.get('treatment_id', ''),
+                    treatment.get('treatment_name', ''), refs
+                ))
+            except Exception as e:
+                print_debug(f"Error processing treatment {treatment.get('treatment_name', 'Unknown')}: {str(e)}")
+                continue
+        
+        if self.reused_stages:
+            print_debug(f"Reused {self.reused_stages} stage results for treatments with unchanged sources")
+        
+        if not processed_treatments:
+            raise Exception("No treatments were successfully processed")
+        
+        # Append this run's metrics to the columnar results store
+        results_file = None
+        try:
+            results_file = self.results_store.append_run(processed_treatments, run_id=run_label)
+        except Exception as e:
+            print_debug(f"Error writing results store: {str(e)}")
+        
+        # Report document over the registered inputs and stage outputs; its fingerprint hashes IDs, not content
+        self.report_document = ReportDocument(
+            "Healthcare Treatment Analysis Report", tuple(treatment_reports), self.stage_outputs,
+            self.active_report_spec.sections
+        )
+        
+        # Generate final report, unless an identical report already exists at the output path
+        export_inputs = {
+            "treatments": self.report_document.fingerprint(),
+            "sections": list(self.active_report_spec.sections),
+            "output_path": output_path
+        }
+        export_key = self.stage_cache.input_hash('export', export_inputs, self.stage_templates['export'])
+        report_reused = self.stage_cache.get('export', export_key) is not None and Path(output_path).exists()
+        self.stage_cache.record('export', report_reused)
+        if not report_reused:
+            # Only a file this export actually wrote is cached; a report left from an earlier run is not
+            previous_mtime = Path(output_path).stat().st_mtime_ns if Path(output_path).exists() else None
+            result = self.emailing_agent.run(
+                f"Generate a Word document report for these treatments: {json.dumps(processed_treatments)}"
+            )
+            export_failed = isinstance(result, dict) and ("error" in result or result.get("status") == "error")
+            written = Path(output_path).exists() and Path(output_path).stat().st_mtime_ns != previous_mtime
+            if written and not export_failed:
+                self.stage_cache.put('export', export_key, export_inputs, {"output_path": output_path})
+            else:
+                print_debug(f"Word export did not write {output_path}; report not cached: {result}")
+        
+        # Lightweight formats render from the report model without building a docx tree
+        additional_reports = {}
+        report = report_from_treatments(self.report_document.records(), sections=self.active_report_spec.sections)
+        for report_format in self.report_formats:
+            report_path = str(Path(output_path).with_suffix(REPORT_FORMATS[report_format]['extension']))
+            additional_reports[report_format] = write_report(report, report_format, report_path)
+        
+        # Structural diff against the previous run's report
+        changes = {}
+        try:
+            changes = self._diff_against_last_report(report, output_path)
+        except Exception as e:
+            print_debug(f"Error diffing against the last report: {str(e)}")
+        
+        # Email the report; undelivered messages stay in the outbox and go out with the next drain
+        email_delivery = {}
+        if self.report_recipients:
+            subject = f"Healthcare Treatment Analysis Report - {datetime.now().strftime('%Y-%m-%d')}"
+            try:
+                if changes and self.email_changes_only:
+                    if changes['has_changes']:
+                        email_delivery = self._email_report(
+                            f"{subject} (changes)", changes['email_body'], [changes['changes_path']]
+                        )
+                    else:
+                        print_debug("No treatment changed since the last report; nothing emailed")
+                else:
+                    email_delivery = self._email_report(
+                        subject,
+                        f"Attached is the treatment analysis report covering {len(processed_treatments)} treatments.",
+                        [output_path] + list(additional_reports.values())
+                    )
+            except Exception as e:
+                print_debug(f"Error emailing report: {str(e)}")
+        
+        # Update processing results
+        self.processing_results.treatments = processed_treatments
+        self.processing_results.final_report = output_path
+        self.processing_results.approval_status = "completed"
+        
+        return {
+            "status": "success",
+            "treatments_processed": len(processed_treatments),
+            "output_path": output_path,
+            "additional_reports": additional_reports,
+            "changes": {key: value for key, value in changes.items() if key != 'email_body'},
+            "email_delivery": email_delivery,
+            "dedup_report": self.last_dedup_report,
+            "results_file": results_file,
+            "report_sections": list(self.active_report_spec.sections),
+            "stages_run": list(stages),
+            "reused_stages": self.reused_stages,
+            "stage_cache": self.stage_cache.stats,
+            "prompt_stats": self.prompts.summary(),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _stage_settings(self, stage: str) -> Dict[str, Any]:
+        """Local engine configuration a per-treatment stage depends on"""
+        if stage == 'risk_assessment':
+            return {"risk_weights": hash_value(vars(self.risk_engine.weights))}
+        if stage == 'customer_impact':
+            return {"segmentation": self.segmentation_engine.fingerprint}
+        return {}
+    
+    def _run_treatment_stage(self, treatment: Dict[str, Any], refs: Dict[str, Any], stage: str, run_stage, normalize):
+        """
+        Reuse a stage result whose recorded inputs and template are unchanged, otherwise run and record it.
+        
+        The result is registered in self.stage_outputs and its ref stored in refs[stage]; upstream
+        fingerprints come from those refs (the output ID is the same hash), so no output is re-encoded.
+        """
+        result = self._stage_result(treatment, refs, stage, run_stage, normalize)
+        refs[stage] = self.stage_outputs.put(stage, result)
+        return result
+    
+    def _stage_result(self, treatment: Dict[str, Any], refs: Dict[str, Any], stage: str, run_stage, normalize):
+        stable_id = treatment.get('stable_id')
+        inputs = {
+            "content": treatment.get('content_fingerprint'),
+            "treatment": refs[INPUT_STAGE].output_id,
+            "upstream": {
+                dependency: refs[dependency].output_id if dependency in refs else hash_value(treatment.get(dependency))
+                for dependency in STAGE_DEPENDENCIES[stage]
+            },
+            "settings": self._stage_settings(stage)
+        }
+        fingerprint = self.stage_cache.input_hash(stage, inputs, self.stage_templates[stage])
+        if stable_id:
+            cached = self.identity_index.get_stage_result(stable_id, stage, fingerprint)
+            if cached is not None:
+                self.reused_stages += 1
+                self.stage_cache.record(stage, True)
+                return cached
+        
+        result = normalize(run_stage())
+        self.stage_cache.record(stage, False)
+        if stable_id and result and not (isinstance(result, dict) and 'error' in result):
+            self.identity_index.save_stage_result(stable_id, stage, fingerprint, result)
+        return result
 
 def print_debug(message: str):
     """Helper function for debug printing"""
@@ -1185,5 +1649,9 @@ if __name__ == "__main__":
     
     # Process files and generate report
     output_path = "./hackathon_output/treatment_analysis_report.docx"
-    result = healthcare_system.process_files(input_files, output_path)
+    if len(sys.argv) > 1:
+        # Crawler mode: python file1.py <directory|archive.zip> [...]
+        result = healthcare_system.process_directory(sys.argv[1:], output_path)
+    else:
+        result = healthcare_system.process_files(input_files, output_path)
     print(f"Processing result: {json.dumps(result, indent=2)}")
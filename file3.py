@@ -26,6 +26,11 @@ from bs4 import BeautifulSoup
 import mammoth
 import pandas as pd
 
+# Single-pass Markdown to Word rendering
+from markdown_docx import render_markdown
+# Stage outputs registered once by content hash and referenced, not copied
+from stage_outputs import StageOutputs, OutputRef
+
 # Configure logging
 logging.getLogger("strands").setLevel(logging.DEBUG)
 logging.basicConfig(
@@ -39,15 +44,16 @@ class TreatmentData:
     treatment_id: str
     source: str
     raw_content: str
-    structured_content: str = ""
-    risk_assessment: str = ""
-    revenue_analysis: str = ""
+    # Stage outputs are referenced by ID in HealthcareAgentSystem.stage_outputs, not copied as JSON text
+    structured_content: Optional[OutputRef] = None
+    risk_assessment: Optional[OutputRef] = None
+    revenue_analysis: Optional[OutputRef] = None
 
 @dataclass
 class ProcessingResults:
     """Container for all processing results"""
     treatments: List[TreatmentData]
-    final_report: str = ""
+    final_report: Optional[OutputRef] = None
     approval_status: str = "pending"
 
 class HealthcareAgentSystem:
@@ -79,6 +85,8 @@ class HealthcareAgentSystem:
         
         # Initialize data storage
         self.processing_results = ProcessingResults(treatments=[])
+        # Stage outputs by content hash; serialized only when printed or written
+        self.stage_outputs = StageOutputs()
         
         # Setup output directory
         self.output_dir = Path("./hackathon_output")
@@ -359,7 +367,6 @@ class HealthcareAgentSystem:
         return aggregate_documents
     
     def _create_word_export_tool(self):
-        import re
         @tool
         def export_to_word(markdown_report: str, output_path: str) -> Dict[str, Any]:
             """
@@ -370,44 +377,7 @@ class HealthcareAgentSystem:
                 doc.add_heading('Healthcare Treatment Analysis Report', 0)
                 doc.add_paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                 doc.add_paragraph("")
-                lines = markdown_report.splitlines()
-                table = None
-                for line in lines:
-                    line = line.strip()
-                    # Headings
-                    if re.match(r'^#{1,6} ', line):
-                        level = len(line.split(' ')[0])
-                        text = line[level+1:].strip() if line.startswith('# ') else line[level:].strip()
-                        doc.add_heading(text, level=level)
-                        table = None
-                    # Table header
-                    elif '|' in line and re.match(r'^[^|]*\|[^|]*\|', line) and ('---' not in line):
-                        cells = [c.strip() for c in line.split('|') if c.strip()]
-                        if table is None:
-                            table = doc.add_table(rows=1, cols=len(cells))
-                            for i, cell in enumerate(cells):
-                                table.rows[0].cells[i].text = cell
-                        else:
-                            row_cells = table.add_row().cells
-                            for i, cell in enumerate(cells):
-                                row_cells[i].text = cell
-                    # Table separator (ignore)
-                    elif re.match(r'^\|?\s*-+\s*\|', line):
-                        continue
-                    # Bullet points
-                    elif line.startswith('- '):
-                        doc.add_paragraph(line[2:], style='List Bullet')
-                        table = None
-                    # Bold
-                    elif line.startswith('**') and line.endswith('**'):
-                        p = doc.add_paragraph()
-                        run = p.add_run(line.strip('*'))
-                        run.bold = True
-                        table = None
-                    # Paragraph
-                    elif line:
-                        doc.add_paragraph(line)
-                        table = None
+                render_markdown(doc, markdown_report)
                 doc.save(output_path)
                 return {
                     "status": "success",
@@ -484,7 +454,8 @@ class HealthcareAgentSystem:
         try:
             print_debug("Reading files...")
             file_reader_tool = self._create_file_reader_tool()
-            file_contents = [file_reader_tool(file_path=f) for f in input_files if "error" not in file_reader_tool(file_path=f)]
+            file_contents = [content for content in (file_reader_tool(file_path=f) for f in input_files)
+                             if "error" not in content]
             print_debug(f"Files read: {len(file_contents)}")
             print_debug("Extracting/grouping treatments with LLM...")
             research_tool = self._create_research_agent_tool()
@@ -515,17 +486,21 @@ class HealthcareAgentSystem:
                 treatment_id=treatment_id,
                 source="input_files",
                 raw_content="[LLM processed]",
-                structured_content=json.dumps(structured_treatments, indent=2),
-                risk_assessment=json.dumps(risks, indent=2),
-                revenue_analysis=json.dumps(revenues, indent=2)
+                structured_content=self.stage_outputs.put("structure", structured_treatments, output_id=f"{treatment_id}:structure"),
+                risk_assessment=self.stage_outputs.put("risk", risks, output_id=f"{treatment_id}:risk"),
+                revenue_analysis=self.stage_outputs.put("revenue", revenues, output_id=f"{treatment_id}:revenue")
             ))
-            self.processing_results.final_report = json.dumps(final_report)
+            report_ref = self.stage_outputs.put("report", final_report, output_id=f"{treatment_id}:report")
+            self.processing_results.final_report = report_ref
             print_debug("Process complete.")
-            print(json.dumps(final_report))
+            # Serialized once, at the output boundary: printed and returned as the JSON string callers expect
+            final_report_json = json.dumps(final_report)
+            print(final_report_json)
             return {
                 "status": "success",
                 "treatment_id": treatment_id,
-                "final_report": json.dumps(final_report),
+                "final_report": final_report_json,
+                "final_report_id": report_ref.output_id,
                 "word_output": output_path
             }
         except Exception as e:
@@ -26,6 +26,9 @@ from bs4 import BeautifulSoup
 import mammoth
 import pandas as pd
 
+# Single-pass Markdown to Word rendering
+from markdown_docx import render_markdown
+
 # Configure logging
 logging.getLogger("strands").setLevel(logging.DEBUG)
 logging.basicConfig(
@@ -359,7 +362,6 @@ class HealthcareAgentSystem:
         return aggregate_documents
     
     def _create_word_export_tool(self):
-        import re
         @tool
         def export_to_word(markdown_report: str, output_path: str) -> Dict[str, Any]:
             """
@@ -370,48 +372,7 @@ class HealthcareAgentSystem:
                 doc.add_heading('Healthcare Treatment Analysis Report', 0)
                 doc.add_paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                 doc.add_paragraph("")
-                lines = markdown_report.splitlines()
-                table = None
-                for line in lines:
-                    line = line.strip()
-                    # Headings
-                    if re.match(r'^#{1,6} ', line):
-                        level = len(line.split(' ')[0])
-                        text = line[level+1:].strip() if line.startswith('# ') else line[level:].strip()
-                        doc.add_heading(text, level=level)
-                        table = None
-                    # Table header
-                    elif '|' in line and re.match(r'^[^|]*\|[^|]*\|', line) and ('---' not in line):
-                        cells = [c.strip() for c in line.split('|') if c.strip()]
-                        if table is None:
-                            table = doc.add_table(rows=1, cols=len(cells))
-                            for i, cell in enumerate(cells):
-                                table.rows[0].cells[i].text = cell
-                        else:
-                            row_cells = table.add_row().cells
-                            for i, cell in enumerate(cells):
-                                row_cells[i].text = cell
-                    # Table separator (ignore)
-                    elif re.match(r'^\|?\s*-+\s*\|', line):
-                        continue
-                    # Bullet points
-                    elif line.startswith('- '):
-                        doc.add_paragraph(line[2:], style='List Bullet')
-                        table = None
-                    # Bold
-                    elif line.startswith('**') and line.endswith('**'):
-                        p = doc.add_paragraph()
-                        run = p.add_run(line.strip('*'))
-                        run.bold = True
-                        table = None
-                    # Graphical trends (unicode bars/sparklines or chart placeholders)
-                    elif re.search(r'[▁▂▃▄▅▆▇█]+', line):
-                        doc.add_paragraph(line, style='Intense Quote')
-                        table = None
-                    # Paragraph
-                    elif line:
-                        doc.add_paragraph(line)
-                        table = None
+                render_markdown(doc, markdown_report)
                 doc.save(output_path)
                 return {
                     "status": "success",
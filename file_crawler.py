@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+File Crawler - directory and archive ingestion for the treatment pipeline
+Walks folders and zip archives (streaming, no extraction to disk), filters by glob,
+dedupes by content hash and feeds a bounded queue into a parse worker pool
+"""
+
+import fnmatch
+import hashlib
+import io
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Iterator
+
+DEFAULT_INCLUDE = ["*.html", "*.htm", "*.txt", "*.pdf", "*.docx"]
+HASH_BLOCK_SIZE = 1024 * 1024
+# Nested archives are spooled to a temporary file once larger than this; archive
+# members above it are extracted to a temporary file instead of held in memory
+ARCHIVE_SPOOL_BYTES = 8 * 1024 * 1024
+MAX_ARCHIVE_DEPTH = 2
+# Failures of a single file or archive member; they are counted and the crawl continues
+# (RuntimeError: encrypted member, NotImplementedError: unsupported compression)
+READ_ERRORS = (zipfile.BadZipFile, zlib.error, OSError, RuntimeError, NotImplementedError)
+
+
+@dataclass
+class CrawlBudget:
+    """Limits applied to a single crawl"""
+    max_files: Optional[int] = None
+    max_bytes: Optional[int] = None
+    max_seconds: Optional[float] = None
+
+
+@dataclass
+class CrawledFile:
+    """A file discovered by the crawler, either on disk or inside an archive"""
+    display_path: str
+    file_name: str
+    file_extension: str
+    size: int
+    content_hash: str
+    disk_path: Optional[str] = None
+    data: Optional[bytes] = None
+    # disk_path is a temporary extraction of an archive member, deleted by close()
+    temporary: bool = False
+
+    def open(self):
+        """Open the file contents as a binary stream"""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return open(self.disk_path, "rb")
+
+    def close(self):
+        """Delete the temporary extraction, if any"""
+        if self.temporary and self.disk_path:
+            try:
+                os.remove(self.disk_path)
+            except FileNotFoundError:
+                pass
+            self.temporary = False
+
+
+@dataclass
+class CrawlStats:
+    """Counters reported at the end of a crawl"""
+    files_seen: int = 0
+    files_queued: int = 0
+    duplicates_skipped: int = 0
+    filtered_out: int = 0
+    bytes_queued: int = 0
+    errors: int = 0
+    budget_exhausted: str = ""
+    duplicate_paths: Dict[str, List[str]] = field(default_factory=dict)
+    # {path: error} of files and archive members that could not be read
+    error_paths: Dict[str, str] = field(default_factory=dict)
+
+
+class FileCrawler:
+    """Directory and zip archive crawler with glob filters, hash dedupe and budgets"""
+
+    def __init__(self, roots: List[str], include: Optional[List[str]] = None,
+                 exclude: Optional[List[str]] = None, budget: Optional[CrawlBudget] = None,
+                 queue_size: int = 32):
+        self.roots = [Path(root) for root in roots]
+        self.include = include or DEFAULT_INCLUDE
+        self.exclude = exclude or []
+        self.budget = budget or CrawlBudget()
+        self.queue_size = queue_size
+        self.stats = CrawlStats()
+        self._seen_hashes: Dict[str, str] = {}
+        self._started_at = 0.0
+
+    # ==================== DISCOVERY ====================
+
+    def iter_files(self) -> Iterator[CrawledFile]:
+        """
+        Yield unique files that pass the filters, stopping when the budget is exhausted.
+
+        Unreadable files and corrupt archives are counted in stats.errors and skipped.
+        Large archive members are extracted to temporary files; call close() on each
+        yielded file once it has been parsed.
+        """
+        self._started_at = time.monotonic()
+        self.stats = CrawlStats()
+        self._seen_hashes = {}
+
+        for root in self.roots:
+            if root.is_file():
+                candidates = [root]
+            else:
+                candidates = self._walk(root)
+
+            for path in candidates:
+                if self._budget_exhausted():
+                    return
+                if path.suffix.lower() == ".zip":
+                    try:
+                        archive = zipfile.ZipFile(path)
+                    except READ_ERRORS as e:
+                        self._record_error(str(path), e)
+                        continue
+                    with archive:
+                        for crawled in self._iter_archive(archive, str(path), depth=1):
+                            yield crawled
+                            if self._budget_exhausted():
+                                return
+                    continue
+
+                self.stats.files_seen += 1
+                if not self._matches(path.name, str(path)):
+                    self.stats.filtered_out += 1
+                    continue
+
+                try:
+                    size = path.stat().st_size
+                    content_hash = self._hash_stream(open(path, "rb"))
+                except READ_ERRORS as e:
+                    self._record_error(str(path), e)
+                    continue
+                crawled = CrawledFile(
+                    display_path=str(path),
+                    file_name=path.name,
+                    file_extension=path.suffix.lower(),
+                    size=size,
+                    content_hash=content_hash,
+                    disk_path=str(path)
+                )
+                if self._accept(crawled):
+                    yield crawled
+
+    def _walk(self, root: Path) -> Iterator[Path]:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                yield Path(dirpath) / filename
+
+    def _iter_archive(self, archive: zipfile.ZipFile, archive_path: str, depth: int) -> Iterator[CrawledFile]:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if self._budget_exhausted():
+                return
+
+            member_path = f"{archive_path}!{info.filename}"
+            member_name = Path(info.filename).name
+            extension = Path(info.filename).suffix.lower()
+
+            if extension == ".zip" and depth < MAX_ARCHIVE_DEPTH:
+                if (self.budget.max_bytes is not None
+                        and self.stats.bytes_queued + info.file_size > self.budget.max_bytes):
+                    # Its members could not all be queued anyway; skip rather than unpack it
+                    self.stats.filtered_out += 1
+                    continue
+                # zipfile needs a seekable file: spool the member (to disk past ARCHIVE_SPOOL_BYTES)
+                with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES) as spool:
+                    try:
+                        with archive.open(info) as member:
+                            shutil.copyfileobj(member, spool, HASH_BLOCK_SIZE)
+                        spool.seek(0)
+                        nested = zipfile.ZipFile(spool)
+                    except READ_ERRORS as e:
+                        self._record_error(member_path, e)
+                        continue
+                    with nested:
+                        yield from self._iter_archive(nested, member_path, depth + 1)
+                continue
+
+            self.stats.files_seen += 1
+            if not self._matches(member_name, member_path):
+                self.stats.filtered_out += 1
+                continue
+
+            try:
+                crawled = self._read_member(archive, info, member_path, member_name, extension)
+            except READ_ERRORS as e:
+                self._record_error(member_path, e)
+                continue
+            if self._accept(crawled):
+                yield crawled
+            else:
+                crawled.close()
+
+    def _read_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo, member_path: str,
+                     member_name: str, extension: str) -> CrawledFile:
+        """
+        Read an archive member once, hashing as we go. Small members stay in memory;
+        members over ARCHIVE_SPOOL_BYTES go to a temporary file (disk_path), which
+        keeps queued bytes in memory bounded and lets large text reach the streaming reader.
+        """
+        hasher = hashlib.sha256()
+        if info.file_size <= ARCHIVE_SPOOL_BYTES:
+            buffer = io.BytesIO()
+            with archive.open(info) as member:
+                for block in iter(lambda: member.read(HASH_BLOCK_SIZE), b""):
+                    hasher.update(block)
+                    buffer.write(block)
+            return CrawledFile(member_path, member_name, extension, info.file_size,
+                               hasher.hexdigest(), data=buffer.getvalue())
+
+        fd, temp_path = tempfile.mkstemp(prefix="crawl_", suffix=extension)
+        try:
+            with os.fdopen(fd, "wb") as out, archive.open(info) as member:
+                for block in iter(lambda: member.read(HASH_BLOCK_SIZE), b""):
+                    hasher.update(block)
+                    out.write(block)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return CrawledFile(member_path, member_name, extension, info.file_size,
+                           hasher.hexdigest(), disk_path=temp_path, temporary=True)
+
+    def _matches(self, name: str, full_path: str) -> bool:
+        if any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(full_path, pattern) for pattern in self.exclude):
+            return False
+        return any(fnmatch.fnmatch(name.lower(), pattern.lower()) or fnmatch.fnmatch(full_path, pattern)
+                   for pattern in self.include)
+
+    def _hash_stream(self, stream) -> str:
+        hasher = hashlib.sha256()
+        with stream:
+            for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def _record_error(self, path: str, error: Exception):
+        self.stats.errors += 1
+        self.stats.error_paths[path] = f"{type(error).__name__}: {error}"
+
+    def _accept(self, crawled: CrawledFile) -> bool:
+        first_path = self._seen_hashes.get(crawled.content_hash)
+        if first_path is not None:
+            self.stats.duplicates_skipped += 1
+            self.stats.duplicate_paths.setdefault(first_path, []).append(crawled.display_path)
+            return False
+
+        if self.budget.max_bytes is not None and self.stats.bytes_queued + crawled.size > self.budget.max_bytes:
+            self.stats.budget_exhausted = "max_bytes"
+            return False
+
+        self._seen_hashes[crawled.content_hash] = crawled.display_path
+        self.stats.files_queued += 1
+        self.stats.bytes_queued += crawled.size
+        return True
+
+    def _budget_exhausted(self) -> bool:
+        if self.stats.budget_exhausted:
+            return True
+        if self.budget.max_files is not None and self.stats.files_queued >= self.budget.max_files:
+            self.stats.budget_exhausted = "max_files"
+        elif self.budget.max_seconds is not None and time.monotonic() - self._started_at >= self.budget.max_seconds:
+            self.stats.budget_exhausted = "max_seconds"
+        return bool(self.stats.budget_exhausted)
+
+    # ==================== PARSE POOL ====================
+
+    def run(self, parse_fn: Callable[[CrawledFile], Dict[str, Any]], workers: int = 4) -> List[Dict[str, Any]]:
+        """
+        Crawl and parse files concurrently through a bounded queue.
+
+        Args:
+            parse_fn: Function turning a CrawledFile into a file content dict
+            workers: Number of parse worker threads
+
+        Returns:
+            Parsed results in discovery order (errors included as {"error": ...} dicts)
+        """
+        work_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        results: Dict[int, Dict[str, Any]] = {}
+        results_lock = threading.Lock()
+        sentinel = object()
+
+        def worker():
+            while True:
+                item = work_queue.get()
+                if item is sentinel:
+                    break
+                position, crawled = item
+                try:
+                    parsed = parse_fn(crawled)
+                except Exception as e:
+                    parsed = {"error": f"Error parsing {crawled.display_path}: {str(e)}"}
+                finally:
+                    crawled.close()
+                with results_lock:
+                    results[position] = parsed
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for position, crawled in enumerate(self.iter_files()):
+                # Blocks when the parse pool falls behind, keeping memory bounded
+                work_queue.put((position, crawled))
+        finally:
+            for _ in threads:
+                work_queue.put(sentinel)
+            for thread in threads:
+                thread.join()
+
+        return [results[position] for position in sorted(results)]
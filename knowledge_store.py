@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Treatment Knowledge Store - persistent, indexed treatment attributes
+SQLite (FTS5) backed replacement for the hardcoded medical knowledge dict
+"""
+
+import csv
+import difflib
+import json
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+
+DEFAULT_KNOWLEDGE = [
+    {
+        "treatment_id": "treatment_1",
+        "treatment_name": "Cardiovascular Treatment",
+        "category": "Cardiovascular",
+        "complexity": "High",
+        "typical_duration": "6-12 months",
+        "success_rate": "85%",
+        "common_complications": ["bleeding", "infection"]
+    },
+    {
+        "treatment_id": "treatment_2",
+        "treatment_name": "Orthopedic Treatment",
+        "category": "Orthopedic",
+        "complexity": "Medium",
+        "typical_duration": "3-6 months",
+        "success_rate": "90%",
+        "common_complications": ["swelling", "limited mobility"]
+    },
+    {
+        "treatment_id": "treatment_3",
+        "treatment_name": "Neurological Treatment",
+        "category": "Neurological",
+        "complexity": "High",
+        "typical_duration": "12-24 months",
+        "success_rate": "70%",
+        "common_complications": ["cognitive effects", "fatigue"]
+    },
+    {
+        "treatment_id": "treatment_4",
+        "treatment_name": "Oncological Treatment",
+        "category": "Oncological",
+        "complexity": "Very High",
+        "typical_duration": "6-18 months",
+        "success_rate": "75%",
+        "common_complications": ["nausea", "hair loss", "immunosuppression"]
+    },
+    {
+        "treatment_id": "treatment_7",
+        "treatment_name": "Endocrine Treatment",
+        "category": "Endocrine",
+        "complexity": "Medium",
+        "typical_duration": "Lifelong",
+        "success_rate": "95%",
+        "common_complications": ["weight changes", "mood changes"]
+    },
+    {
+        "treatment_id": "treatment_8",
+        "treatment_name": "Respiratory Treatment",
+        "category": "Respiratory",
+        "complexity": "Medium",
+        "typical_duration": "1-3 months",
+        "success_rate": "88%",
+        "common_complications": ["cough", "throat irritation"]
+    }
+]
+
+UNKNOWN_KNOWLEDGE = {
+    "category": "General",
+    "complexity": "Unknown",
+    "typical_duration": "Variable",
+    "success_rate": "Unknown",
+    "common_complications": []
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS treatments (
+    treatment_id TEXT PRIMARY KEY,
+    treatment_name TEXT NOT NULL,
+    normalized_name TEXT NOT NULL,
+    category TEXT,
+    complexity TEXT,
+    typical_duration TEXT,
+    success_rate TEXT,
+    common_complications TEXT,
+    details TEXT,
+    source TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_treatments_normalized_name ON treatments(normalized_name);
+CREATE INDEX IF NOT EXISTS idx_treatments_category ON treatments(category);
+CREATE VIRTUAL TABLE IF NOT EXISTS treatments_fts USING fts5(
+    treatment_name, category, common_complications, details,
+    content='treatments', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS treatments_ai AFTER INSERT ON treatments BEGIN
+    INSERT INTO treatments_fts(rowid, treatment_name, category, common_complications, details)
+    VALUES (new.rowid, new.treatment_name, new.category, new.common_complications, new.details);
+END;
+CREATE TRIGGER IF NOT EXISTS treatments_ad AFTER DELETE ON treatments BEGIN
+    INSERT INTO treatments_fts(treatments_fts, rowid, treatment_name, category, common_complications, details)
+    VALUES ('delete', old.rowid, old.treatment_name, old.category, old.common_complications, old.details);
+END;
+CREATE TRIGGER IF NOT EXISTS treatments_au AFTER UPDATE ON treatments BEGIN
+    INSERT INTO treatments_fts(treatments_fts, rowid, treatment_name, category, common_complications, details)
+    VALUES ('delete', old.rowid, old.treatment_name, old.category, old.common_complications, old.details);
+    INSERT INTO treatments_fts(rowid, treatment_name, category, common_complications, details)
+    VALUES (new.rowid, new.treatment_name, new.category, new.common_complications, new.details);
+END;
+"""
+
+UPSERT_SQL = """
+INSERT INTO treatments (
+    treatment_id, treatment_name, normalized_name, category, complexity,
+    typical_duration, success_rate, common_complications, details, source, updated_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(treatment_id) DO UPDATE SET
+    treatment_name = excluded.treatment_name,
+    normalized_name = excluded.normalized_name,
+    category = COALESCE(excluded.category, treatments.category),
+    complexity = COALESCE(excluded.complexity, treatments.complexity),
+    typical_duration = COALESCE(excluded.typical_duration, treatments.typical_duration),
+    success_rate = COALESCE(excluded.success_rate, treatments.success_rate),
+    common_complications = COALESCE(excluded.common_complications, treatments.common_complications),
+    details = COALESCE(excluded.details, treatments.details),
+    source = excluded.source,
+    updated_at = excluded.updated_at
+"""
+
+
+def normalize_treatment_name(name: str) -> str:
+    """Normalize a treatment name for exact and fuzzy matching"""
+    return " ".join(re.findall(r"[a-z0-9]+", (name or "").lower()))
+
+
+class TreatmentKnowledgeStore:
+    """Persistent treatment knowledge base with id, fuzzy name and full-text lookups"""
+
+    def __init__(self, db_path: str = "./hackathon_output/treatment_knowledge.db", seed_defaults: bool = True):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+        if seed_defaults and self.count() == 0:
+            self.bulk_import(DEFAULT_KNOWLEDGE, source="seed")
+
+    def close(self):
+        self.conn.close()
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM treatments").fetchone()[0]
+
+    # ==================== BULK IMPORT ====================
+
+    def bulk_import(self, records: Iterable[Dict[str, Any]], source: str = "import") -> int:
+        """
+        Insert or update many treatment records in a single transaction.
+
+        Args:
+            records: Iterable of treatment attribute dicts
+            source: Provenance label stored with each record
+
+        Returns:
+            Number of records written
+        """
+        timestamp = datetime.now().isoformat()
+        rows = [self._to_row(record, source, timestamp) for record in records]
+        rows = [row for row in rows if row is not None]
+        with self.conn:
+            self.conn.executemany(UPSERT_SQL, rows)
+        return len(rows)
+
+    def import_file(self, file_path: str) -> int:
+        """
+        Bulk import treatments from a JSON (list of objects), JSONL or CSV file.
+
+        Args:
+            file_path: Path to the file to import
+
+        Returns:
+            Number of records written
+        """
+        path = Path(file_path)
+        suffix = path.suffix.lower()
+
+        if suffix == ".csv":
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                return self.bulk_import(csv.DictReader(f), source=path.name)
+        elif suffix == ".jsonl":
+            with open(path, "r", encoding="utf-8") as f:
+                return self.bulk_import((json.loads(line) for line in f if line.strip()), source=path.name)
+        elif suffix == ".json":
+            with open(path, "r", encoding="utf-8") as f:
+                return self.bulk_import(json.load(f), source=path.name)
+        else:
+            raise ValueError(f"Unsupported knowledge import format: {suffix}")
+
+    def record_extracted_treatments(self, treatments: List[Dict[str, Any]], run_label: str = "pipeline") -> int:
+        """
+        Write treatments extracted by a pipeline run back into the store.
+
+        Extraction numbers treatments per run (TREAT_001, ...), so those ids never key the
+        write-back: a treatment updates the stored row with the same normalized name, and
+        otherwise gets its stable_id (when the identity index assigned one) or a name-derived id.
+        """
+        records = []
+        for treatment in treatments:
+            if not isinstance(treatment, dict) or "error" in treatment:
+                continue
+            name = treatment.get("treatment_name") or treatment.get("name")
+            normalized = normalize_treatment_name(str(name or ""))
+            if not normalized:
+                continue
+            row = self.conn.execute(
+                "SELECT treatment_id FROM treatments WHERE normalized_name = ? ORDER BY rowid LIMIT 1", (normalized,)
+            ).fetchone()
+            if row:
+                treatment_id = row[0]
+            else:
+                treatment_id = treatment.get("stable_id") or normalized.replace(" ", "_")
+            records.append({**treatment, "treatment_id": treatment_id})
+        return self.bulk_import(records, source=run_label)
+
+    # ==================== QUERIES ====================
+
+    def get(self, treatment_id: str) -> Optional[Dict[str, Any]]:
+        """Exact lookup by treatment id"""
+        row = self.conn.execute("SELECT * FROM treatments WHERE treatment_id = ?", (treatment_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def find_by_name(self, name: str, limit: int = 5, cutoff: float = 0.75) -> List[Dict[str, Any]]:
+        """
+        Fuzzy lookup by treatment name.
+
+        Tries an exact normalized-name match first, then a prefix/substring
+        match, then difflib similarity over the stored names.
+        """
+        normalized = normalize_treatment_name(name)
+        if not normalized:
+            return []
+
+        rows = self.conn.execute(
+            "SELECT * FROM treatments WHERE normalized_name = ? LIMIT ?", (normalized, limit)
+        ).fetchall()
+        if rows:
+            return [self._from_row(row) for row in rows]
+
+        rows = self.conn.execute(
+            "SELECT * FROM treatments WHERE normalized_name LIKE ? LIMIT ?", (f"%{normalized}%", limit)
+        ).fetchall()
+        if rows:
+            return [self._from_row(row) for row in rows]
+
+        names = [row[0] for row in self.conn.execute("SELECT DISTINCT normalized_name FROM treatments")]
+        matches = difflib.get_close_matches(normalized, names, n=limit, cutoff=cutoff)
+        results = []
+        for match in matches:
+            row = self.conn.execute("SELECT * FROM treatments WHERE normalized_name = ?", (match,)).fetchone()
+            if row:
+                results.append(self._from_row(row))
+        return results
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Full-text search over names, categories, complications and details (BM25 ranked)"""
+        terms = re.findall(r"[A-Za-z0-9]+", query or "")
+        if not terms:
+            return []
+        match_expr = " OR ".join(f'"{term}"' for term in terms)
+        rows = self.conn.execute(
+            """
+            SELECT t.* FROM treatments_fts
+            JOIN treatments t ON t.rowid = treatments_fts.rowid
+            WHERE treatments_fts MATCH ?
+            ORDER BY bm25(treatments_fts)
+            LIMIT ?
+            """,
+            (match_expr, limit)
+        ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def lookup(self, treatment_id: str, query: str = "") -> Dict[str, Any]:
+        """Resolve knowledge by id, then fuzzy name, then full-text query; falls back to unknown defaults"""
+        record = self.get(treatment_id)
+        match_type = "exact_id"
+
+        if record is None:
+            matches = self.find_by_name(treatment_id, limit=1)
+            record = matches[0] if matches else None
+            match_type = "fuzzy_name"
+
+        if record is None and query:
+            matches = self.search(query, limit=1)
+            record = matches[0] if matches else None
+            match_type = "full_text"
+
+        if record is None:
+            return {"match_type": "none", "knowledge": dict(UNKNOWN_KNOWLEDGE)}
+
+        return {
+            "match_type": match_type,
+            "knowledge": {
+                "category": record["category"],
+                "complexity": record["complexity"],
+                "typical_duration": record["typical_duration"],
+                "success_rate": record["success_rate"],
+                "common_complications": record["common_complications"]
+            }
+        }
+
+    # ==================== ROW CONVERSION ====================
+
+    def _to_row(self, record: Dict[str, Any], source: str, timestamp: str):
+        treatment_id = record.get("treatment_id")
+        name = record.get("treatment_name") or record.get("name") or treatment_id
+        if not treatment_id and not name:
+            return None
+        if not treatment_id:
+            treatment_id = normalize_treatment_name(name).replace(" ", "_")
+
+        complications = record.get("common_complications")
+        if isinstance(complications, str):
+            complications = [c.strip() for c in complications.split(";") if c.strip()]
+
+        details = record.get("raw_details") or record.get("details")
+
+        return (
+            str(treatment_id),
+            str(name),
+            normalize_treatment_name(str(name)),
+            record.get("category"),
+            record.get("complexity"),
+            record.get("typical_duration"),
+            record.get("success_rate"),
+            json.dumps(complications) if complications is not None else None,
+            str(details) if details is not None else None,
+            source,
+            timestamp
+        )
+
+    def _from_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["common_complications"] = json.loads(record["common_complications"]) if record["common_complications"] else []
+        return record
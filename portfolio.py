@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Portfolio Engine - ranking and budget-constrained selection across treatments
+Vectorized risk-adjusted scoring, Pareto fronts on risk vs revenue, a knapsack
+over pilot costs and heap-based top-k ranking for the report conclusions
+"""
+
+import heapq
+import re
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from revenue_engine import project_revenue_batch
+
+MONEY_PATTERN = re.compile(r"\$?\s*(\d+(?:,\d{3})*(?:\.\d+)?)\s*([kmb])?", re.IGNORECASE)
+MONEY_SUFFIXES = {"k": 1e3, "m": 1e6, "b": 1e9}
+DEFAULT_RISK_SCORE = 5.0
+# Above this many DP cells the knapsack falls back to a greedy value/cost pass
+MAX_KNAPSACK_CELLS = 50_000_000
+
+
+@dataclass
+class PortfolioConfig:
+    """Assumptions for portfolio ranking and pilot selection"""
+    pilot_budget: float = 250000.0
+    base_pilot_cost: float = 40000.0
+    # Extra pilot cost per risk point (monitoring, provider onboarding)
+    pilot_cost_per_risk_point: float = 5000.0
+    # Share of projected revenue discounted per risk point in the ranking score
+    risk_discount_per_point: float = 0.08
+    cost_unit: float = 1000.0
+    top_k: int = 20
+
+
+def parse_money(value: Any) -> Optional[float]:
+    """Parse numbers like 1200000, "$1.2M" or "$500K - $2M" (midpoint of a range)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+
+    amounts = []
+    for number, suffix in MONEY_PATTERN.findall(value):
+        amount = float(number.replace(",", ""))
+        if suffix:
+            amount *= MONEY_SUFFIXES[suffix.lower()]
+        amounts.append(amount)
+    if not amounts:
+        return None
+    return (min(amounts) + max(amounts)) / 2
+
+
+def _risk_score(treatment: Dict[str, Any]) -> float:
+    risk = treatment.get("risk_assessment") or {}
+    try:
+        return float(risk.get("overall_risk_score", DEFAULT_RISK_SCORE))
+    except (TypeError, ValueError, AttributeError):
+        return DEFAULT_RISK_SCORE
+
+
+def _revenue_estimate(treatment: Dict[str, Any]) -> Optional[float]:
+    """Best available revenue figure: Monte Carlo median, then the LLM year-1 projection"""
+    revenue = treatment.get("revenue_analysis") or {}
+    if not isinstance(revenue, dict):
+        return None
+    sensitivity = revenue.get("sensitivity_analysis")
+    if isinstance(sensitivity, dict) and "revenue_p50" in sensitivity:
+        return float(sensitivity["revenue_p50"])
+    return parse_money(revenue.get("revenue_projection_year1"))
+
+
+def pareto_ranks(risk: np.ndarray, revenue: np.ndarray) -> np.ndarray:
+    """
+    Non-dominated sorting on (minimize risk, maximize revenue).
+
+    Returns:
+        Front index per treatment (0 = Pareto-optimal)
+    """
+    n = len(risk)
+    ranks = np.full(n, -1, dtype=int)
+    # Sort by risk ascending, then revenue descending; one vectorized sweep peels one front
+    order = np.lexsort((-revenue, risk))
+    remaining = order
+    front = 0
+    while remaining.size:
+        risk_sorted = risk[remaining]
+        revenue_sorted = revenue[remaining]
+        best_before = np.concatenate(([-np.inf], np.maximum.accumulate(revenue_sorted)[:-1]))
+        on_front = revenue_sorted > best_before
+        # Identical (risk, revenue) points share the fate of the first one in their run
+        run_start = np.ones(remaining.size, dtype=bool)
+        run_start[1:] = (risk_sorted[1:] != risk_sorted[:-1]) | (revenue_sorted[1:] != revenue_sorted[:-1])
+        first_of_run = np.maximum.accumulate(np.where(run_start, np.arange(remaining.size), 0))
+        on_front = on_front[first_of_run]
+
+        ranks[remaining[on_front]] = front
+        remaining = remaining[~on_front]
+        front += 1
+    return ranks
+
+
+def select_within_budget(values: np.ndarray, costs: np.ndarray, budget: float,
+                         cost_unit: float = 1000.0) -> np.ndarray:
+    """
+    0/1 knapsack maximizing total value with total cost <= budget.
+
+    Costs are rounded up to cost_unit so the DP table stays small; very large
+    instances fall back to a greedy value-per-cost selection.
+
+    Returns:
+        Boolean selection mask
+    """
+    n = len(values)
+    selected = np.zeros(n, dtype=bool)
+    capacity = int(budget // cost_unit)
+    if n == 0 or capacity <= 0:
+        return selected
+
+    weights = np.maximum(1, np.ceil(costs / cost_unit).astype(int))
+    candidates = np.flatnonzero((values > 0) & (weights <= capacity))
+
+    if len(candidates) * (capacity + 1) > MAX_KNAPSACK_CELLS:
+        remaining = capacity
+        for index in sorted(candidates, key=lambda i: values[i] / weights[i], reverse=True):
+            if weights[index] <= remaining:
+                selected[index] = True
+                remaining -= weights[index]
+        return selected
+
+    best = np.zeros(capacity + 1)
+    taken = np.zeros((len(candidates), capacity + 1), dtype=bool)
+    for row, index in enumerate(candidates):
+        weight = weights[index]
+        with_item = best[:-weight] + values[index]
+        improved = with_item > best[weight:]
+        taken[row, weight:] = improved
+        best[weight:] = np.where(improved, with_item, best[weight:])
+
+    remaining = capacity
+    for row in range(len(candidates) - 1, -1, -1):
+        if taken[row, remaining]:
+            index = candidates[row]
+            selected[index] = True
+            remaining -= weights[index]
+    return selected
+
+
+def rank_portfolio(treatments: List[Dict[str, Any]], config: Optional[PortfolioConfig] = None) -> Dict[str, Any]:
+    """
+    Rank processed treatments and pick the pilot set that fits the budget.
+
+    Args:
+        treatments: Processed treatment dicts (risk_assessment / revenue_analysis attached)
+        config: Portfolio assumptions
+
+    Returns:
+        Dict with the ranked table (top_k rows), the selected pilot set and totals
+    """
+    config = config or PortfolioConfig()
+    n = len(treatments)
+    if n == 0:
+        return {"ranked": [], "selected": [], "total_pilot_cost": 0.0,
+                "total_selected_revenue": 0.0, "pareto_optimal": 0, "budget": config.pilot_budget}
+
+    risk = np.clip(np.array([_risk_score(t) for t in treatments], dtype=float), 0.0, 10.0)
+    estimates = [_revenue_estimate(t) for t in treatments]
+    # Treatments without a usable figure get the deterministic projection for their risk score
+    revenue = np.where(
+        [value is None for value in estimates],
+        project_revenue_batch(risk)["total_annual_projection"],
+        [value if value is not None else 0.0 for value in estimates]
+    )
+    costs = np.array([
+        parse_money(t.get("pilot_cost")) or config.base_pilot_cost + config.pilot_cost_per_risk_point * r
+        for t, r in zip(treatments, risk)
+    ])
+
+    scores = revenue * np.clip(1 - config.risk_discount_per_point * risk, 0.0, None)
+    fronts = pareto_ranks(risk, revenue)
+    selected = select_within_budget(scores, costs, config.pilot_budget, config.cost_unit)
+
+    top = heapq.nlargest(min(config.top_k, n), range(n), key=lambda i: (scores[i], -risk[i]))
+
+    def row(rank: int, i: int) -> Dict[str, Any]:
+        return {
+            "rank": rank,
+            "treatment_id": treatments[i].get("treatment_id", "Unknown"),
+            "treatment_name": treatments[i].get("treatment_name", "Unknown Treatment"),
+            "risk_score": round(float(risk[i]), 1),
+            "projected_revenue": round(float(revenue[i]), 2),
+            "risk_adjusted_score": round(float(scores[i]), 2),
+            "pilot_cost": round(float(costs[i]), 2),
+            "pareto_front": int(fronts[i]),
+            "selected_for_pilot": bool(selected[i])
+        }
+
+    selected_order = sorted(np.flatnonzero(selected), key=lambda i: scores[i], reverse=True)
+    return {
+        "ranked": [row(rank, i) for rank, i in enumerate(top, start=1)],
+        "selected": [row(rank, i) for rank, i in enumerate(selected_order, start=1)],
+        "total_pilot_cost": round(float(costs[selected].sum()), 2),
+        "total_selected_revenue": round(float(revenue[selected].sum()), 2),
+        "pareto_optimal": int((fronts == 0).sum()),
+        "budget": config.pilot_budget
+    }
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Prompt Templates - versioned, precompiled LLM prompt registry
+Templates are loaded once at startup, split into literal and variable parts,
+and identified by a content hash so caches and call statistics can be
+attributed to the exact template version that produced them
+"""
+
+import hashlib
+import textwrap
+import time
+from pathlib import Path
+from string import Template
+from typing import Dict, Any, Optional, List, Tuple, Callable, Iterable
+
+TREATMENT_EXTRACTION = """
+You are an expert medical treatment analyst for CareCredit, a healthcare financing company.
+Analyze the following documents and extract ALL DISTINCT medical treatments mentioned.
+
+For each treatment found:
+1. Assign a unique treatment_id (e.g., TREAT_001, TREAT_002, etc.)
+2. Provide a clear treatment_name
+3. List ALL source files that mention this treatment
+4. Extract detailed information about the treatment
+5. Note any competitor financing options mentioned
+6. Identify target demographics or patient populations
+
+IMPORTANT:
+- Each treatment should be separate and distinct
+- Do not group everything under one treatment
+- Look for medical procedures, therapies, surgeries, diagnostic tests, etc.
+- Include both established and emerging treatments
+- Note any pricing or cost information mentioned
+
+Return a JSON array of treatments with this structure:
+{
+    "treatment_id": "TREAT_XXX",
+    "treatment_name": "Clear Name of Treatment",
+    "source_files": ["file1.html", "file2.pdf"],
+    "category": "surgery/therapy/diagnostic/etc",
+    "raw_details": "All relevant information extracted",
+    "competitor_info": "Any competitor financing mentioned",
+    "cost_info": "Any cost/pricing information",
+    "target_demographics": "Patient population info"
+}
+
+Documents to analyze:
+$all_content
+"""
+
+TREATMENT_GROUPING = """
+You are a medical treatment analyst. Review the following treatments and group any that are semantically similar.
+
+For each final group:
+1. Merge information from similar treatments
+2. Create a comprehensive description
+3. Combine source files
+4. Preserve all unique details
+5. Assign a clear, descriptive name
+
+Treatments to analyze:
+$treatments_json
+
+Return a JSON array of grouped treatments with merged information.
+Ensure each treatment has comprehensive details and all source files are preserved.
+"""
+
+DETAILED_DESCRIPTION = """
+You are a medical writer creating detailed treatment documentation for CareCredit's business team.
+
+Create a comprehensive, detailed description (minimum 500 words) for the following treatment:
+
+Treatment: $treatment_name
+Details: $raw_details
+Category: $category
+Sources: $source_files
+
+Relevant Source Passages:
+$passages
+
+Your description should include:
+1. **Overview** (2-3 paragraphs): What is this treatment, why is it important
+2. **Medical Details** (2-3 paragraphs): How it works, who needs it, medical benefits
+3. **Market Context** (2 paragraphs): Current market trends, competitor offerings
+4. **Patient Demographics** (1-2 paragraphs): Target patient population, age groups, income levels
+5. **Treatment Process** (2 paragraphs): Typical procedure steps, duration, follow-up care
+6. **Cost Considerations** (1-2 paragraphs): Typical price ranges, insurance coverage, out-of-pocket costs
+7. **CareCredit Opportunity** (1-2 paragraphs): How CareCredit can help, financing benefits
+
+Write in a professional, business-friendly tone that helps executives understand the opportunity.
+Make it engaging and informative, with specific details and market insights.
+"""
+
+ENHANCED_REPORT = """
+You are a healthcare business analyst creating a detailed report section for CareCredit.
+
+Generate a comprehensive report section for this treatment:
+
+Treatment: $treatment_name
+Category: $category
+Description: $detailed_description
+Risk Assessment: $risk_assessment
+Revenue Analysis: $revenue_analysis
+Customer Impact: $customer_impact
+
+Create a well-structured report section that includes:
+
+1. Treatment Overview
+   - Clear description of the treatment
+   - Medical significance
+   - Current market position
+
+2. Market Analysis
+   - Market size and growth
+   - Competitive landscape
+   - Regulatory environment
+
+3. Risk Assessment
+   - Detailed risk factors
+   - Risk mitigation strategies
+   - Monitoring requirements
+
+4. Revenue Analysis
+   - Market opportunity
+   - Revenue projections
+   - Cost structure
+   - Profitability analysis
+
+5. Customer Impact
+   - Target demographics
+   - Customer benefits
+   - Market penetration strategy
+
+6. Strategic Recommendations
+   - Implementation approach
+   - Resource requirements
+   - Success metrics
+
+Format the content professionally with clear sections, bullet points, and key metrics.
+Include specific numbers and percentages where possible.
+"""
+
+RISK_NARRATIVE = """
+You are a risk assessment expert for CareCredit. Explain the risk profile of this treatment.
+
+Treatment: $treatment_name
+Details: $raw_details
+Category: $category
+
+Relevant Source Passages:
+$passages
+
+The risk scores below are already computed by the scoring engine. Do not change or recompute them.
+$scores_text
+Overall (weighted): $overall_risk_score/10 ($risk_category)
+Signals detected: $evidence_text
+
+Provide the narrative only:
+
+1. **RISK EXPLANATIONS**: For each of the six parameters, explain why the score fits this treatment,
+   with supporting evidence and a comparison to similar treatments.
+
+2. **OVERALL ASSESSMENT**: Key risk factors to monitor and risk mitigation strategies.
+
+3. **RECOMMENDATIONS**: Conditions or safeguards needed, monitoring requirements and exit strategies.
+
+Return as JSON with keys "risk_explanations" (object keyed by parameter), "detailed_analysis",
+"key_risk_factors", "mitigation_strategies" and "monitoring_requirements".
+"""
+
+REVENUE_ANALYSIS = """
+You are a business analyst for CareCredit. Perform a comprehensive revenue analysis for this treatment.
+
+Treatment: $treatment_name
+Category: $category
+Risk Score: $risk_score
+
+Relevant Source Passages:
+$passages
+
+Monte Carlo Revenue Bands ($simulations simulations, precomputed):
+$revenue_bands
+
+Provide detailed revenue analysis with:
+
+1. **MARKET SIZE ESTIMATION**:
+   - Total addressable market (TAM)
+   - Serviceable addressable market (SAM)
+   - Market growth rate
+   - Competitive landscape analysis
+
+2. **CUSTOMER SEGMENTATION & IMPACT**:
+   - Age group breakdown (18-30, 31-45, 46-60, 60+)
+   - Income level distribution
+   - Geographic distribution
+   - Insurance coverage patterns
+   - Estimated patient volumes per segment
+
+3. **EXISTING CUSTOMER IMPACT**:
+   - How many current CareCredit customers would benefit
+   - Cross-selling opportunities
+   - Customer lifetime value impact
+   - Retention improvements
+
+4. **NEW CUSTOMER ACQUISITION**:
+   - Potential new customers per year
+   - Customer acquisition cost
+   - Conversion rates by segment
+   - Marketing channel effectiveness
+
+5. **FINANCIAL PROJECTIONS**:
+   - Average transaction size
+   - Transaction volume projections (Year 1-3)
+   - Revenue projections (Year 1-3)
+   - Cost structure analysis
+   - Profitability timeline
+   - ROI calculations
+
+6. **DETAILED LOGIC & ASSUMPTIONS**:
+   - Explain methodology for each calculation
+   - Key assumptions and their rationale
+   - Interpretation of the precomputed revenue bands and key drivers (do not recompute them)
+   - Comparison to similar treatments in portfolio
+
+Return comprehensive JSON with all calculations and detailed explanations.
+"""
+
+CUSTOMER_IMPACT = """
+Analyze the customer impact for treatment: $treatment_name
+
+Segment sizing (computed from the demographic table; use these numbers as given):
+$segmentation
+
+Provide detailed breakdown of:
+1. Existing customer segments that would benefit
+2. New customer acquisition potential
+3. Demographic analysis based on the segment sizing above
+4. Geographic considerations
+5. Seasonal trends and timing factors
+
+Refer to the specific numbers and percentages above where relevant.
+"""
+
+DEFAULT_TEMPLATES = {
+    "treatment_extraction": TREATMENT_EXTRACTION,
+    "treatment_grouping": TREATMENT_GROUPING,
+    "detailed_description": DETAILED_DESCRIPTION,
+    "enhanced_report": ENHANCED_REPORT,
+    "risk_narrative": RISK_NARRATIVE,
+    "revenue_analysis": REVENUE_ANALYSIS,
+    "customer_impact": CUSTOMER_IMPACT
+}
+
+# Override files in a template directory are named <template name>.txt
+TEMPLATE_SUFFIX = ".txt"
+
+
+class PromptTemplate:
+    """A prompt split once into literal text and $placeholders, identified by a content hash"""
+
+    __slots__ = ("name", "source", "version", "variables", "_parts")
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.source = textwrap.dedent(source).strip()
+        self.version = hashlib.sha256(self.source.encode("utf-8")).hexdigest()[:12]
+        self._parts = self._compile(self.source)
+        self.variables = tuple(dict.fromkeys(variable for _, variable in self._parts if variable))
+
+    @property
+    def identity(self) -> str:
+        """name@version, used as the cache and statistics key"""
+        return f"{self.name}@{self.version}"
+
+    def _compile(self, source: str) -> List[Tuple[str, Optional[str]]]:
+        """Split source into (literal, variable) pairs using string.Template syntax"""
+        parts = []
+        literal = []
+        position = 0
+        for match in Template.pattern.finditer(source):
+            literal.append(source[position:match.start()])
+            position = match.end()
+            if match.group("escaped") is not None:
+                literal.append(Template.delimiter)
+                continue
+            variable = match.group("named") or match.group("braced")
+            if variable is None:
+                raise ValueError(f"Invalid placeholder in template '{self.name}' at offset {match.start()}")
+            parts.append(("".join(literal), variable))
+            literal = []
+        literal.append(source[position:])
+        parts.append(("".join(literal), None))
+        return parts
+
+    def render(self, **values: Any) -> str:
+        missing = [variable for variable in self.variables if variable not in values]
+        if missing:
+            raise KeyError(f"Template '{self.name}' is missing values for: {', '.join(missing)}")
+        return "".join(
+            literal + (str(values[variable]) if variable else "")
+            for literal, variable in self._parts
+        )
+
+
+class TemplateRegistry:
+    """Startup-loaded prompt templates with per-version render, LLM and cache statistics"""
+
+    def __init__(self, template_dir: Optional[str] = None, templates: Optional[Dict[str, str]] = None):
+        self.templates: Dict[str, PromptTemplate] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        for name, source in (templates or DEFAULT_TEMPLATES).items():
+            self.register(name, source)
+        if template_dir and Path(template_dir).is_dir():
+            for path in sorted(Path(template_dir).glob(f"*{TEMPLATE_SUFFIX}")):
+                self.register(path.stem, path.read_text(encoding="utf-8"))
+
+    def register(self, name: str, source: str) -> PromptTemplate:
+        template = PromptTemplate(name, source)
+        self.templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        if name not in self.templates:
+            raise KeyError(f"Unknown prompt template '{name}'")
+        return self.templates[name]
+
+    def identity(self, name: str) -> str:
+        return self.get(name).identity
+
+    def identities(self, names: Iterable[str]) -> List[str]:
+        return [self.identity(name) for name in names]
+
+    def _counters(self, name: str) -> Dict[str, Any]:
+        identity = self.identity(name)
+        counters = self.stats.get(identity)
+        if counters is None:
+            counters = self.stats[identity] = {
+                "renders": 0, "render_seconds": 0.0,
+                "llm_calls": 0, "llm_seconds": 0.0, "llm_errors": 0,
+                "cache_hits": 0, "cache_misses": 0
+            }
+        return counters
+
+    def render(self, name: str, **values: Any) -> str:
+        template = self.get(name)
+        started = time.perf_counter()
+        prompt = template.render(**values)
+        counters = self._counters(name)
+        counters["renders"] += 1
+        counters["render_seconds"] += time.perf_counter() - started
+        return prompt
+
+    def call(self, name: str, llm: Callable[[str], Any], **values: Any) -> Any:
+        """
+        Render a template and send it to an LLM callable, timing the call.
+
+        Args:
+            name: Template name
+            llm: Callable taking the prompt (e.g. a strands Agent)
+            **values: Template variables
+
+        Returns:
+            Whatever the LLM callable returns
+        """
+        prompt = self.render(name, **values)
+        counters = self._counters(name)
+        started = time.perf_counter()
+        try:
+            return llm(prompt)
+        except Exception:
+            counters["llm_errors"] += 1
+            raise
+        finally:
+            counters["llm_calls"] += 1
+            counters["llm_seconds"] += time.perf_counter() - started
+
+    def record_cache(self, name: str, hit: bool):
+        """Attribute a response/stage cache lookup to the template version behind it"""
+        self._counters(name)["cache_hits" if hit else "cache_misses"] += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Statistics per template version with hit rate and mean latencies"""
+        summary = {}
+        for identity, counters in self.stats.items():
+            lookups = counters["cache_hits"] + counters["cache_misses"]
+            summary[identity] = dict(
+                counters,
+                cache_hit_rate=round(counters["cache_hits"] / lookups, 4) if lookups else None,
+                mean_llm_seconds=round(counters["llm_seconds"] / counters["llm_calls"], 4)
+                if counters["llm_calls"] else None,
+                mean_render_ms=round(1000 * counters["render_seconds"] / counters["renders"], 4)
+                if counters["renders"] else None
+            )
+        return summary
+
+    def reset_stats(self):
+        self.stats = {}
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Report Diff - structural comparison of two report models
+Treatments are matched by name across runs; the diff lists new and removed
+treatments, per-treatment score deltas and changed sections, and renders a
+compact "what changed" report and email body instead of the full report
+"""
+
+import difflib
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
+
+from markdown_docx import Block
+from report_model import Report
+
+TREATMENT_HEADING_RE = re.compile(r"^Treatment\s+\d+:\s*")
+# Sections keep the blocks before their first level-2 heading under this name
+INTRO_SECTION = "Introduction"
+# Unified-diff lines shown per changed section before truncating
+MAX_DIFF_LINES = 12
+# Relative change below which a score counts as unchanged (float noise from the JSON round trip)
+SCORE_TOLERANCE = 1e-6
+
+
+@dataclass
+class TreatmentChange:
+    """How one treatment differs between the previous and the current report"""
+    name: str
+    # {metric: (previous, current)}; None on either side when the metric is new or gone
+    score_deltas: Dict[str, Tuple[Optional[float], Optional[float]]] = field(default_factory=dict)
+    # {section heading: unified diff lines of the section text}
+    section_diffs: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.score_deltas or self.section_diffs)
+
+
+@dataclass
+class ReportDiff:
+    """Structural diff of two reports, treatments matched by name"""
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[TreatmentChange] = field(default_factory=list)
+    unchanged: int = 0
+    previous_generated_at: str = ""
+    current_generated_at: str = ""
+    # Current report blocks of each added treatment, for the "what changed" report
+    added_blocks: Dict[str, List[Block]] = field(default_factory=dict)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": [change.name for change in self.changed],
+            "unchanged": self.unchanged,
+            "previous_generated_at": self.previous_generated_at
+        }
+
+
+def treatment_name(heading: str) -> str:
+    """'Treatment 3: Dental Implants' -> 'Dental Implants' (numbering shifts between runs)"""
+    return TREATMENT_HEADING_RE.sub("", heading).strip()
+
+
+def split_treatments(report: Report) -> Dict[str, List[Block]]:
+    """
+    Blocks of each treatment section, keyed by treatment name, in report order.
+
+    Boundaries come from metadata["treatment_blocks"] (see Report.treatment), never from
+    heading levels, so headings in LLM text cannot start a treatment. Reports saved
+    before that metadata existed fall back to the "Treatment N: name" level-1 headings.
+    """
+    starts = report.metadata.get("treatment_blocks")
+    if starts is None:
+        starts = [
+            [treatment_name(block.text), index] for index, block in enumerate(report.blocks)
+            if block.kind == "heading" and block.level == 1 and TREATMENT_HEADING_RE.match(block.text)
+        ]
+    sections: Dict[str, List[Block]] = {}
+    ends = [start for _, start in starts[1:]] + [len(report.blocks)]
+    for (name, start), end in zip(starts, ends):
+        # The treatment heading itself is not section content
+        sections.setdefault(str(name).strip(), []).extend(report.blocks[start + 1:end])
+    return sections
+
+
+def block_lines(block: Block) -> List[str]:
+    """Comparable text lines of a block"""
+    if block.kind == "table":
+        return [" | ".join(row) for row in block.rows]
+    if block.kind == "list_item":
+        return [f"{'  ' * block.level}- {block.text}"]
+    if block.kind == "heading":
+        return [f"{'#' * (block.level + 1)} {block.text}"]
+    return block.text.splitlines() or [""]
+
+
+def split_sections(blocks: List[Block]) -> Dict[str, List[str]]:
+    """Text lines of a treatment section, grouped under its level-2 headings"""
+    sections: Dict[str, List[str]] = {}
+    current = sections.setdefault(INTRO_SECTION, [])
+    for block in blocks:
+        if block.kind == "heading" and block.level == 2:
+            current = sections.setdefault(block.text, [])
+            continue
+        current.extend(block_lines(block))
+    return {name: lines for name, lines in sections.items() if lines or name != INTRO_SECTION}
+
+
+def _digest(lines: List[str]) -> str:
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def _score_changed(previous: Optional[float], current: Optional[float]) -> bool:
+    if previous is None or current is None:
+        return (previous is None) != (current is None)
+    scale = max(abs(previous), abs(current), 1.0)
+    return abs(current - previous) / scale > SCORE_TOLERANCE
+
+
+def compare_treatment(name: str, previous_blocks: List[Block], current_blocks: List[Block],
+                      previous_scores: Dict[str, float], current_scores: Dict[str, float],
+                      max_diff_lines: int = MAX_DIFF_LINES) -> TreatmentChange:
+    change = TreatmentChange(name)
+    for metric in list(dict.fromkeys(list(previous_scores) + list(current_scores))):
+        before, after = previous_scores.get(metric), current_scores.get(metric)
+        if _score_changed(before, after):
+            change.score_deltas[metric] = (before, after)
+
+    previous_sections = split_sections(previous_blocks)
+    current_sections = split_sections(current_blocks)
+    for section in list(dict.fromkeys(list(current_sections) + list(previous_sections))):
+        before = previous_sections.get(section, [])
+        after = current_sections.get(section, [])
+        # Hash first: most sections are unchanged and never reach difflib
+        if _digest(before) == _digest(after):
+            continue
+        lines = [
+            line for line in difflib.unified_diff(before, after, lineterm="", n=0)
+            if not line.startswith(("---", "+++", "@@"))
+        ]
+        if len(lines) > max_diff_lines:
+            lines = lines[:max_diff_lines] + [f"... {len(lines) - max_diff_lines} more changed lines"]
+        change.section_diffs[section] = lines
+    return change
+
+
+def diff_reports(previous: Report, current: Report, max_diff_lines: int = MAX_DIFF_LINES) -> ReportDiff:
+    """
+    Compare two reports treatment by treatment.
+
+    Scores come from metadata["scores"] (see report_model.treatment_scores); section text
+    is compared by hash and only changed sections are line-diffed.
+
+    Args:
+        previous: Report of the last run
+        current: Report of this run
+        max_diff_lines: Diff lines kept per changed section
+
+    Returns:
+        ReportDiff
+    """
+    previous_sections = split_treatments(previous)
+    current_sections = split_treatments(current)
+    previous_scores = previous.metadata.get("scores", {})
+    current_scores = current.metadata.get("scores", {})
+
+    diff = ReportDiff(previous_generated_at=previous.generated_at, current_generated_at=current.generated_at)
+    for name, blocks in current_sections.items():
+        if name not in previous_sections:
+            diff.added.append(name)
+            diff.added_blocks[name] = blocks
+            continue
+        change = compare_treatment(name, previous_sections[name], blocks,
+                                   previous_scores.get(name, {}), current_scores.get(name, {}), max_diff_lines)
+        if change.changed:
+            diff.changed.append(change)
+        else:
+            diff.unchanged += 1
+    diff.removed = [name for name in previous_sections if name not in current_sections]
+    return diff
+
+
+def format_score(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if abs(value) >= 1000:
+        return f"{value:,.0f}"
+    return f"{value:g}"
+
+
+def format_delta(previous: Optional[float], current: Optional[float]) -> str:
+    if previous is None:
+        return "new"
+    if current is None:
+        return "removed"
+    delta = current - previous
+    text = f"{'+' if delta >= 0 else '-'}{format_score(abs(delta))}"
+    if previous:
+        text += f" ({delta / abs(previous):+.0%})"
+    return text
+
+
+def _counts_line(diff: ReportDiff) -> str:
+    return (f"{len(diff.added)} new, {len(diff.removed)} removed, "
+            f"{len(diff.changed)} changed, {diff.unchanged} unchanged treatment(s)")
+
+
+def diff_report(diff: ReportDiff, title: str = "Treatment Analysis - Changes Since Last Report") -> Report:
+    """Render a diff as a compact report model: new treatments in full, changes as tables and diffs"""
+    report = Report(title=title, metadata={
+        "previous_generated_at": diff.previous_generated_at,
+        "diff": diff.summary()
+    })
+    report.heading("Summary", 1)
+    report.paragraph(f"Compared with the report of {diff.previous_generated_at or 'the previous run'}: "
+                     f"{_counts_line(diff)}.")
+    if not diff.has_changes:
+        report.paragraph("No treatment changed since the last report.")
+        return report
+
+    if diff.removed:
+        report.heading("Removed Treatments", 1)
+        report.bullets(diff.removed)
+
+    for change in diff.changed:
+        report.heading(f"Changed: {change.name}", 1)
+        if change.score_deltas:
+            report.table([["Metric", "Previous", "Current", "Change"]] + [
+                [metric, format_score(before), format_score(after), format_delta(before, after)]
+                for metric, (before, after) in change.score_deltas.items()
+            ])
+        for section, lines in change.section_diffs.items():
+            report.heading(section, 2)
+            report.blocks.append(Block("code", "\n".join(lines)))
+
+    for name in diff.added:
+        report.heading(f"New: {name}", 1)
+        report.blocks.extend(diff.added_blocks.get(name, []))
+    return report
+
+
+def email_body(diff: ReportDiff, max_scores: int = 5) -> str:
+    """Plain-text email body summarizing a diff"""
+    lines = [f"Changes since the report of {diff.previous_generated_at or 'the previous run'}:",
+             _counts_line(diff), ""]
+    if diff.added:
+        lines += ["New treatments:"] + [f"  - {name}" for name in diff.added] + [""]
+    if diff.removed:
+        lines += ["Removed treatments:"] + [f"  - {name}" for name in diff.removed] + [""]
+    for change in diff.changed:
+        lines.append(f"{change.name}:")
+        deltas = list(change.score_deltas.items())
+        for metric, (before, after) in deltas[:max_scores]:
+            lines.append(f"  {metric}: {format_score(before)} -> {format_score(after)}, {format_delta(before, after)}")
+        if len(deltas) > max_scores:
+            lines.append(f"  ... {len(deltas) - max_scores} more score changes")
+        if change.section_diffs:
+            lines.append(f"  Updated sections: {', '.join(change.section_diffs)}")
+        lines.append("")
+    if not diff.has_changes:
+        lines.append("No treatment changed since the last report.")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+if __name__ == "__main__":
+    import json
+
+    # Regression check: headings in LLM text must not split or invent treatments
+    from report_model import render_report, report_from_dict, report_from_treatments
+
+    llm_description = "# Dental Implants Overview\nTitanium posts.\n\n# Market\nGrowing demand."
+    previous = report_from_treatments([
+        {"treatment_name": "Dental Implants", "detailed_description": llm_description},
+        {"treatment_name": "LASIK", "detailed_description": "## Procedure\nLaser reshaping."}
+    ])
+    current = report_from_treatments([
+        {"treatment_name": "Dental Implants", "detailed_description": llm_description + " Still growing."},
+        {"treatment_name": "LASIK", "detailed_description": "## Procedure\nLaser reshaping."}
+    ])
+    current = report_from_dict(json.loads(render_report(current, "json")))
+    assert all(block.level > 2 for block in current.blocks if block.kind == "heading" and "Market" in block.text)
+    assert list(split_treatments(current)) == ["Dental Implants", "LASIK"]
+    diff = diff_reports(previous, current)
+    assert not diff.added and not diff.removed, diff.summary()
+    assert [change.name for change in diff.changed] == ["Dental Implants"], diff.summary()
+    assert list(diff.changed[0].section_diffs) == ["Overview"], diff.changed[0].section_diffs
+    print("report_diff checks passed")
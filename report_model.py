@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Report Model - one intermediate report rendered to DOCX, HTML, Markdown or JSON
+Reports are a title, metadata and a flat list of Markdown blocks; the HTML,
+Markdown and JSON backends stream text chunks and never import python-docx,
+which is only loaded when a DOCX is actually requested
+"""
+
+import html
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from io import BytesIO
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Mapping
+
+from markdown_docx import Block, tokenize, INLINE_RE
+from report_spec import REPORT_SECTIONS, DEFAULT_SECTIONS
+
+FORMATS = {
+    "docx": {"extension": ".docx", "mime": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"},
+    "html": {"extension": ".html", "mime": "text/html"},
+    "md": {"extension": ".md", "mime": "text/markdown"},
+    "json": {"extension": ".json", "mime": "application/json"}
+}
+# Bytes per chunk when streaming a rendered DOCX
+DOCX_CHUNK_SIZE = 64 * 1024
+# Headings inside free text sit below the treatment (1) and section (2) headings
+EMBEDDED_HEADING_SHIFT = 2
+# Deepest heading every backend has a style for
+MAX_HEADING_LEVEL = 6
+
+HTML_STYLE = (
+    "body{font-family:Arial,Helvetica,sans-serif;max-width:56rem;margin:2rem auto;line-height:1.5;color:#1f2937}"
+    "table{border-collapse:collapse;margin:1rem 0}td,th{border:1px solid #d1d5db;padding:.35rem .6rem}"
+    "th{background:#f3f4f6}blockquote{border-left:4px solid #9ca3af;margin-left:0;padding-left:1rem;color:#4b5563}"
+    "pre{background:#f3f4f6;padding:.75rem;overflow-x:auto}.meta{color:#6b7280}.sparkline{font-size:1.25rem}"
+)
+
+
+@dataclass
+class Report:
+    """Format-independent report: title, metadata and Markdown blocks"""
+    title: str
+    blocks: List[Block] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    generated_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @classmethod
+    def from_markdown(cls, title: str, markdown: str, metadata: Optional[Dict[str, Any]] = None) -> "Report":
+        return cls(title=title, blocks=list(tokenize(markdown)), metadata=dict(metadata or {}))
+
+    def heading(self, text: str, level: int = 1):
+        self.blocks.append(Block("heading", text, level=level))
+
+    def treatment(self, name: str, heading: str):
+        """
+        Start a treatment section. Its name and first block index go to
+        metadata["treatment_blocks"], so report_diff can split treatments without
+        guessing from heading levels.
+        """
+        self.metadata.setdefault("treatment_blocks", []).append([name, len(self.blocks)])
+        self.heading(heading, 1)
+
+    def paragraph(self, text: Any):
+        self.blocks.append(Block("paragraph", str(text)))
+
+    def markdown(self, text: Any):
+        """Append free text (often LLM Markdown) as parsed blocks, its headings demoted below the report's own"""
+        for block in tokenize(str(text)):
+            if block.kind == "heading":
+                block = block._replace(level=min(block.level + EMBEDDED_HEADING_SHIFT, MAX_HEADING_LEVEL))
+            self.blocks.append(block)
+
+    def bullets(self, items: Iterable[Any], ordered: bool = False):
+        self.blocks.extend(Block("list_item", str(item), ordered=ordered) for item in items)
+
+    def table(self, rows: List[List[Any]]):
+        if rows:
+            self.blocks.append(Block("table", rows=tuple(tuple(str(cell) for cell in row) for row in rows)))
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def treatment_scores(treatment: Dict[str, Any]) -> Dict[str, float]:
+    """Numeric scores of one treatment (risk scores, revenue figures), for comparing reports across runs"""
+    from portfolio import parse_money
+
+    scores = {}
+    risk = treatment.get("risk_assessment")
+    if isinstance(risk, Mapping):
+        scores["Overall Risk Score"] = _number(risk.get("overall_risk_score"))
+        parameters = risk.get("risk_parameters")
+        if isinstance(parameters, Mapping):
+            for name, score in parameters.items():
+                scores[f"Risk: {name}"] = _number(score)
+    revenue = treatment.get("revenue_analysis")
+    if isinstance(revenue, Mapping):
+        scores["Market Size"] = parse_money(revenue.get("market_size"))
+        scores["Year 1 Revenue Projection"] = parse_money(revenue.get("revenue_projection_year1"))
+        sensitivity = revenue.get("sensitivity_analysis")
+        if isinstance(sensitivity, Mapping):
+            scores["Revenue P50"] = _number(sensitivity.get("revenue_p50"))
+    return {name: value for name, value in scores.items() if value is not None}
+
+
+def report_from_treatments(treatments_data: List[Mapping[str, Any]],
+                           title: str = "CareCredit Healthcare Treatment Analysis",
+                           sections: Iterable[str] = DEFAULT_SECTIONS) -> Report:
+    """
+    Build the report model from processed treatments (same content as the Word treatment sections).
+
+    Only the report sections listed in sections are included (see report_spec). Treatments
+    may be any mappings, e.g. the read-only records of a stage_outputs.ReportDocument.
+    metadata["scores"] holds treatment_scores() per treatment name, so a saved report can be
+    diffed against the next run without the treatment data behind it.
+    """
+    # Imported here so the lightweight formats do not pull in numpy
+    from revenue_engine import format_revenue_bands
+
+    sections = set(sections)
+    report = Report(title=title, metadata={
+        "treatments_count": len(treatments_data),
+        "sections": [section for section in REPORT_SECTIONS if section in sections],
+        "scores": {
+            treatment.get("treatment_name", f"Treatment {number}"): treatment_scores(treatment)
+            for number, treatment in enumerate(treatments_data, 1)
+        }
+    })
+    for number, treatment in enumerate(treatments_data, 1):
+        name = treatment.get("treatment_name", f"Treatment {number}")
+        report.treatment(name, f"Treatment {number}: {name}")
+
+        if "overview" in sections:
+            report.heading("Overview", 2)
+            report.markdown(treatment.get("detailed_description") or "No detailed description available")
+
+        if "sources" in sections:
+            report.heading("Data Sources", 2)
+            report.bullets(treatment.get("source_files") or ["Multiple research sources analyzed"])
+
+        risk = treatment.get("risk_assessment", {})
+        if "risk" in sections:
+            report.heading("Risk Assessment", 2)
+            if isinstance(risk, Mapping):
+                if risk.get("detailed_analysis"):
+                    report.markdown(risk["detailed_analysis"])
+                parameters = risk.get("risk_parameters", {})
+                if isinstance(parameters, Mapping) and parameters:
+                    report.table([["Parameter", "Score"]] + [[name, f"{score}/10"] for name, score in parameters.items()])
+                report.bullets([
+                    f"Overall Risk Score: {risk.get('overall_risk_score', 'Not calculated')}",
+                    f"Risk Category: {risk.get('risk_category', 'Under review')}",
+                    f"Recommendation: {risk.get('recommendation', 'Further analysis required')}"
+                ])
+            elif risk:
+                report.markdown(risk)
+
+        revenue = treatment.get("revenue_analysis", {})
+        if "revenue" in sections:
+            report.heading("Revenue Analysis", 2)
+            if isinstance(revenue, Mapping):
+                if revenue.get("detailed_analysis"):
+                    report.markdown(revenue["detailed_analysis"])
+                report.bullets([
+                    f"Market Size: {revenue.get('market_size', 'Under analysis')}",
+                    f"Year 1 Revenue Projection: {revenue.get('revenue_projection_year1', 'To be determined')}"
+                ])
+                sensitivity = revenue.get("sensitivity_analysis")
+                if isinstance(sensitivity, Mapping) and "revenue_p50" in sensitivity:
+                    report.heading("Revenue Sensitivity (Monte Carlo)", 3)
+                    report.bullets(format_revenue_bands(sensitivity).split("\n"))
+            elif revenue:
+                report.markdown(revenue)
+
+        customer = treatment.get("customer_impact", {})
+        if "customer_impact" in sections:
+            report.heading("Customer Impact Analysis", 2)
+            if isinstance(customer, Mapping):
+                if customer.get("customer_impact_analysis"):
+                    report.markdown(customer["customer_impact_analysis"])
+                metrics = customer.get("impact_metrics", {})
+                if isinstance(metrics, Mapping) and metrics:
+                    report.table([["Metric", "Value"]] + [[name, value] for name, value in metrics.items()])
+            elif customer:
+                report.markdown(customer)
+
+        enhanced = treatment.get("enhanced_report", {})
+        if "enhanced_report" in sections:
+            report.heading("Analyst Recommendations", 2)
+            parts = enhanced.get("sections", {}) if isinstance(enhanced, Mapping) else {}
+            if isinstance(parts, Mapping) and parts.get("recommendations"):
+                report.markdown(parts["recommendations"])
+            elif isinstance(enhanced, Mapping) and enhanced.get("raw_content"):
+                report.markdown(enhanced["raw_content"])
+            else:
+                report.paragraph("No enhanced report was generated for this treatment.")
+    return report
+
+
+# ==================== MARKDOWN ====================
+
+def _markdown_cell(text: str) -> str:
+    return text.replace("|", "\\|")
+
+
+def iter_markdown(report: Report) -> Iterator[str]:
+    yield f"# {report.title}\n\n_Generated: {report.generated_at}_\n\n"
+    previous = None
+    for block in report.blocks:
+        if previous == "list_item" and block.kind != "list_item":
+            yield "\n"
+        if block.kind == "heading":
+            # The report title is the only level-1 heading; section headings shift down one level
+            yield f"{'#' * min(block.level + 1, 6)} {block.text}\n\n"
+        elif block.kind == "list_item":
+            marker = "1." if block.ordered else "-"
+            yield f"{'  ' * block.level}{marker} {block.text}\n"
+        elif block.kind == "table":
+            header, *rows = block.rows or ((),)
+            lines = ["| " + " | ".join(_markdown_cell(c) for c in header) + " |",
+                     "|" + "---|" * len(header)]
+            lines += ["| " + " | ".join(_markdown_cell(c) for c in row) + " |" for row in rows]
+            yield "\n".join(lines) + "\n\n"
+        elif block.kind == "code":
+            yield f"```\n{block.text}\n```\n\n"
+        elif block.kind == "quote":
+            yield f"> {block.text}\n\n"
+        elif block.kind == "rule":
+            yield "---\n\n"
+        else:
+            yield f"{block.text}\n\n"
+        previous = block.kind
+
+
+# ==================== HTML ====================
+
+def inline_html(text: str) -> str:
+    """Escape text and turn inline Markdown (bold, italic, code) into HTML tags"""
+    parts = []
+    position = 0
+    for match in INLINE_RE.finditer(text):
+        parts.append(html.escape(text[position:match.start()]))
+        kind = match.lastgroup
+        value = html.escape(match.group(kind))
+        if kind == "code":
+            parts.append(f"<code>{value}</code>")
+        elif kind == "bold_italic":
+            parts.append(f"<strong><em>{value}</em></strong>")
+        elif kind in ("bold", "bold_u"):
+            parts.append(f"<strong>{value}</strong>")
+        else:
+            parts.append(f"<em>{value}</em>")
+        position = match.end()
+    parts.append(html.escape(text[position:]))
+    return "".join(parts)
+
+
+def iter_html(report: Report) -> Iterator[str]:
+    title = html.escape(report.title)
+    yield (f"<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\"><title>{title}</title>"
+           f"<style>{HTML_STYLE}</style></head><body>\n<h1>{title}</h1>\n"
+           f"<p class=\"meta\">Generated: {html.escape(report.generated_at)}</p>\n")
+    open_lists: List[str] = []
+    for block in report.blocks:
+        if block.kind == "list_item":
+            tag = "ol" if block.ordered else "ul"
+            while len(open_lists) > block.level + 1:
+                yield f"</{open_lists.pop()}>\n"
+            if len(open_lists) == block.level + 1 and open_lists[-1] != tag:
+                yield f"</{open_lists.pop()}>\n"
+            while len(open_lists) < block.level + 1:
+                open_lists.append(tag)
+                yield f"<{tag}>\n"
+            yield f"<li>{inline_html(block.text)}</li>\n"
+            continue
+        while open_lists:
+            yield f"</{open_lists.pop()}>\n"
+
+        if block.kind == "heading":
+            level = min(block.level + 1, 6)
+            yield f"<h{level}>{inline_html(block.text)}</h{level}>\n"
+        elif block.kind == "table":
+            header, *rows = block.rows or ((),)
+            cells = "".join(f"<th>{inline_html(c)}</th>" for c in header)
+            body = "".join(
+                "<tr>" + "".join(f"<td>{inline_html(c)}</td>" for c in row) + "</tr>" for row in rows
+            )
+            yield f"<table><thead><tr>{cells}</tr></thead><tbody>{body}</tbody></table>\n"
+        elif block.kind == "code":
+            yield f"<pre><code>{html.escape(block.text)}</code></pre>\n"
+        elif block.kind == "quote":
+            yield f"<blockquote>{inline_html(block.text)}</blockquote>\n"
+        elif block.kind == "sparkline":
+            yield f"<p class=\"sparkline\">{html.escape(block.text)}</p>\n"
+        elif block.kind == "rule":
+            yield "<hr>\n"
+        else:
+            yield f"<p>{inline_html(block.text)}</p>\n"
+    while open_lists:
+        yield f"</{open_lists.pop()}>\n"
+    yield "</body></html>\n"
+
+
+# ==================== JSON ====================
+
+def _block_dict(block: Block) -> Dict[str, Any]:
+    data = {"type": block.kind}
+    if block.kind == "table":
+        data["rows"] = [list(row) for row in block.rows]
+    else:
+        data["text"] = block.text
+    if block.kind in ("heading", "list_item"):
+        data["level"] = block.level
+    if block.kind == "list_item":
+        data["ordered"] = block.ordered
+    return data
+
+
+def report_from_dict(data: Dict[str, Any]) -> Report:
+    """Inverse of the JSON backend"""
+    blocks = []
+    for item in data.get("blocks", []):
+        if item["type"] == "table":
+            blocks.append(Block("table", rows=tuple(tuple(row) for row in item["rows"])))
+        else:
+            blocks.append(Block(item["type"], item.get("text", ""), level=item.get("level", 0),
+                                ordered=item.get("ordered", False)))
+    return Report(title=data.get("title", ""), blocks=blocks, metadata=data.get("metadata", {}),
+                  generated_at=data.get("generated_at", ""))
+
+
+def load_report(path: str) -> Report:
+    """Load a report saved with write_report(report, "json", path)"""
+    with open(path, "r", encoding="utf-8") as f:
+        return report_from_dict(json.load(f))
+
+
+def iter_json(report: Report) -> Iterator[str]:
+    """Stream {"title", "generated_at", "metadata", "blocks": [...]} one block at a time"""
+    yield (f"{{\"title\": {json.dumps(report.title)}, \"generated_at\": {json.dumps(report.generated_at)}, "
+           f"\"metadata\": {json.dumps(report.metadata, default=str)}, \"blocks\": [")
+    for index, block in enumerate(report.blocks):
+        yield ("," if index else "") + "\n  " + json.dumps(_block_dict(block), ensure_ascii=False)
+    yield "\n]}\n"
+
+
+# ==================== DOCX ====================
+
+def render_docx(report: Report, output=None):
+    """
+    Render the report with python-docx.
+
+    Args:
+        report: Report model
+        output: Path or binary file object; None returns the package bytes
+    """
+    import docx
+    from markdown_docx import render_blocks
+
+    doc = docx.Document()
+    doc.add_heading(report.title, 0)
+    doc.add_paragraph(f"Generated: {report.generated_at}")
+    render_blocks(doc, report.blocks)
+    if output is not None:
+        doc.save(output)
+        return output
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+# ==================== DISPATCH ====================
+
+TEXT_BACKENDS = {"html": iter_html, "md": iter_markdown, "json": iter_json}
+
+
+def stream_report(report: Report, fmt: str) -> Iterator[bytes]:
+    """UTF-8 chunks of a rendered report, suitable for a streaming HTTP response"""
+    if fmt == "docx":
+        package = render_docx(report)
+        for start in range(0, len(package), DOCX_CHUNK_SIZE):
+            yield package[start:start + DOCX_CHUNK_SIZE]
+        return
+    if fmt not in TEXT_BACKENDS:
+        raise ValueError(f"Unsupported report format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    for chunk in TEXT_BACKENDS[fmt](report):
+        yield chunk.encode("utf-8")
+
+
+def render_report(report: Report, fmt: str) -> bytes:
+    return b"".join(stream_report(report, fmt))
+
+
+def write_report(report: Report, fmt: str, output_path: str) -> str:
+    """Write a report to disk, streaming text formats chunk by chunk"""
+    if fmt == "docx":
+        render_docx(report, output_path)
+        return output_path
+    with open(output_path, "wb") as f:
+        for chunk in stream_report(report, fmt):
+            f.write(chunk)
+    return output_path
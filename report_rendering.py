@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Report Rendering - parallel, streaming treatment section rendering for Word reports
+Each treatment section is built in its own python-docx document on a worker
+process, serialized as body XML and merged in order, either into a document or
+straight into a streamed document.xml so memory stays bounded
+"""
+
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+
+import docx
+from docx.oxml import parse_xml
+from lxml import etree
+
+from revenue_engine import format_revenue_bands
+from stage_cache import hash_value, code_fingerprint
+from report_spec import DEFAULT_SECTIONS
+
+# Below this many treatments the process pool costs more than it saves
+PARALLEL_MIN_TREATMENTS = 8
+# Sections sent to a worker per task
+RENDER_CHUNK_SIZE = 4
+DOCUMENT_PART = "word/document.xml"
+
+_report_templates: Dict[str, "ReportTemplate"] = {}
+
+
+def add_treatment_section(doc, treatment_data: Dict[str, Any], treatment_number: int,
+                          sections: Tuple[str, ...] = DEFAULT_SECTIONS):
+    """Add detailed section for each treatment (only the report sections listed in sections)"""
+    treatment_name = treatment_data.get('treatment_name', f'Treatment {treatment_number}')
+
+    # Main treatment heading
+    doc.add_heading(f'Treatment {treatment_number}: {treatment_name}', level=1)
+
+    # Treatment overview
+    if 'overview' in sections:
+        doc.add_heading('Overview', level=2)
+        overview = treatment_data.get('detailed_description', 'No detailed description available')
+        doc.add_paragraph(overview)
+
+    # Source information
+    if 'sources' in sections:
+        doc.add_heading('Data Sources', level=2)
+        sources = treatment_data.get('source_files', [])
+        if sources:
+            for source in sources:
+                doc.add_paragraph(f'• {source}', style='List Bullet')
+        else:
+            doc.add_paragraph('• Multiple research sources analyzed')
+
+    if 'risk' in sections:
+        add_risk_section(doc, treatment_data.get('risk_assessment', {}))
+    if 'revenue' in sections:
+        add_revenue_section(doc, treatment_data.get('revenue_analysis', {}))
+    if 'customer_impact' in sections:
+        add_customer_impact_section(doc, treatment_data.get('customer_impact', {}))
+    if 'enhanced_report' in sections:
+        add_enhanced_report_section(doc, treatment_data.get('enhanced_report', {}))
+
+
+def add_risk_section(doc, risk_data):
+    """Add detailed risk analysis section"""
+    doc.add_heading('Risk Assessment', level=2)
+
+    if isinstance(risk_data, dict) and 'detailed_analysis' in risk_data:
+        doc.add_paragraph(risk_data['detailed_analysis'])
+    elif isinstance(risk_data, str):
+        doc.add_paragraph(risk_data)
+    else:
+        doc.add_paragraph("Comprehensive risk analysis includes market, medical, financial, regulatory, technology, and provider risk factors. Each parameter is scored on a 0-10 scale with detailed justification and mitigation strategies.")
+
+    # Add risk metrics table if available
+    if isinstance(risk_data, dict):
+        doc.add_heading('Risk Metrics Summary', level=3)
+
+        risk_score = risk_data.get('overall_risk_score', 'Not calculated')
+        risk_category = risk_data.get('risk_category', 'Under review')
+
+        doc.add_paragraph(f'Overall Risk Score: {risk_score}')
+        doc.add_paragraph(f'Risk Category: {risk_category}')
+
+        recommendation = risk_data.get('recommendation', 'Further analysis required')
+        doc.add_paragraph(f'Recommendation: {recommendation}')
+
+
+def add_revenue_section(doc, revenue_data):
+    """Add detailed revenue analysis section"""
+    doc.add_heading('Revenue Analysis', level=2)
+
+    if isinstance(revenue_data, dict) and 'detailed_analysis' in revenue_data:
+        doc.add_paragraph(revenue_data['detailed_analysis'])
+    elif isinstance(revenue_data, str):
+        doc.add_paragraph(revenue_data)
+    else:
+        doc.add_paragraph("Revenue analysis includes market sizing, customer segmentation, financial projections, and profitability assessment. Projections are based on market research, competitive analysis, and CareCredit's historical performance data.")
+
+    # Add revenue projections if available
+    if isinstance(revenue_data, dict):
+        doc.add_heading('Financial Projections', level=3)
+
+        market_size = revenue_data.get('market_size', 'Under analysis')
+        doc.add_paragraph(f'Market Size: {market_size}')
+
+        revenue_proj = revenue_data.get('revenue_projection_year1', 'To be determined')
+        doc.add_paragraph(f'Year 1 Revenue Projection: {revenue_proj}')
+
+        sensitivity = revenue_data.get('sensitivity_analysis')
+        if isinstance(sensitivity, dict) and 'revenue_p50' in sensitivity:
+            doc.add_heading('Revenue Sensitivity (Monte Carlo)', level=3)
+            for line in format_revenue_bands(sensitivity).split('\n'):
+                doc.add_paragraph(line, style='List Bullet')
+
+
+def add_customer_impact_section(doc, customer_data):
+    """Add customer impact analysis section"""
+    doc.add_heading('Customer Impact Analysis', level=2)
+
+    if isinstance(customer_data, dict) and 'customer_impact_analysis' in customer_data:
+        doc.add_paragraph(customer_data['customer_impact_analysis'])
+    elif isinstance(customer_data, str):
+        doc.add_paragraph(customer_data)
+    else:
+        doc.add_paragraph("Customer impact analysis examines how this treatment affects existing CareCredit customers and potential for new customer acquisition. Analysis includes demographic segmentation, geographic distribution, and behavioral patterns.")
+
+
+def add_enhanced_report_section(doc, enhanced_report):
+    """Add the analyst recommendations from the enhanced report stage"""
+    doc.add_heading('Analyst Recommendations', level=2)
+
+    sections = enhanced_report.get('sections', {}) if isinstance(enhanced_report, dict) else {}
+    if isinstance(sections, dict) and sections.get('recommendations'):
+        doc.add_paragraph(sections['recommendations'].strip())
+    elif isinstance(enhanced_report, dict) and enhanced_report.get('raw_content'):
+        doc.add_paragraph(enhanced_report['raw_content'])
+    else:
+        doc.add_paragraph('No enhanced report was generated for this treatment.')
+
+
+def body_xml(doc) -> bytes:
+    """
+    Body content of a document as one XML fragment, without its section properties.
+
+    Namespaces are declared once on the enclosing body/document element, so the
+    fragment is written without the per-element declarations lxml would add.
+    """
+    body = doc.element.body
+    if len(body) == 0 or (len(body) == 1 and body.sectPr is not None):
+        return b""
+    xml = etree.tostring(body)
+    start = xml.index(b">") + 1
+    end = xml.rfind(b"<w:sectPr") if body.sectPr is not None else -1
+    return xml[start:end if end != -1 else xml.rindex(b"</w:body>")]
+
+
+def clear_body(doc):
+    """Drop all body content except the section properties"""
+    body = doc.element.body
+    for child in list(body):
+        if child is not body.sectPr:
+            body.remove(child)
+
+
+def namespace_declarations(element) -> str:
+    return " ".join(
+        f'xmlns:{prefix}="{uri}"' if prefix else f'xmlns="{uri}"' for prefix, uri in element.nsmap.items()
+    )
+
+
+def render_treatment_part(job: Tuple[Dict[str, Any], int, bool, Tuple[str, ...]]) -> bytes:
+    """
+    Worker entry point: render one treatment section into a body XML fragment.
+
+    Sections only use built-in styles and no relationships (images, links), so
+    the XML is valid in any document created from the default template.
+
+    Args:
+        job: (treatment_data, treatment_number, page_break_after, sections)
+    """
+    treatment_data, treatment_number, page_break, sections = job
+    part = docx.Document()
+    add_treatment_section(part, treatment_data, treatment_number, sections)
+    if page_break:
+        part.add_page_break()
+    return body_xml(part)
+
+
+def append_body_xml(doc, fragment: bytes):
+    """Append a body XML fragment to a document, before its section properties"""
+    if not fragment:
+        return
+    body = doc.element.body
+    wrapper = parse_xml(
+        f"<w:body {namespace_declarations(body)}>".encode("utf-8") + fragment + b"</w:body>"
+    )
+    # Move the parsed wrapper over as a single root, then unwrap it in place: moving its
+    # children across documents one by one re-resolves namespaces per node and goes
+    # quadratic on large tables
+    sect_pr = body.sectPr
+    if sect_pr is not None:
+        sect_pr.addprevious(wrapper)
+    else:
+        body.append(wrapper)
+    for element in list(wrapper):
+        wrapper.addprevious(element)
+    body.remove(wrapper)
+
+
+def _use_process_pool(workers: int, count: int) -> bool:
+    return workers > 1 and count >= PARALLEL_MIN_TREATMENTS
+
+
+def iter_treatment_parts(treatments_data: List[Dict[str, Any]], workers: Optional[int] = None,
+                         rendering: Optional[Dict[str, Any]] = None,
+                         sections: Tuple[str, ...] = DEFAULT_SECTIONS) -> Iterator[bytes]:
+    """
+    Yield each treatment section as a body XML fragment, in treatment order.
+
+    Args:
+        treatments_data: Processed treatment dicts
+        workers: Worker processes (defaults to the CPU count; 1 renders serially)
+        rendering: Optional dict filled with {"mode", "workers", "sections"} and "fallback_reason"
+        sections: Report sections to include (see report_spec)
+
+    Yields:
+        One fragment per treatment (with the page break between treatments included)
+    """
+    rendering = rendering if rendering is not None else {}
+    jobs = [(treatment, i, i < len(treatments_data), tuple(sections)) for i, treatment in enumerate(treatments_data, 1)]
+    workers = workers or os.cpu_count() or 1
+    rendering.update({"mode": "serial", "workers": 1, "sections": len(jobs)})
+    done = 0
+
+    if _use_process_pool(workers, len(jobs)):
+        workers = min(workers, len(jobs))
+        rendering.update({"mode": "parallel", "workers": workers})
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # map() yields results in submission order, so the merge keeps treatment order
+                for fragment in executor.map(render_treatment_part, jobs, chunksize=RENDER_CHUNK_SIZE):
+                    yield fragment
+                    done += 1
+        except Exception as e:
+            # Process pools can be unavailable (restricted sandboxes, frozen apps); finish in-process
+            rendering["fallback_reason"] = str(e)
+
+    for job in jobs[done:]:
+        yield render_treatment_part(job)
+
+
+def render_treatment_sections(doc, treatments_data: List[Dict[str, Any]], workers: Optional[int] = None,
+                              sections: Tuple[str, ...] = DEFAULT_SECTIONS) -> Dict[str, Any]:
+    """
+    Render every treatment section into a document, in parallel when worthwhile.
+
+    Args:
+        doc: Target document (title and summary already added)
+        treatments_data: Processed treatment dicts
+        workers: Worker processes (defaults to the CPU count; 1 renders serially)
+        sections: Report sections to include (see report_spec)
+
+    Returns:
+        {"mode": "parallel" | "serial", "workers", "sections"} plus "fallback_reason" when the pool failed
+    """
+    workers = workers or os.cpu_count() or 1
+    if not _use_process_pool(workers, len(treatments_data)):
+        # In-process rendering goes straight into the document, no XML round trip
+        for i, treatment_data in enumerate(treatments_data, 1):
+            add_treatment_section(doc, treatment_data, i, sections)
+            if i < len(treatments_data):
+                doc.add_page_break()
+        return {"mode": "serial", "workers": 1, "sections": len(treatments_data)}
+
+    rendering = {}
+    for fragment in iter_treatment_parts(treatments_data, workers, rendering, sections):
+        append_body_xml(doc, fragment)
+    return rendering
+
+
+class ReportTemplate:
+    """A pre-built .docx package (styles and static pages) cloned for each report"""
+
+    def __init__(self, package: bytes, version: str = ""):
+        self.package = package
+        self.version = version
+
+    @classmethod
+    def build(cls, build: Optional[Callable[[Any], None]] = None, version: str = "") -> "ReportTemplate":
+        """Run build (style setup, static pages) on a blank document and keep the saved package"""
+        doc = docx.Document()
+        if build:
+            build(doc)
+        package = BytesIO()
+        doc.save(package)
+        return cls(package.getvalue(), version)
+
+    def new_document(self):
+        """A fresh python-docx Document with the template's styles and static content"""
+        return docx.Document(BytesIO(self.package))
+
+    def document_xml(self) -> bytes:
+        with zipfile.ZipFile(BytesIO(self.package)) as package:
+            return package.read(DOCUMENT_PART)
+
+
+def load_report_template(name: str, build: Callable[[Any], None], dependencies: Tuple[Callable, ...] = (),
+                         key: Any = None, cache_dir: Optional[str] = None) -> ReportTemplate:
+    """
+    Build a report template once per process (and once per version on disk).
+
+    Args:
+        name: Template name (also the cache file prefix)
+        build: Adds styles and static pages to a blank document
+        dependencies: Functions build calls; their code is part of the template version
+        key: Extra version input for static content that varies (e.g. the report date)
+        cache_dir: Directory for <name>-<version>.docx copies shared across processes
+
+    Returns:
+        The cached ReportTemplate
+    """
+    version = hash_value({"code": code_fingerprint(build, *dependencies), "key": key})[:16]
+    cache_key = f"{name}-{version}"
+    template = _report_templates.get(cache_key)
+    if template is not None:
+        return template
+
+    path = os.path.join(cache_dir, f"{cache_key}.docx") if cache_dir else None
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            template = ReportTemplate(f.read(), version)
+    else:
+        template = ReportTemplate.build(build, version)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(template.package)
+            os.replace(tmp_path, path)
+
+    _report_templates[cache_key] = template
+    return template
+
+
+class StreamingDocxWriter:
+    """
+    Write a .docx whose document.xml is streamed into the zip section by section.
+
+    Content is built in a small scratch document (with the same styles as the
+    output) and flushed after each section, so memory is bounded by the largest
+    section rather than the whole report. Other package parts (styles, numbering,
+    settings) and any static pages come from a ReportTemplate, or from a blank
+    python-docx package passed through setup_styles.
+
+    Usage:
+        with StreamingDocxWriter(path, template=template) as writer:
+            add_title(writer.scratch)
+            writer.flush()
+    """
+
+    def __init__(self, output_path: str, setup_styles: Optional[Callable[[Any], None]] = None,
+                 template: Optional[ReportTemplate] = None):
+        self.output_path = str(output_path)
+        self.tmp_path = f"{self.output_path}.tmp"
+        self.bytes_written = 0
+        self.flushes = 0
+
+        template = template or ReportTemplate.build(setup_styles)
+
+        # Scratch document shares the template styles; its section properties live in the document tail
+        self.scratch = template.new_document()
+        clear_body(self.scratch)
+        self.scratch.element.body.remove(self.scratch.element.body.sectPr)
+
+        # Static template content stays in the head; the body's section properties close the document
+        document = template.document_xml()
+        split = document.rindex(b"<w:sectPr")
+        self._head, self._tail = document[:split], document[split:]
+
+        self._zip = zipfile.ZipFile(self.tmp_path, "w", compression=zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(BytesIO(template.package)) as source:
+            for item in source.infolist():
+                if item.filename != DOCUMENT_PART:
+                    self._zip.writestr(item.filename, source.read(item.filename))
+        self._stream = self._zip.open(DOCUMENT_PART, "w", force_zip64=True)
+        self._write(self._head)
+
+    def __enter__(self) -> "StreamingDocxWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _write(self, data: bytes):
+        if data:
+            self._stream.write(data)
+            self.bytes_written += len(data)
+
+    def flush(self):
+        """Write everything added to the scratch document so far and clear it"""
+        self._write(body_xml(self.scratch))
+        clear_body(self.scratch)
+        self.flushes += 1
+
+    def write_fragment(self, fragment: bytes):
+        """Write a body XML fragment (e.g. from render_treatment_part) after the flushed content"""
+        self.flush()
+        self._write(fragment)
+
+    def close(self):
+        """Finish document.xml and move the package into place"""
+        self.flush()
+        self._write(self._tail)
+        self._stream.close()
+        self._zip.close()
+        os.replace(self.tmp_path, self.output_path)
+
+    def abort(self):
+        """Discard the partially written package"""
+        try:
+            self._stream.close()
+            self._zip.close()
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+def stream_treatment_sections(writer: StreamingDocxWriter, treatments_data: List[Dict[str, Any]],
+                              workers: Optional[int] = None,
+                              sections: Tuple[str, ...] = DEFAULT_SECTIONS) -> Dict[str, Any]:
+    """Render treatment sections straight into a streaming writer, one section in memory at a time"""
+    workers = workers or os.cpu_count() or 1
+    if not _use_process_pool(workers, len(treatments_data)):
+        for i, treatment_data in enumerate(treatments_data, 1):
+            add_treatment_section(writer.scratch, treatment_data, i, sections)
+            if i < len(treatments_data):
+                writer.scratch.add_page_break()
+            writer.flush()
+        return {"mode": "serial", "workers": 1, "sections": len(treatments_data)}
+
+    rendering = {}
+    for fragment in iter_treatment_parts(treatments_data, workers, rendering, sections):
+        writer.write_fragment(fragment)
+    return rendering
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Report Spec - declares which report sections a run produces
+The pipeline derives the per-treatment stages to run from the requested
+sections, so analyses that feed no requested section cost no LLM calls
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Tuple, Iterable
+
+# Every section a report can contain, in report order
+REPORT_SECTIONS = (
+    'overview', 'sources', 'risk', 'revenue', 'customer_impact', 'enhanced_report', 'recommendations', 'appendix'
+)
+# Per-treatment stages whose outputs each section renders
+SECTION_STAGES = {
+    'overview': ('detailed_description',),
+    'sources': (),
+    'risk': ('risk_assessment',),
+    'revenue': ('revenue_analysis',),
+    'customer_impact': ('customer_impact',),
+    'enhanced_report': ('enhanced_report',),
+    # Portfolio ranking and strategy per treatment
+    'recommendations': ('risk_assessment', 'revenue_analysis'),
+    # Metric tables of whichever analysis sections are included
+    'appendix': ()
+}
+# The enhanced report re-runs the LLM over every other analysis, so it is opt-in
+DEFAULT_SECTIONS = tuple(section for section in REPORT_SECTIONS if section != 'enhanced_report')
+
+
+@dataclass(frozen=True)
+class ReportSpec:
+    """Sections requested from a run (hashable, so it can key caches and agent configurations)"""
+    sections: Tuple[str, ...] = DEFAULT_SECTIONS
+
+    def __post_init__(self):
+        unknown = [section for section in self.sections if section not in SECTION_STAGES]
+        if unknown:
+            raise ValueError(
+                f"Unknown report section(s) {', '.join(unknown)} (expected any of {', '.join(REPORT_SECTIONS)})"
+            )
+        # Canonical order, so specs listing the same sections compare equal
+        object.__setattr__(self, 'sections', tuple(s for s in REPORT_SECTIONS if s in set(self.sections)))
+
+    @classmethod
+    def of(cls, sections: Iterable[str]) -> "ReportSpec":
+        return cls(tuple(sections))
+
+    def includes(self, section: str) -> bool:
+        return section in self.sections
+
+    def required_stages(self, dependencies: Dict[str, Tuple[str, ...]]) -> Tuple[str, ...]:
+        """
+        Stages the requested sections need, plus their upstream stages, in dependency order.
+
+        Args:
+            dependencies: {stage: upstream stages}, e.g. revenue_analysis -> (risk_assessment,)
+        """
+        ordered = []
+
+        def visit(stage: str):
+            if stage in ordered:
+                return
+            for upstream in dependencies.get(stage, ()):
+                visit(upstream)
+            ordered.append(stage)
+
+        for section in self.sections:
+            for stage in SECTION_STAGES[section]:
+                visit(stage)
+        return tuple(ordered)
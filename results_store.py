@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Results Store - columnar sink for per-treatment analysis outputs
+Appends each run's metrics and scores to date-partitioned Parquet files and keeps
+long narrative text in a content-addressed store referenced from the table
+"""
+
+import gzip
+import hashlib
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+
+from risk_engine import RISK_CATEGORIES
+
+PARTITION_PREFIX = "run_date="
+TEXT_FIELDS = {
+    "description_ref": lambda t: t.get("detailed_description"),
+    "risk_narrative_ref": lambda t: _get(t, "risk_assessment", "detailed_analysis"),
+    "revenue_narrative_ref": lambda t: _get(t, "revenue_analysis", "detailed_analysis"),
+    "customer_narrative_ref": lambda t: _get(t, "customer_impact", "customer_impact_analysis")
+}
+
+
+def _get(treatment: Dict[str, Any], section: str, key: str) -> Any:
+    value = treatment.get(section)
+    return value.get(key) if isinstance(value, dict) else None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TextStore:
+    """Content-addressed gzip text blobs; identical text is stored once"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def put(self, text: str) -> str:
+        """Store text and return its reference (sha256 hex digest)"""
+        ref = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        path = self._path(ref)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        return ref
+
+    def get(self, ref: str) -> str:
+        with gzip.open(self._path(ref), "rt", encoding="utf-8") as f:
+            return f.read()
+
+    def _path(self, ref: str) -> Path:
+        return self.root / ref[:2] / f"{ref}.txt.gz"
+
+
+class ResultsStore:
+    """Append-only, date-partitioned Parquet table of per-treatment results"""
+
+    def __init__(self, root: str = "./hackathon_output/results"):
+        self.root = Path(root)
+        self.table_root = self.root / "treatments"
+        self.texts = TextStore(str(self.root / "texts"))
+
+    def treatment_row(self, treatment: Dict[str, Any], run_id: str, run_timestamp: str) -> Dict[str, Any]:
+        """Flatten one processed treatment into a table row"""
+        risk = treatment.get("risk_assessment") if isinstance(treatment.get("risk_assessment"), dict) else {}
+        revenue = treatment.get("revenue_analysis") if isinstance(treatment.get("revenue_analysis"), dict) else {}
+        customer = treatment.get("customer_impact") if isinstance(treatment.get("customer_impact"), dict) else {}
+        sensitivity = revenue.get("sensitivity_analysis") if isinstance(revenue.get("sensitivity_analysis"), dict) else {}
+        segmentation = customer.get("segmentation") if isinstance(customer.get("segmentation"), dict) else {}
+        risk_parameters = risk.get("risk_parameters") if isinstance(risk.get("risk_parameters"), dict) else {}
+        source_files = treatment.get("source_files", [])
+
+        row = {
+            "run_id": run_id,
+            "run_timestamp": run_timestamp,
+            "treatment_id": str(treatment.get("treatment_id", "")),
+            "treatment_name": str(treatment.get("treatment_name", "")),
+            "category": str(treatment.get("category", "")),
+            "source_files": "; ".join(source_files) if isinstance(source_files, list) else str(source_files),
+            "overall_risk_score": _to_float(risk.get("overall_risk_score")),
+            "risk_category": str(risk.get("risk_category", "")),
+            "revenue_p5": _to_float(sensitivity.get("revenue_p5")),
+            "revenue_p50": _to_float(sensitivity.get("revenue_p50")),
+            "revenue_p95": _to_float(sensitivity.get("revenue_p95")),
+            "deterministic_revenue": _to_float(sensitivity.get("deterministic_projection")),
+            "probability_strong_case": _to_float(sensitivity.get("probability_strong_case")),
+            "revenue_projection_year1": str(revenue.get("revenue_projection_year1", "")),
+            "addressable_population": _to_float(segmentation.get("total_population")),
+            "expected_uptake": _to_float(segmentation.get("total_expected_uptake"))
+        }
+        for category in RISK_CATEGORIES:
+            row[category] = _to_float(risk_parameters.get(category))
+
+        # Narratives live in the text store; the table only keeps references
+        for column, extract in TEXT_FIELDS.items():
+            text = extract(treatment)
+            row[column] = self.texts.put(str(text)) if text else None
+        return row
+
+    def append_run(self, treatments: List[Dict[str, Any]], run_id: Optional[str] = None) -> Optional[str]:
+        """
+        Append one run's treatments as a new Parquet file in today's partition.
+
+        Args:
+            treatments: Processed treatment dicts
+            run_id: Run identifier (defaults to a timestamp)
+
+        Returns:
+            Path of the written Parquet file, or None when there was nothing to write
+        """
+        if not treatments:
+            return None
+
+        now = datetime.now()
+        run_id = run_id or now.strftime("run_%Y%m%d_%H%M%S")
+        run_timestamp = now.isoformat()
+        frame = pd.DataFrame([self.treatment_row(t, run_id, run_timestamp) for t in treatments])
+
+        partition = self.table_root / f"{PARTITION_PREFIX}{now.strftime('%Y-%m-%d')}"
+        partition.mkdir(parents=True, exist_ok=True)
+        path = partition / f"{run_id}.parquet"
+        suffix = 1
+        while path.exists():
+            path = partition / f"{run_id}_{suffix}.parquet"
+            suffix += 1
+        tmp_path = partition / f".{path.name}.tmp"
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return str(path)
+
+    def query(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+              columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load results across runs, reading only partitions in the date range.
+
+        Args:
+            start_date: Inclusive 'YYYY-MM-DD' lower bound
+            end_date: Inclusive 'YYYY-MM-DD' upper bound
+            columns: Optional column subset (only these columns are read from disk)
+
+        Returns:
+            DataFrame with a run_date column added
+        """
+        frames = []
+        if self.table_root.exists():
+            for partition in sorted(self.table_root.glob(f"{PARTITION_PREFIX}*")):
+                run_date = partition.name[len(PARTITION_PREFIX):]
+                if (start_date and run_date < start_date) or (end_date and run_date > end_date):
+                    continue
+                for path in sorted(partition.glob("*.parquet")):
+                    frame = pd.read_parquet(path, columns=columns)
+                    frame["run_date"] = run_date
+                    frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=(columns or []) + ["run_date"])
+        return pd.concat(frames, ignore_index=True)
+
+    def load_text(self, ref: Optional[str]) -> str:
+        """Resolve a text reference column value"""
+        return self.texts.get(ref) if ref else ""
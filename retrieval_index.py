@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Local Retrieval Index - BM25 over ingested document chunks
+In-process inverted index used to feed relevant passages into per-treatment prompts;
+chunks of streamed sources keep their text in an on-disk chunk file
+"""
+
+import gzip
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Chunks indexed per streamed source; past this, coverage is thinned evenly across the source
+MAX_SOURCE_CHUNKS = 2000
+
+STOPWORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "this", "to", "was",
+    "were", "will", "with"
+])
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenizer shared by indexing and querying"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_text(text: str, chunk_words: int = 200, overlap: int = 40) -> List[str]:
+    """Split text into overlapping word windows"""
+    words = text.split()
+    if not words:
+        return []
+
+    step = max(1, chunk_words - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+class BM25Index:
+    """Incremental BM25 inverted index over document chunks"""
+
+    def __init__(self, index_path: Optional[str] = None, k1: float = 1.5, b: float = 0.75,
+                 chunk_words: int = 200, overlap: int = 40, max_source_chunks: int = MAX_SOURCE_CHUNKS):
+        self.index_path = Path(index_path) if index_path else None
+        self.k1 = k1
+        self.b = b
+        self.chunk_words = chunk_words
+        self.overlap = overlap
+        self.max_source_chunks = max(2, max_source_chunks)
+
+        # chunk_id -> {"source", "text", "length"}, or {"source", "offset", "size", "length"} for stored chunks
+        self.chunks: Dict[int, Dict[str, Any]] = {}
+        # term -> {chunk_id: term frequency}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        # source -> {"hash", "chunk_ids"} (streamed sources also record "stride", "seen" and their file info)
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0
+        self.next_chunk_id = 0
+        # Guards index mutation when files are parsed on a worker pool
+        self._lock = threading.RLock()
+        # Chunk text of streamed sources, next to the index file (a temporary file without one)
+        self.chunk_store_path = (
+            self.index_path.with_name(self.index_path.name.split(".")[0] + "_chunks.txt")
+            if self.index_path else None
+        )
+        self._chunk_store = None
+
+        if self.index_path and self.index_path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_document(self, source: str, text: str) -> int:
+        """
+        Add or refresh a document in the index.
+
+        Args:
+            source: Unique source identifier (usually the file path)
+            text: Full document text
+
+        Returns:
+            Number of chunks added (0 if the document is unchanged)
+        """
+        with self._lock:
+            content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            existing = self.sources.get(source)
+            if existing and existing["hash"] == content_hash:
+                return 0
+            if existing:
+                self.remove_document(source)
+
+            chunk_ids = [self._add_chunk(source, chunk) for chunk in chunk_text(text, self.chunk_words, self.overlap)]
+            self.sources[source] = {"hash": content_hash, "chunk_ids": chunk_ids}
+            return len(chunk_ids)
+
+    def source_info(self, source: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Entry of a completely indexed source whose content hash matches, else None"""
+        with self._lock:
+            entry = self.sources.get(source)
+            return entry if entry and entry["hash"] == content_hash else None
+
+    def add_chunks(self, source: str, chunks: List[str]) -> int:
+        """
+        Append pre-chunked text of a streamed source.
+
+        Chunk text goes to the on-disk chunk store, so memory holds only postings and
+        offsets. At most max_source_chunks chunks stay indexed per source: when the cap
+        is reached every other indexed chunk is dropped and the sampling stride doubles,
+        keeping coverage even across the whole source. The source only counts as
+        indexed once finish_source records its content hash.
+
+        Args:
+            source: Unique source identifier
+            chunks: Text chunks to append
+
+        Returns:
+            Number of chunks added
+        """
+        with self._lock:
+            entry = self.sources.setdefault(source, {"hash": "", "chunk_ids": [], "stride": 1, "seen": 0})
+            added = 0
+            for chunk in chunks:
+                if not chunk.strip():
+                    continue
+                position = entry["seen"]
+                entry["seen"] += 1
+                if position % entry["stride"]:
+                    continue
+                entry["chunk_ids"].append(self._add_chunk(source, chunk, stored=True))
+                added += 1
+                if len(entry["chunk_ids"]) > self.max_source_chunks:
+                    for chunk_id in entry["chunk_ids"][1::2]:
+                        self._remove_chunk(chunk_id)
+                    entry["chunk_ids"] = entry["chunk_ids"][::2]
+                    entry["stride"] *= 2
+            return added
+
+    def finish_source(self, source: str, content_hash: str, **info):
+        """Mark a streamed source as completely indexed under its content hash (plus file info to reuse)"""
+        with self._lock:
+            entry = self.sources.setdefault(source, {"hash": "", "chunk_ids": [], "stride": 1, "seen": 0})
+            entry.update(info)
+            entry["hash"] = content_hash
+
+    def remove_document(self, source: str):
+        """Remove all chunks belonging to a source"""
+        with self._lock:
+            entry = self.sources.pop(source, None)
+            if not entry:
+                return
+
+            for chunk_id in entry["chunk_ids"]:
+                self._remove_chunk(chunk_id)
+
+    def _remove_chunk(self, chunk_id: int):
+        chunk = self.chunks.get(chunk_id)
+        if not chunk:
+            return
+        text = self._chunk_text(chunk)
+        del self.chunks[chunk_id]
+        self.total_length -= chunk["length"]
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank chunks against a free-text query.
+
+        Args:
+            query: Query text
+            top_k: Maximum number of passages to return
+
+        Returns:
+            List of passages with source, text and BM25 score
+        """
+        with self._lock:
+            if not self.chunks:
+                return []
+
+            n_chunks = len(self.chunks)
+            avg_length = self.total_length / n_chunks if n_chunks else 0.0
+            scores: Dict[int, float] = {}
+
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    length = self.chunks[chunk_id]["length"]
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [
+                {
+                    "chunk_id": chunk_id,
+                    "source": self.chunks[chunk_id]["source"],
+                    "text": self._chunk_text(self.chunks[chunk_id]),
+                    "score": round(score, 4)
+                }
+                for chunk_id, score in best
+            ]
+
+    def get_context(self, query: str, top_k: int = 5, max_chars: int = 4000) -> str:
+        """Return the top passages for a query formatted for prompt injection, bounded by max_chars"""
+        passages = []
+        used = 0
+        for hit in self.search(query, top_k=top_k):
+            passage = f"[{Path(hit['source']).name}] {hit['text']}"
+            if used + len(passage) > max_chars:
+                passage = passage[:max(0, max_chars - used)]
+            if not passage:
+                break
+            passages.append(passage)
+            used += len(passage)
+        return "\n\n".join(passages)
+
+    def save(self):
+        """Persist the index to disk (gzip JSON, atomic replace)"""
+        if not self.index_path:
+            return
+
+        with self._lock:
+            self._compact_chunk_store()
+            payload = {
+                "k1": self.k1,
+                "b": self.b,
+                "chunk_words": self.chunk_words,
+                "overlap": self.overlap,
+                "next_chunk_id": self.next_chunk_id,
+                "sources": self.sources,
+                "chunks": {str(chunk_id): chunk for chunk_id, chunk in self.chunks.items()}
+            }
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(self.index_path.suffix + ".tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.index_path)
+
+    def load(self):
+        """Load a persisted index and rebuild the postings lists"""
+        with gzip.open(self.index_path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+
+        self.k1 = payload.get("k1", self.k1)
+        self.b = payload.get("b", self.b)
+        self.chunk_words = payload.get("chunk_words", self.chunk_words)
+        self.overlap = payload.get("overlap", self.overlap)
+        self.next_chunk_id = payload.get("next_chunk_id", 0)
+        self.sources = payload.get("sources", {})
+        self.chunks = {}
+        self.postings = {}
+        self.total_length = 0
+
+        for chunk_id, chunk in payload.get("chunks", {}).items():
+            if "text" in chunk:
+                self._index_chunk(int(chunk_id), chunk["source"], chunk["text"])
+            else:
+                location = {"offset": chunk["offset"], "size": chunk["size"]}
+                self._index_chunk(int(chunk_id), chunk["source"], self._chunk_text(location), location)
+
+    def _add_chunk(self, source: str, text: str, stored: bool = False) -> int:
+        chunk_id = self.next_chunk_id
+        self.next_chunk_id += 1
+        self._index_chunk(chunk_id, source, text, self._store_text(text) if stored else None)
+        return chunk_id
+
+    def _index_chunk(self, chunk_id: int, source: str, text: str, location: Optional[Dict[str, int]] = None):
+        tokens = tokenize(text)
+        if location is None:
+            self.chunks[chunk_id] = {"source": source, "text": text, "length": len(tokens)}
+        else:
+            self.chunks[chunk_id] = {"source": source, **location, "length": len(tokens)}
+        self.total_length += len(tokens)
+
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for term, tf in frequencies.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+
+    # ==================== CHUNK STORE ====================
+
+    def _store_file(self):
+        if self._chunk_store is None:
+            if self.chunk_store_path:
+                self.chunk_store_path.parent.mkdir(parents=True, exist_ok=True)
+                self._chunk_store = open(self.chunk_store_path, "a+b")
+            else:
+                self._chunk_store = tempfile.TemporaryFile()
+        return self._chunk_store
+
+    def _store_text(self, text: str) -> Dict[str, int]:
+        data = text.encode("utf-8")
+        store = self._store_file()
+        store.seek(0, os.SEEK_END)
+        offset = store.tell()
+        store.write(data)
+        return {"offset": offset, "size": len(data)}
+
+    def _chunk_text(self, chunk: Dict[str, Any]) -> str:
+        if "text" in chunk:
+            return chunk["text"]
+        store = self._store_file()
+        store.flush()
+        store.seek(chunk["offset"])
+        return store.read(chunk["size"]).decode("utf-8")
+
+    def _compact_chunk_store(self):
+        """Rewrite the chunk file with live chunks only once dropped chunks take up most of it"""
+        if self._chunk_store is None or not self.chunk_store_path:
+            return
+        stored = [chunk for chunk in self.chunks.values() if "text" not in chunk]
+        live = sum(chunk["size"] for chunk in stored)
+        self._chunk_store.seek(0, os.SEEK_END)
+        if self._chunk_store.tell() <= 2 * live:
+            self._chunk_store.flush()
+            return
+        tmp_path = self.chunk_store_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as out:
+            for chunk in stored:
+                data = self._chunk_text(chunk).encode("utf-8")
+                chunk["offset"] = out.tell()
+                out.write(data)
+        self._chunk_store.close()
+        os.replace(tmp_path, self.chunk_store_path)
+        self._chunk_store = open(self.chunk_store_path, "a+b")
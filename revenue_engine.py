@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Revenue Projection Engine - vectorized batch revenue projections
+NumPy implementation of the analyze_revenue_opportunities rules that scores
+thousands of treatments in one call, plus a per-treatment wrapper that keeps
+the existing dict output and a seeded Monte Carlo engine for revenue bands
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Sequence, Union
+
+import numpy as np
+
+MARKET_LEVELS = np.array(["High", "Medium", "Low"])
+BUSINESS_CASE_LEVELS = np.array(["Strong", "Moderate", "Weak"])
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+DEFAULT_SIMULATIONS = 10000
+DEFAULT_SEED = 42
+BAND_PERCENTILES = (5, 50, 95)
+# Treatments simulated per block, keeping the (samples x treatments) matrices small
+SIMULATION_BLOCK_SIZE = 256
+
+
+@dataclass
+class RevenueParameters:
+    """Assumptions used by the deterministic revenue projection"""
+    base_coverage_amount: float = 10000.0
+    high_risk_threshold: float = 6.0
+    low_risk_threshold: float = 3.0
+    favorable_risk_threshold: float = 4.0
+    readiness_threshold: float = 5.0
+    high_multiplier: float = 1.2
+    medium_multiplier: float = 1.0
+    low_multiplier: float = 0.8
+    new_customers_high_market: float = 50000
+    new_customers_other_market: float = 25000
+    existing_candidates_high_market: float = 20000
+    existing_candidates_other_market: float = 10000
+    favorable_conversion_rate: float = 0.15
+    standard_conversion_rate: float = 0.08
+    favorable_upsell_rate: float = 0.25
+    standard_upsell_rate: float = 0.15
+    new_customer_revenue_share: float = 0.1
+    existing_customer_revenue_share: float = 0.05
+    strong_case_threshold: float = 1000000
+    moderate_case_threshold: float = 500000
+
+
+def project_revenue_batch(risk_scores: ArrayLike, params: Optional[RevenueParameters] = None,
+                          base_coverage_amount: Optional[ArrayLike] = None,
+                          new_customer_sizes: Optional[ArrayLike] = None,
+                          existing_candidates: Optional[ArrayLike] = None) -> Dict[str, np.ndarray]:
+    """
+    Project revenue for many treatments in one vectorized pass.
+
+    Args:
+        risk_scores: Overall risk score (0-10) per treatment
+        params: Revenue assumptions (defaults match the original scalar tool)
+        base_coverage_amount: Optional per-treatment base coverage overriding params
+        new_customer_sizes: Optional per-treatment new customer audience overriding the market-level default
+        existing_candidates: Optional per-treatment existing customer candidates overriding the market-level default
+
+    Returns:
+        Dict of arrays, one element per treatment
+    """
+    p = params or RevenueParameters()
+    risk = np.asarray(risk_scores, dtype=float)
+
+    market_index = np.where(risk <= p.low_risk_threshold, 0,
+                            np.where(risk <= p.high_risk_threshold, 1, 2))
+    multiplier = np.choose(market_index, [p.high_multiplier, p.medium_multiplier, p.low_multiplier])
+    is_high_market = market_index == 0
+    favorable = risk <= p.favorable_risk_threshold
+
+    base = np.broadcast_to(
+        np.asarray(p.base_coverage_amount if base_coverage_amount is None else base_coverage_amount, dtype=float),
+        risk.shape
+    )
+    suggested_coverage = base * multiplier
+
+    if new_customer_sizes is None:
+        new_size = np.where(is_high_market, p.new_customers_high_market, p.new_customers_other_market)
+    else:
+        new_size = np.broadcast_to(np.asarray(new_customer_sizes, dtype=float), risk.shape)
+    if existing_candidates is None:
+        candidates = np.where(is_high_market, p.existing_candidates_high_market, p.existing_candidates_other_market)
+    else:
+        candidates = np.broadcast_to(np.asarray(existing_candidates, dtype=float), risk.shape)
+
+    conversion = np.where(favorable, p.favorable_conversion_rate, p.standard_conversion_rate)
+    upsell = np.where(favorable, p.favorable_upsell_rate, p.standard_upsell_rate)
+
+    new_revenue = new_size * conversion * suggested_coverage * p.new_customer_revenue_share
+    existing_revenue = candidates * upsell * suggested_coverage * p.existing_customer_revenue_share
+    total_revenue = new_revenue + existing_revenue
+
+    case_index = np.where(total_revenue > p.strong_case_threshold, 0,
+                          np.where(total_revenue > p.moderate_case_threshold, 1, 2))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi_percent = np.where(suggested_coverage > 0, total_revenue / suggested_coverage * 100, 0.0)
+
+    return {
+        "risk_score": risk,
+        "market_potential": MARKET_LEVELS[market_index],
+        "risk_adjusted_score": 10 - risk,
+        "market_ready": risk <= p.readiness_threshold,
+        "base_coverage_amount": base,
+        "risk_multiplier": multiplier,
+        "suggested_coverage_limit": suggested_coverage,
+        "favorable_terms": favorable,
+        "new_customer_size": new_size,
+        "existing_candidates": candidates,
+        "conversion_rate": conversion,
+        "upsell_rate": upsell,
+        "new_customer_revenue": new_revenue,
+        "existing_customer_revenue": existing_revenue,
+        "total_annual_projection": total_revenue,
+        "roi_percent": roi_percent,
+        "business_case": BUSINESS_CASE_LEVELS[case_index]
+    }
+
+
+def _format_projection(treatment_id: str, batch: Dict[str, np.ndarray], i: int,
+                       timestamp: str) -> Dict[str, Any]:
+    """Build the legacy analyze_revenue_opportunities dict for element i of a batch"""
+    risk_score = float(batch["risk_score"][i])
+    market_potential = str(batch["market_potential"][i])
+    multiplier = float(batch["risk_multiplier"][i])
+    favorable = bool(batch["favorable_terms"][i])
+    suggested_coverage = float(batch["suggested_coverage_limit"][i])
+    new_customer_revenue = float(batch["new_customer_revenue"][i])
+    existing_customer_revenue = float(batch["existing_customer_revenue"][i])
+    total_projected_revenue = float(batch["total_annual_projection"][i])
+    business_case_strength = str(batch["business_case"][i])
+    base_coverage_amount = float(batch["base_coverage_amount"][i])
+    if base_coverage_amount.is_integer():
+        base_coverage_amount = int(base_coverage_amount)
+
+    return {
+        "treatment_id": treatment_id,
+        "market_potential": {
+            "level": market_potential,
+            "risk_adjusted_score": 10 - risk_score,
+            "market_readiness": "ready" if bool(batch["market_ready"][i]) else "requires_evaluation"
+        },
+        "pricing_strategy": {
+            "base_coverage_amount": base_coverage_amount,
+            "risk_multiplier": multiplier,
+            "suggested_coverage_limit": suggested_coverage,
+            "premium_adjustment": f"{int((multiplier - 1) * 100)}%"
+        },
+        "customer_segments": {
+            "new_customers": {
+                "target_demographic": "Age 25-65, health-conscious",
+                "estimated_size": int(batch["new_customer_size"][i]),
+                "conversion_rate": f"{round(float(batch['conversion_rate'][i]) * 100)}%"
+            },
+            "existing_customers": {
+                "upgrade_potential": "High" if favorable else "Medium",
+                "estimated_candidates": int(batch["existing_candidates"][i]),
+                "upsell_rate": f"{round(float(batch['upsell_rate'][i]) * 100)}%"
+            }
+        },
+        "revenue_projections": {
+            "new_customer_revenue": new_customer_revenue,
+            "existing_customer_revenue": existing_customer_revenue,
+            "total_annual_projection": total_projected_revenue,
+            "roi_estimate": f"{int(batch['roi_percent'][i])}%"
+        },
+        "business_case": {
+            "strength": business_case_strength,
+            "key_benefits": [
+                f"Market potential: {market_potential}",
+                f"Projected revenue: ${total_projected_revenue:,.2f}",
+                f"Risk level: {'Acceptable' if bool(batch['market_ready'][i]) else 'Requires mitigation'}"
+            ],
+            "recommendations": [
+                "Proceed with coverage" if business_case_strength == "Strong" else "Conduct further analysis",
+                "Target new customer acquisition" if new_customer_revenue > existing_customer_revenue else "Focus on existing customer upsell"
+            ]
+        },
+        "analysis_timestamp": timestamp
+    }
+
+
+def analyze_revenue_batch(treatment_ids: List[str], risk_scores: ArrayLike,
+                          params: Optional[RevenueParameters] = None) -> List[Dict[str, Any]]:
+    """Vectorized projection for many treatments, returned in the per-treatment dict format"""
+    batch = project_revenue_batch(risk_scores, params)
+    timestamp = datetime.now().isoformat()
+    return [_format_projection(treatment_id, batch, i, timestamp) for i, treatment_id in enumerate(treatment_ids)]
+
+
+def analyze_revenue(treatment_id: str, risk_score: float,
+                    params: Optional[RevenueParameters] = None) -> Dict[str, Any]:
+    """Single-treatment wrapper keeping the analyze_revenue_opportunities output format"""
+    return analyze_revenue_batch([treatment_id], [risk_score], params)[0]
+
+
+# ==================== MONTE CARLO SENSITIVITY ====================
+
+@dataclass
+class Distribution:
+    """Sampling distribution for one uncertain assumption"""
+    kind: str = "fixed"  # fixed, uniform, triangular, normal or lognormal
+    low: float = 1.0
+    mode: float = 1.0
+    high: float = 1.0
+    std: float = 0.0
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        if self.kind == "fixed":
+            return np.full(size, self.mode, dtype=float)
+        if self.kind == "uniform":
+            return rng.uniform(self.low, self.high, size)
+        if self.kind == "triangular":
+            return rng.triangular(self.low, self.mode, self.high, size)
+        if self.kind == "normal":
+            return np.clip(rng.normal(self.mode, self.std, size), self.low, self.high)
+        if self.kind == "lognormal":
+            return np.clip(self.mode * rng.lognormal(0.0, self.std, size), self.low, self.high)
+        raise ValueError(f"Unknown distribution kind: {self.kind}")
+
+    def describe(self) -> str:
+        if self.kind == "fixed":
+            return f"fixed at {self.mode:g}"
+        if self.kind == "uniform":
+            return f"uniform {self.low:g}-{self.high:g}"
+        if self.kind == "triangular":
+            return f"triangular {self.low:g}/{self.mode:g}/{self.high:g}"
+        return f"{self.kind} around {self.mode:g} (sd {self.std:g}), clipped to {self.low:g}-{self.high:g}"
+
+
+def _default_assumptions() -> Dict[str, Distribution]:
+    return {
+        # Absolute base coverage in USD
+        "base_coverage_amount": Distribution("triangular", 8000, 10000, 12500),
+        # Multipliers on the market-level defaults used by the deterministic projection
+        "new_customer_size_factor": Distribution("triangular", 0.6, 1.0, 1.3),
+        "existing_candidates_factor": Distribution("triangular", 0.8, 1.0, 1.2),
+        "conversion_rate_factor": Distribution("triangular", 0.5, 1.0, 1.4),
+        "upsell_rate_factor": Distribution("triangular", 0.6, 1.0, 1.3)
+    }
+
+
+@dataclass
+class SimulationAssumptions:
+    """Distributions sampled by the Monte Carlo engine, keyed by assumption name"""
+    distributions: Dict[str, Distribution] = field(default_factory=_default_assumptions)
+
+
+def simulate_revenue_batch(risk_scores: ArrayLike, n_simulations: int = DEFAULT_SIMULATIONS,
+                           seed: int = DEFAULT_SEED, assumptions: Optional[SimulationAssumptions] = None,
+                           params: Optional[RevenueParameters] = None,
+                           percentiles: Sequence[float] = BAND_PERCENTILES) -> Dict[str, np.ndarray]:
+    """
+    Monte Carlo revenue bands for many treatments.
+
+    Assumptions are sampled once per simulation and shared across treatments, so
+    bands are comparable between treatments and identical for the same seed.
+
+    Args:
+        risk_scores: Overall risk score (0-10) per treatment
+        n_simulations: Number of Monte Carlo draws
+        seed: Random seed for reproducible bands
+        assumptions: Sampling distributions (defaults centred on the deterministic constants)
+        params: Revenue assumptions for the deterministic rules
+        percentiles: Percentiles to report
+
+    Returns:
+        Dict with a (treatments x percentiles) "bands" array, plus per-treatment
+        "mean", "deterministic" and "probability_strong" arrays
+    """
+    p = params or RevenueParameters()
+    dists = (assumptions or SimulationAssumptions()).distributions
+    rng = np.random.default_rng(seed)
+    draws = {name: dists[name].sample(rng, n_simulations) for name in _default_assumptions()
+             if name in dists}
+    ones = np.ones(n_simulations)
+
+    deterministic = project_revenue_batch(risk_scores, p)
+    risk = deterministic["risk_score"].reshape(-1)
+    n_treatments = risk.shape[0]
+
+    base = draws.get("base_coverage_amount", ones * p.base_coverage_amount)[:, None]
+    new_factor = draws.get("new_customer_size_factor", ones)[:, None]
+    existing_factor = draws.get("existing_candidates_factor", ones)[:, None]
+    conversion_factor = draws.get("conversion_rate_factor", ones)[:, None]
+    upsell_factor = draws.get("upsell_rate_factor", ones)[:, None]
+
+    bands = np.empty((n_treatments, len(percentiles)))
+    mean = np.empty(n_treatments)
+    probability_strong = np.empty(n_treatments)
+    for start in range(0, n_treatments, SIMULATION_BLOCK_SIZE):
+        block = slice(start, start + SIMULATION_BLOCK_SIZE)
+        coverage = base * deterministic["risk_multiplier"].reshape(-1)[block]
+        new_revenue = (deterministic["new_customer_size"].reshape(-1)[block] * new_factor
+                       * deterministic["conversion_rate"].reshape(-1)[block] * conversion_factor
+                       * coverage * p.new_customer_revenue_share)
+        existing_revenue = (deterministic["existing_candidates"].reshape(-1)[block] * existing_factor
+                            * deterministic["upsell_rate"].reshape(-1)[block] * upsell_factor
+                            * coverage * p.existing_customer_revenue_share)
+        total = new_revenue + existing_revenue
+        bands[block] = np.percentile(total, percentiles, axis=0).T
+        mean[block] = total.mean(axis=0)
+        probability_strong[block] = (total > p.strong_case_threshold).mean(axis=0)
+
+    return {
+        "percentiles": np.asarray(percentiles, dtype=float),
+        "bands": bands,
+        "mean": mean,
+        "deterministic": deterministic["total_annual_projection"].reshape(-1),
+        "probability_strong": probability_strong
+    }
+
+
+def _driver_swings(risk_score: float, seed: int, n_simulations: int,
+                   assumptions: SimulationAssumptions, params: Optional[RevenueParameters]) -> List[Dict[str, Any]]:
+    """One-at-a-time P5/P95 swing of each assumption, ranked by impact on revenue"""
+    drivers = []
+    for name, dist in assumptions.distributions.items():
+        if dist.kind == "fixed":
+            continue
+        only_this = SimulationAssumptions({
+            other: (d if other == name else Distribution("fixed", mode=_central_value(other, params)))
+            for other, d in assumptions.distributions.items()
+        })
+        result = simulate_revenue_batch([risk_score], n_simulations, seed, only_this, params, (5, 95))
+        low, high = result["bands"][0]
+        drivers.append({
+            "variable": name,
+            "distribution": dist.describe(),
+            "revenue_at_p5": round(float(low), 2),
+            "revenue_at_p95": round(float(high), 2),
+            "swing": round(float(high - low), 2)
+        })
+    return sorted(drivers, key=lambda d: d["swing"], reverse=True)
+
+
+def _central_value(name: str, params: Optional[RevenueParameters]) -> float:
+    if name == "base_coverage_amount":
+        return (params or RevenueParameters()).base_coverage_amount
+    return 1.0
+
+
+def revenue_sensitivity(treatment_id: str, risk_score: float, n_simulations: int = DEFAULT_SIMULATIONS,
+                        seed: int = DEFAULT_SEED, assumptions: Optional[SimulationAssumptions] = None,
+                        params: Optional[RevenueParameters] = None) -> Dict[str, Any]:
+    """Single-treatment Monte Carlo summary used as the report's sensitivity analysis"""
+    assumptions = assumptions or SimulationAssumptions()
+    result = simulate_revenue_batch([risk_score], n_simulations, seed, assumptions, params)
+    p5, p50, p95 = (round(float(value), 2) for value in result["bands"][0])
+
+    return {
+        "treatment_id": treatment_id,
+        "method": "monte_carlo",
+        "simulations": n_simulations,
+        "seed": seed,
+        "risk_score": float(risk_score),
+        "deterministic_projection": round(float(result["deterministic"][0]), 2),
+        "revenue_p5": p5,
+        "revenue_p50": p50,
+        "revenue_p95": p95,
+        "expected_revenue": round(float(result["mean"][0]), 2),
+        "probability_strong_case": round(float(result["probability_strong"][0]), 4),
+        "key_drivers": _driver_swings(risk_score, seed, n_simulations, assumptions, params)
+    }
+
+
+def format_revenue_bands(sensitivity: Dict[str, Any]) -> str:
+    """Short text rendering of revenue_sensitivity output for prompts and reports"""
+    lines = [
+        f"Annual revenue P5: ${sensitivity['revenue_p5']:,.0f}",
+        f"Annual revenue P50: ${sensitivity['revenue_p50']:,.0f}",
+        f"Annual revenue P95: ${sensitivity['revenue_p95']:,.0f}",
+        f"Probability of a strong business case: {sensitivity['probability_strong_case']:.0%}"
+    ]
+    for driver in sensitivity.get("key_drivers", []):
+        lines.append(
+            f"Driver {driver['variable']} ({driver['distribution']}): "
+            f"${driver['revenue_at_p5']:,.0f} - ${driver['revenue_at_p95']:,.0f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Risk Scoring Engine - deterministic treatment risk scores
+Keyword and price features extracted from treatment text, combined through a
+configurable weight table into six category scores and a weighted overall score
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+RISK_CATEGORIES = (
+    "market_risk",
+    "medical_risk",
+    "financial_risk",
+    "regulatory_risk",
+    "technology_risk",
+    "provider_risk"
+)
+
+# Feature name -> (phrases that signal it, {risk category: score contribution per hit})
+DEFAULT_FEATURES: Dict[str, Tuple[Tuple[str, ...], Dict[str, float]]] = {
+    "invasive": (
+        ("surgery", "surgical", "invasive", "incision", "implant", "anesthesia", "anaesthesia", "transplant"),
+        {"medical_risk": 1.5, "provider_risk": 0.5, "financial_risk": 0.5}
+    ),
+    "non_invasive": (
+        ("non-invasive", "noninvasive", "non-surgical", "topical", "outpatient", "routine"),
+        {"medical_risk": -1.5, "provider_risk": -0.5}
+    ),
+    "adverse_events": (
+        ("complication", "side effect", "adverse", "infection", "scarring", "recovery time", "downtime"),
+        {"medical_risk": 1.0}
+    ),
+    "experimental": (
+        ("experimental", "investigational", "clinical trial", "off-label", "emerging", "novel", "pilot"),
+        {"regulatory_risk": 2.0, "medical_risk": 1.0, "market_risk": 0.5}
+    ),
+    "approved": (
+        ("fda approved", "fda-approved", "fda cleared", "fda-cleared", "evidence-based", "standard of care"),
+        {"regulatory_risk": -2.0, "medical_risk": -0.5}
+    ),
+    "regulated": (
+        ("regulation", "regulatory", "compliance", "licensing", "prescription", "controlled substance"),
+        {"regulatory_risk": 1.0}
+    ),
+    "elective": (
+        ("cosmetic", "elective", "aesthetic", "lifestyle", "optional"),
+        {"market_risk": 1.0, "financial_risk": 0.5}
+    ),
+    "competitive": (
+        ("competition", "competitive", "saturated", "crowded", "many providers", "widely available"),
+        {"market_risk": 1.5}
+    ),
+    "high_cost": (
+        ("expensive", "high cost", "costly", "financing", "payment plan", "not covered by insurance", "out-of-pocket"),
+        {"financial_risk": 1.5}
+    ),
+    "insured": (
+        ("covered by insurance", "insurance coverage", "medicare", "medicaid", "reimbursed"),
+        {"financial_risk": -1.0}
+    ),
+    "technology": (
+        ("laser", "robotic", "device", "equipment", "machine", "software", "digital", "3d", "imaging"),
+        {"technology_risk": 1.5, "financial_risk": 0.25}
+    ),
+    "specialist": (
+        ("specialist", "certified", "certification", "training", "board-certified", "limited providers", "referral"),
+        {"provider_risk": 1.5}
+    ),
+    "multi_session": (
+        ("sessions", "series of", "multiple visits", "maintenance", "follow-up", "ongoing"),
+        {"financial_risk": 0.5, "provider_risk": 0.5}
+    )
+}
+
+# Starting score per category, before feature contributions
+DEFAULT_BASELINE = {
+    "market_risk": 4.0,
+    "medical_risk": 3.5,
+    "financial_risk": 4.0,
+    "regulatory_risk": 3.5,
+    "technology_risk": 3.0,
+    "provider_risk": 3.5
+}
+
+# Category weights for the overall weighted average
+DEFAULT_CATEGORY_WEIGHTS = {
+    "market_risk": 0.15,
+    "medical_risk": 0.25,
+    "financial_risk": 0.25,
+    "regulatory_risk": 0.15,
+    "technology_risk": 0.10,
+    "provider_risk": 0.10
+}
+
+# Price bands (USD) -> financial risk contribution
+PRICE_BANDS = ((20000, 2.5), (5000, 1.5), (1000, 0.5), (0, -0.5))
+PRICE_PATTERN = re.compile(r"\$\s?(\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?\s?(k|thousand)?", re.IGNORECASE)
+# Repeated mentions stop adding risk after this many hits per feature
+MAX_HITS_PER_FEATURE = 3
+# Fields scored for every treatment. Extraction fills them before the batch pre-score, so
+# the pre-score and per-treatment fallback see the same text (later stage outputs are excluded)
+RISK_TEXT_FIELDS = ("treatment_name", "category", "raw_details", "raw_content")
+
+
+@dataclass
+class RiskWeights:
+    """Configurable weight table for the risk engine"""
+    features: Dict[str, Tuple[Tuple[str, ...], Dict[str, float]]] = field(default_factory=lambda: dict(DEFAULT_FEATURES))
+    baseline: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_BASELINE))
+    category_weights: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_CATEGORY_WEIGHTS))
+    price_bands: Tuple[Tuple[float, float], ...] = PRICE_BANDS
+
+
+def risk_category_for(score: float) -> str:
+    """Map a 0-10 score to the Low (0-3) / Medium (4-6) / High (7-10) categories"""
+    if score < 4:
+        return "Low"
+    if score < 7:
+        return "Medium"
+    return "High"
+
+
+def recommendation_for(score: float) -> str:
+    if score < 4:
+        return "Yes - proceed with standard monitoring"
+    if score < 7:
+        return "Conditional approval with monitoring"
+    return "No - requires mitigation before coverage"
+
+
+def treatment_text(treatment: Dict[str, Any]) -> str:
+    """Concatenate the treatment fields used for feature extraction"""
+    parts = [treatment.get(name, "") for name in RISK_TEXT_FIELDS]
+    return " ".join(str(part) for part in parts if part).lower()
+
+
+def phrase_pattern(phrase: str) -> str:
+    """Word-bounded regex for a phrase and its plural ("implants", "side effects", "surgeries")"""
+    if len(phrase) > 1 and phrase.endswith("y") and phrase[-2] not in "aeiou":
+        return r"\b" + re.escape(phrase[:-1]) + r"(?:y|ies)\b"
+    return r"\b" + re.escape(phrase) + r"(?:e?s)?\b"
+
+
+def extract_max_price(text: str) -> Optional[float]:
+    """Largest dollar amount mentioned in the text, if any"""
+    prices = []
+    for amount, thousands in PRICE_PATTERN.findall(text):
+        value = float(amount.replace(",", ""))
+        if thousands:
+            value *= 1000
+        prices.append(value)
+    return max(prices) if prices else None
+
+
+class RiskScoringEngine:
+    """Batch risk scoring: feature counts x weight table -> category and overall scores"""
+
+    def __init__(self, weights: Optional[RiskWeights] = None):
+        self.weights = weights or RiskWeights()
+        self.feature_names = list(self.weights.features)
+        # One longest-first alternation, so "non-invasive" is never also counted as "invasive";
+        # each phrase is a named group, so plural hits map back to their phrase
+        self._phrase_feature = {
+            phrase: col
+            for col, (phrases, _) in enumerate(self.weights.features.values())
+            for phrase in phrases
+        }
+        self._phrases = sorted(self._phrase_feature, key=len, reverse=True)
+        self._pattern = re.compile("|".join(
+            f"(?P<p{i}>{phrase_pattern(phrase)})" for i, phrase in enumerate(self._phrases)
+        ))
+
+        # (features x categories) contribution matrix
+        self.contributions = np.zeros((len(self.feature_names), len(RISK_CATEGORIES)))
+        for i, (_, impacts) in enumerate(self.weights.features.values()):
+            for category, value in impacts.items():
+                self.contributions[i, RISK_CATEGORIES.index(category)] = value
+
+        self.baseline = np.array([self.weights.baseline.get(c, 5.0) for c in RISK_CATEGORIES])
+        category_weights = np.array([self.weights.category_weights.get(c, 0.0) for c in RISK_CATEGORIES])
+        self.category_weights = category_weights / category_weights.sum()
+        self._financial_index = RISK_CATEGORIES.index("financial_risk")
+
+    def extract_features(self, treatments: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, List[str]]]]:
+        """
+        Extract feature hit counts for each treatment.
+
+        Returns:
+            (hit count matrix, price adjustment per treatment, matched phrases per treatment)
+        """
+        counts = np.zeros((len(treatments), len(self.feature_names)))
+        price_adjustment = np.zeros(len(treatments))
+        evidence = []
+
+        for row, treatment in enumerate(treatments):
+            text = treatment_text(treatment)
+            matched: Dict[str, List[str]] = {}
+            for match in self._pattern.finditer(text):
+                hit = self._phrases[int(match.lastgroup[1:])]
+                col = self._phrase_feature[hit]
+                counts[row, col] += 1
+                phrases = matched.setdefault(self.feature_names[col], [])
+                if hit not in phrases:
+                    phrases.append(hit)
+
+            price = extract_max_price(text)
+            if price is not None:
+                for floor, adjustment in self.weights.price_bands:
+                    if price >= floor:
+                        price_adjustment[row] = adjustment
+                        matched["max_price"] = [f"${price:,.0f}"]
+                        break
+            evidence.append(matched)
+
+        return np.minimum(counts, MAX_HITS_PER_FEATURE), price_adjustment, evidence
+
+    def score_batch(self, treatments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Score many treatments at once.
+
+        Returns:
+            Dict with a (treatments x categories) "category_scores" array, an
+            "overall_scores" array and per-treatment "evidence"
+        """
+        counts, price_adjustment, evidence = self.extract_features(treatments)
+        scores = self.baseline + counts @ self.contributions
+        scores[:, self._financial_index] += price_adjustment
+        scores = np.clip(scores, 0.0, 10.0)
+        overall = scores @ self.category_weights
+        return {"category_scores": scores, "overall_scores": overall, "evidence": evidence}
+
+    def assess(self, treatments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score treatments and return per-treatment risk assessment dicts"""
+        batch = self.score_batch(treatments)
+        assessments = []
+        for i, treatment in enumerate(treatments):
+            overall = round(float(batch["overall_scores"][i]), 1)
+            parameters = {
+                category: round(float(score), 1)
+                for category, score in zip(RISK_CATEGORIES, batch["category_scores"][i])
+            }
+            assessments.append({
+                "treatment_id": treatment.get("treatment_id", "Unknown"),
+                "overall_risk_score": overall,
+                "risk_category": risk_category_for(overall),
+                "risk_parameters": parameters,
+                "risk_weights": {c: round(float(w), 3) for c, w in zip(RISK_CATEGORIES, self.category_weights)},
+                "risk_features": batch["evidence"][i],
+                "recommendation": recommendation_for(overall),
+                "scoring_method": "deterministic"
+            })
+        return assessments
+
+    def assess_one(self, treatment: Dict[str, Any]) -> Dict[str, Any]:
+        return self.assess([treatment])[0]
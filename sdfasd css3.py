@@ -25,6 +25,10 @@ import docx
 from bs4 import BeautifulSoup
 import mammoth
 import pandas as pd
+# Whole-table WordprocessingML builder for the report tables
+from markdown_docx import add_table
+# Stage outputs registered once by content hash and referenced, not copied
+from stage_outputs import StageOutputs, OutputRef
 
 # Configure logging
 logging.getLogger("strands").setLevel(logging.DEBUG)
@@ -39,15 +43,16 @@ class TreatmentData:
     treatment_id: str
     source: str
     raw_content: str
-    structured_content: str = ""
-    risk_assessment: str = ""
-    revenue_analysis: str = ""
+    # Stage outputs are referenced by ID in HealthcareAgentSystem.stage_outputs, not copied as JSON text
+    structured_content: Optional[OutputRef] = None
+    risk_assessment: Optional[OutputRef] = None
+    revenue_analysis: Optional[OutputRef] = None
 
 @dataclass
 class ProcessingResults:
     """Container for all processing results"""
     treatments: List[TreatmentData]
-    final_report: str = ""
+    final_report: Optional[OutputRef] = None
     approval_status: str = "pending"
 
 class HealthcareAgentSystem:
@@ -79,6 +84,8 @@ class HealthcareAgentSystem:
         
         # Initialize data storage
         self.processing_results = ProcessingResults(treatments=[])
+        # Stage outputs by content hash; serialized only when printed or written
+        self.stage_outputs = StageOutputs()
         
         # Setup output directory
         self.output_dir = Path("./hackathon_output")
@@ -376,48 +383,30 @@ class HealthcareAgentSystem:
                     risks = treatment.get("risks", [])
                     if risks:
                         doc.add_heading("Risk Assessment", level=2)
-                        table = doc.add_table(rows=1, cols=3)
-                        hdr_cells = table.rows[0].cells
-                        hdr_cells[0].text = 'Metric'
-                        hdr_cells[1].text = 'Value'
-                        hdr_cells[2].text = 'Explanation/Logic'
-                        for risk in risks:
-                            row_cells = table.add_row().cells
-                            row_cells[0].text = str(risk.get("metric", ""))
-                            row_cells[1].text = str(risk.get("value", ""))
-                            row_cells[2].text = str(risk.get("explanation", ""))
+                        add_table(doc, [('Metric', 'Value', 'Explanation/Logic')] + [
+                            (risk.get("metric", ""), risk.get("value", ""), risk.get("explanation", ""))
+                            for risk in risks
+                        ])
                         doc.add_paragraph("")
                     # Customers Table
                     customers = treatment.get("customers", {})
                     if customers:
                         doc.add_heading("Customer Impact & Segmentation", level=2)
-                        table = doc.add_table(rows=1, cols=4)
-                        hdr_cells = table.rows[0].cells
-                        hdr_cells[0].text = 'Existing Customers'
-                        hdr_cells[1].text = 'New Customers'
-                        hdr_cells[2].text = 'Segmentation'
-                        hdr_cells[3].text = 'Logic/Explanation'
-                        row_cells = table.add_row().cells
-                        row_cells[0].text = str(customers.get("existing", ""))
-                        row_cells[1].text = str(customers.get("new", ""))
-                        row_cells[2].text = str(customers.get("segmentation", ""))
-                        row_cells[3].text = str(customers.get("logic", ""))
+                        add_table(doc, [
+                            ('Existing Customers', 'New Customers', 'Segmentation', 'Logic/Explanation'),
+                            (customers.get("existing", ""), customers.get("new", ""),
+                             customers.get("segmentation", ""), customers.get("logic", "")),
+                        ])
                         doc.add_paragraph("")
                     # Revenue Table
                     revenue = treatment.get("revenue", {})
                     if revenue:
                         doc.add_heading("Revenue & Profitability", level=2)
-                        table = doc.add_table(rows=1, cols=4)
-                        hdr_cells = table.rows[0].cells
-                        hdr_cells[0].text = 'Cost'
-                        hdr_cells[1].text = 'Revenue'
-                        hdr_cells[2].text = 'Profit'
-                        hdr_cells[3].text = 'Logic/Explanation'
-                        row_cells = table.add_row().cells
-                        row_cells[0].text = str(revenue.get("cost", ""))
-                        row_cells[1].text = str(revenue.get("revenue", ""))
-                        row_cells[2].text = str(revenue.get("profit", ""))
-                        row_cells[3].text = str(revenue.get("logic", ""))
+                        add_table(doc, [
+                            ('Cost', 'Revenue', 'Profit', 'Logic/Explanation'),
+                            (revenue.get("cost", ""), revenue.get("revenue", ""),
+                             revenue.get("profit", ""), revenue.get("logic", "")),
+                        ])
                         doc.add_paragraph("")
                     doc.add_page_break()
                 doc.save(output_path)
@@ -501,7 +490,8 @@ class HealthcareAgentSystem:
         try:
             print_debug("Reading files...")
             file_reader_tool = self._create_file_reader_tool()
-            file_contents = [file_reader_tool(file_path=f) for f in input_files if "error" not in file_reader_tool(file_path=f)]
+            file_contents = [content for content in (file_reader_tool(file_path=f) for f in input_files)
+                             if "error" not in content]
             print_debug(f"Files read: {len(file_contents)}")
             print_debug("Extracting/grouping treatments with LLM...")
             research_tool = self._create_research_agent_tool()
@@ -532,17 +522,21 @@ class HealthcareAgentSystem:
                 treatment_id=treatment_id,
                 source="input_files",
                 raw_content="[LLM processed]",
-                structured_content=json.dumps(structured_treatments, indent=2),
-                risk_assessment=json.dumps(risks, indent=2),
-                revenue_analysis=json.dumps(revenues, indent=2)
+                structured_content=self.stage_outputs.put("structure", structured_treatments, output_id=f"{treatment_id}:structure"),
+                risk_assessment=self.stage_outputs.put("risk", risks, output_id=f"{treatment_id}:risk"),
+                revenue_analysis=self.stage_outputs.put("revenue", revenues, output_id=f"{treatment_id}:revenue")
             ))
-            self.processing_results.final_report = json.dumps(final_report)
+            report_ref = self.stage_outputs.put("report", final_report, output_id=f"{treatment_id}:report")
+            self.processing_results.final_report = report_ref
             print_debug("Process complete.")
-            print(json.dumps(final_report))
+            # Serialized once, at the output boundary: printed and returned as the JSON string callers expect
+            final_report_json = json.dumps(final_report)
+            print(final_report_json)
             return {
                 "status": "success",
                 "treatment_id": treatment_id,
-                "final_report": json.dumps(final_report),
+                "final_report": final_report_json,
+                "final_report_id": report_ref.output_id,
                 "word_output": output_path
             }
         except Exception as e:
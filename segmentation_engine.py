@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Customer Segmentation Engine - segment sizing over demographic tables
+Loads a demographic/customer table (CSV or Parquet) and computes segment sizes,
+overlaps and expected uptake per treatment category with vectorized group-bys,
+caching results per category so repeated runs are instant
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+
+DIMENSIONS = ["region", "age_group", "income_band", "insurance_status"]
+REQUIRED_COLUMNS = DIMENSIONS + ["population"]
+MEASURES = ["population", "existing_customers", "new_prospects",
+            "expected_uptake", "expected_existing_uptake", "expected_new_uptake"]
+CACHE_VERSION = 1
+
+# Segment name -> {column: allowed values}; a row belongs to a segment when every rule matches
+SEGMENT_RULES = {
+    "premium_seekers": {"income_band": ["100-150k", "150k+"]},
+    "cost_conscious": {"income_band": ["<50k", "50-100k"]},
+    "health_optimizers": {"age_group": ["18-30", "31-45"], "insurance_status": ["insured"]},
+    "traditional_seekers": {"age_group": ["46-60", "60+"]}
+}
+
+# Base annual uptake rate and age multipliers per treatment category
+CATEGORY_PROFILES = {
+    "General": {"base_uptake": 0.02, "age": {"18-30": 0.8, "31-45": 1.0, "46-60": 1.1, "60+": 1.2}},
+    "Dental": {"base_uptake": 0.05, "age": {"18-30": 0.9, "31-45": 1.0, "46-60": 1.2, "60+": 1.3}},
+    "Cosmetic": {"base_uptake": 0.03, "age": {"18-30": 1.3, "31-45": 1.3, "46-60": 0.9, "60+": 0.5}},
+    "Vision": {"base_uptake": 0.03, "age": {"18-30": 1.1, "31-45": 1.2, "46-60": 1.0, "60+": 0.9}},
+    "Hearing": {"base_uptake": 0.015, "age": {"18-30": 0.2, "31-45": 0.5, "46-60": 1.2, "60+": 2.2}},
+    "Veterinary": {"base_uptake": 0.04, "age": {"18-30": 1.2, "31-45": 1.2, "46-60": 0.9, "60+": 0.7}},
+    "Cardiovascular": {"base_uptake": 0.01, "age": {"18-30": 0.2, "31-45": 0.6, "46-60": 1.4, "60+": 2.0}},
+    "Orthopedic": {"base_uptake": 0.015, "age": {"18-30": 0.7, "31-45": 0.9, "46-60": 1.3, "60+": 1.5}},
+    "Neurological": {"base_uptake": 0.008, "age": {"18-30": 0.6, "31-45": 0.8, "46-60": 1.2, "60+": 1.6}},
+    "Oncological": {"base_uptake": 0.006, "age": {"18-30": 0.3, "31-45": 0.7, "46-60": 1.4, "60+": 1.8}},
+    "Endocrine": {"base_uptake": 0.012, "age": {"18-30": 0.6, "31-45": 1.0, "46-60": 1.3, "60+": 1.3}},
+    "Respiratory": {"base_uptake": 0.01, "age": {"18-30": 0.8, "31-45": 0.9, "46-60": 1.1, "60+": 1.4}}
+}
+# Words that select each specific profile; anything else falls back to General
+CATEGORY_TERMS = {
+    "Dental": ("dental", "dentistry", "dentist", "orthodontic", "orthodontics"),
+    "Cosmetic": ("cosmetic", "aesthetic", "aesthetics", "plastic"),
+    "Vision": ("vision", "eye", "ophthalmic", "ophthalmology", "optometry", "lasik"),
+    "Hearing": ("hearing", "audiology", "audiologic"),
+    "Veterinary": ("veterinary", "vet", "pet", "animal"),
+    "Cardiovascular": ("cardiovascular", "cardiac", "cardiology", "heart"),
+    "Orthopedic": ("orthopedic", "orthopaedic", "orthopedics", "musculoskeletal"),
+    "Neurological": ("neurological", "neurology", "neuro"),
+    "Oncological": ("oncological", "oncology", "cancer"),
+    "Endocrine": ("endocrine", "endocrinology", "diabetes", "hormone"),
+    "Respiratory": ("respiratory", "pulmonary", "pulmonology")
+}
+INCOME_MULTIPLIERS = {"<50k": 0.7, "50-100k": 1.0, "100-150k": 1.2, "150k+": 1.3}
+INSURANCE_MULTIPLIERS = {"insured": 1.0, "underinsured": 1.3, "uninsured": 0.8}
+# Existing customers already use financing, so they take up new coverage more readily
+EXISTING_CUSTOMER_LIFT = 2.0
+
+# Illustrative fallback table used when no demographic file is configured
+DEFAULT_TOTAL_POPULATION = 1000000
+DEFAULT_SHARES = {
+    "region": {"Northeast": 0.17, "Midwest": 0.21, "South": 0.38, "West": 0.24},
+    "age_group": {"18-30": 0.22, "31-45": 0.27, "46-60": 0.26, "60+": 0.25},
+    "income_band": {"<50k": 0.36, "50-100k": 0.33, "100-150k": 0.17, "150k+": 0.14},
+    "insurance_status": {"insured": 0.72, "underinsured": 0.19, "uninsured": 0.09}
+}
+DEFAULT_CUSTOMER_RATE = {"<50k": 0.04, "50-100k": 0.07, "100-150k": 0.06, "150k+": 0.04}
+
+
+def default_demographic_table() -> pd.DataFrame:
+    """Build the illustrative table from independent marginal shares"""
+    frame = pd.DataFrame({"key": [0]})
+    for dimension in DIMENSIONS:
+        shares = pd.DataFrame({"key": 0, dimension: list(DEFAULT_SHARES[dimension]),
+                               f"{dimension}_share": list(DEFAULT_SHARES[dimension].values())})
+        frame = frame.merge(shares, on="key")
+    share = frame[[f"{d}_share" for d in DIMENSIONS]].prod(axis=1)
+    frame["population"] = (share * DEFAULT_TOTAL_POPULATION).round()
+    frame["existing_customers"] = (frame["population"] * frame["income_band"].map(DEFAULT_CUSTOMER_RATE)).round()
+    return frame[DIMENSIONS + ["population", "existing_customers"]]
+
+
+def load_demographic_table(path: str) -> pd.DataFrame:
+    """
+    Load a demographic/customer table.
+
+    Args:
+        path: .csv or .parquet file with region, age_group, income_band,
+            insurance_status, population and optionally existing_customers
+
+    Returns:
+        Normalized DataFrame
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        table = pd.read_csv(path)
+    elif suffix in (".parquet", ".pq"):
+        table = pd.read_parquet(path)
+    else:
+        raise ValueError(f"Unsupported demographic table format: {suffix}")
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in table.columns]
+    if missing:
+        raise ValueError(f"Demographic table is missing columns: {', '.join(missing)}")
+    if "existing_customers" not in table.columns:
+        table["existing_customers"] = 0
+    for column in DIMENSIONS:
+        table[column] = table[column].astype(str)
+    return table
+
+
+def normalize_category(category: str) -> str:
+    """Map a free-text treatment category to a known profile (whole words, specific profiles before General)"""
+    words = set(re.findall(r"[a-z]+", (category or "").lower()))
+    for name, terms in CATEGORY_TERMS.items():
+        if words.intersection(terms):
+            return name
+    return "General"
+
+
+class SegmentationEngine:
+    """Vectorized segment sizing with a per-category result cache"""
+
+    def __init__(self, table_path: Optional[str] = None, cache_path: Optional[str] = None):
+        self.table_path = table_path
+        self.table = load_demographic_table(table_path) if table_path else default_demographic_table()
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.fingerprint = self._fingerprint()
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._membership = self._segment_membership()
+
+        if self.cache_path and self.cache_path.exists():
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    payload = json.load(f)
+                if payload.get("fingerprint") == self.fingerprint:
+                    self._cache = payload.get("categories", {})
+            except (OSError, json.JSONDecodeError):
+                self._cache = {}
+
+    def _fingerprint(self) -> str:
+        hasher = hashlib.sha256(f"v{CACHE_VERSION}".encode("utf-8"))
+        hasher.update(pd.util.hash_pandas_object(self.table, index=False).values.tobytes())
+        hasher.update(json.dumps([SEGMENT_RULES, CATEGORY_PROFILES, INCOME_MULTIPLIERS,
+                                  INSURANCE_MULTIPLIERS, EXISTING_CUSTOMER_LIFT], sort_keys=True).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _segment_membership(self) -> pd.DataFrame:
+        """Boolean (rows x segments) membership matrix; segments may overlap"""
+        membership = {}
+        for segment, rules in SEGMENT_RULES.items():
+            mask = pd.Series(True, index=self.table.index)
+            for column, values in rules.items():
+                mask &= self.table[column].isin(values)
+            membership[segment] = mask
+        return pd.DataFrame(membership)
+
+    def segment_category(self, category: str) -> Dict[str, Any]:
+        """
+        Size segments and expected uptake for a treatment category.
+
+        Args:
+            category: Treatment category (free text, mapped to a known profile)
+
+        Returns:
+            Segment sizes, pairwise overlaps and demographic breakdowns
+        """
+        profile_name = normalize_category(category)
+        if profile_name in self._cache:
+            return self._cache[profile_name]
+
+        profile = CATEGORY_PROFILES[profile_name]
+        table = self.table
+        rate = (profile["base_uptake"]
+                * table["age_group"].map(profile["age"]).fillna(1.0)
+                * table["income_band"].map(INCOME_MULTIPLIERS).fillna(1.0)
+                * table["insurance_status"].map(INSURANCE_MULTIPLIERS).fillna(1.0)).clip(upper=1.0)
+
+        existing = table["existing_customers"].clip(upper=table["population"])
+        measures = pd.DataFrame({
+            "population": table["population"],
+            "existing_customers": existing,
+            "new_prospects": table["population"] - existing,
+            "expected_existing_uptake": (existing * (rate * EXISTING_CUSTOMER_LIFT).clip(upper=1.0)),
+            "expected_new_uptake": (table["population"] - existing) * rate
+        })
+        measures["expected_uptake"] = measures["expected_existing_uptake"] + measures["expected_new_uptake"]
+        measures = measures[MEASURES]
+
+        member_weights = self._membership.astype(float)
+        # One matrix product sums every measure for every segment
+        segment_totals = member_weights.T.dot(measures)
+        overlap = member_weights.mul(table["population"], axis=0).T.dot(member_weights)
+        total_population = float(measures["population"].sum())
+
+        segments = {}
+        for segment, row in segment_totals.iterrows():
+            segments[segment] = {measure: int(round(row[measure])) for measure in MEASURES}
+            segments[segment]["share_of_population"] = round(row["population"] / total_population, 4) if total_population else 0.0
+            segments[segment]["uptake_rate"] = round(row["expected_uptake"] / row["population"], 4) if row["population"] else 0.0
+
+        result = {
+            "category": profile_name,
+            "total_population": int(total_population),
+            "total_existing_customers": int(measures["existing_customers"].sum()),
+            "total_expected_uptake": int(round(measures["expected_uptake"].sum())),
+            "expected_existing_uptake": int(round(measures["expected_existing_uptake"].sum())),
+            "expected_new_uptake": int(round(measures["expected_new_uptake"].sum())),
+            "segments": segments,
+            "overlap": {
+                a: {b: int(round(overlap.loc[a, b])) for b in overlap.columns if b != a}
+                for a in overlap.index
+            },
+            "by_age_group": self._breakdown(measures, "age_group"),
+            "by_income_band": self._breakdown(measures, "income_band"),
+            "by_region": self._breakdown(measures, "region")
+        }
+
+        self._cache[profile_name] = result
+        self._save_cache()
+        return result
+
+    def _breakdown(self, measures: pd.DataFrame, dimension: str) -> Dict[str, Dict[str, int]]:
+        grouped = measures[["population", "expected_uptake"]].groupby(self.table[dimension], sort=True).sum()
+        return {
+            str(key): {"population": int(round(row["population"])), "expected_uptake": int(round(row["expected_uptake"]))}
+            for key, row in grouped.iterrows()
+        }
+
+    def segment_treatments(self, treatments: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Size every distinct category once and return results keyed by category profile"""
+        results = {}
+        for treatment in treatments:
+            profile_name = normalize_category(treatment.get("category", ""))
+            if profile_name not in results:
+                results[profile_name] = self.segment_category(profile_name)
+        return results
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(self.cache_path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "categories": self._cache}, f)
+        os.replace(tmp_path, self.cache_path)
+
+
+def format_segmentation(result: Dict[str, Any]) -> str:
+    """Short text rendering of segment sizing for prompts"""
+    lines = [
+        f"Category profile: {result['category']}",
+        f"Addressable population: {result['total_population']:,} "
+        f"({result['total_existing_customers']:,} existing customers)",
+        f"Expected annual uptake: {result['total_expected_uptake']:,} "
+        f"({result['expected_existing_uptake']:,} existing, {result['expected_new_uptake']:,} new)"
+    ]
+    for segment, data in result["segments"].items():
+        lines.append(
+            f"{segment}: {data['population']:,} people ({data['share_of_population']:.0%}), "
+            f"expected uptake {data['expected_uptake']:,} ({data['uptake_rate']:.1%})"
+        )
+    for age_group, data in result["by_age_group"].items():
+        lines.append(f"Age {age_group}: {data['population']:,} people, expected uptake {data['expected_uptake']:,}")
+    return "\n".join(lines)
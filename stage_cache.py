@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Stage Cache - build-system style input fingerprints for pipeline stages
+Each stage output is stored under a hash of its inputs and its prompt/code
+template, so a re-run only recomputes the stages whose inputs changed
+"""
+
+import hashlib
+import json
+import sqlite3
+import types
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_outputs (
+    stage TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    inputs_json TEXT,
+    output_json TEXT NOT NULL,
+    output_hash TEXT NOT NULL,
+    created_at TEXT,
+    PRIMARY KEY (stage, input_hash)
+);
+"""
+
+
+def hash_value(value: Any) -> str:
+    """Stable hash of any JSON-serializable value (keys sorted)"""
+    payload = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def code_fingerprint(*functions: Callable) -> str:
+    """
+    Hash the bytecode and constants of functions, including nested functions.
+
+    Prompt f-string literals are code constants, so editing a prompt (or the
+    logic around it) changes the fingerprint of the stage that uses it.
+    """
+    hasher = hashlib.sha256()
+
+    def visit(code: types.CodeType):
+        hasher.update(code.co_code)
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                visit(const)
+            else:
+                hasher.update(repr(const).encode("utf-8"))
+        hasher.update(repr(code.co_names).encode("utf-8"))
+
+    for function in functions:
+        function = getattr(function, "__func__", function)
+        visit(function.__code__)
+    return hasher.hexdigest()
+
+
+class StageCache:
+    """Persistent store of stage outputs keyed by (stage, input fingerprint)"""
+
+    def __init__(self, db_path: str = "./hackathon_output/stage_cache.db",
+                 on_record: Optional[Callable[[str, bool], None]] = None):
+        """
+        Args:
+            db_path: SQLite database path
+            on_record: Called with (stage, hit) for every lookup, e.g. to attribute hits to template versions
+        """
+        self.db_path = db_path
+        self.on_record = on_record
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def close(self):
+        self.conn.close()
+
+    def input_hash(self, stage: str, inputs: Dict[str, Any], template: str = "") -> str:
+        """Fingerprint of everything a stage output depends on"""
+        return hash_value({"stage": stage, "template": template, "inputs": inputs})
+
+    def get(self, stage: str, input_hash: str) -> Optional[Any]:
+        row = self.conn.execute(
+            "SELECT output_json FROM stage_outputs WHERE stage = ? AND input_hash = ?", (stage, input_hash)
+        ).fetchone()
+        return json.loads(row["output_json"]) if row else None
+
+    def put(self, stage: str, input_hash: str, inputs: Dict[str, Any], output: Any) -> str:
+        """Record a stage output and return its hash (used as input to downstream stages)"""
+        output_json = json.dumps(output, default=str)
+        output_hash = hash_value(output)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stage_outputs "
+                "(stage, input_hash, inputs_json, output_json, output_hash, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (stage, input_hash, json.dumps(inputs, default=str), output_json, output_hash,
+                 datetime.now().isoformat())
+            )
+        return output_hash
+
+    def record(self, stage: str, hit: bool):
+        counters = self.stats.setdefault(stage, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+        if self.on_record:
+            self.on_record(stage, hit)
+
+    def run(self, stage: str, inputs: Dict[str, Any], template: str,
+            compute: Callable[[], Any], cacheable: Callable[[Any], bool] = bool) -> Tuple[Any, bool]:
+        """
+        Return the cached output for these inputs, or compute and store it.
+
+        Args:
+            stage: Stage name
+            inputs: Everything the stage reads (hashes of upstream outputs, source hashes, settings)
+            template: Prompt/code template fingerprint of the stage
+            compute: Function producing the output on a miss
+            cacheable: Predicate deciding whether a computed output may be stored
+
+        Returns:
+            (output, cache hit)
+        """
+        key = self.input_hash(stage, inputs, template)
+        cached = self.get(stage, key)
+        if cached is not None:
+            self.record(stage, True)
+            return cached, True
+
+        output = compute()
+        self.record(stage, False)
+        if cacheable(output):
+            self.put(stage, key, inputs, output)
+        return output, False
+
+    def reset_stats(self):
+        self.stats = {}
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Stage Outputs - typed, immutable report model over shared stage results
+Each stage output is registered once under its content hash; report sections
+hold references to those IDs instead of copies, and JSON is produced only when
+a report is written, printed or handed to an LLM
+"""
+
+import json
+from collections import ChainMap
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple, Iterator, Mapping, List
+
+from stage_cache import hash_value
+
+# Stage name of a treatment's extracted input fields; the other refs are its analysis outputs
+INPUT_STAGE = "input"
+
+
+@dataclass(frozen=True)
+class OutputRef:
+    """ID of one stage output in a StageOutputs store"""
+    stage: str
+    output_id: str
+
+    def __str__(self) -> str:
+        return f"{self.stage}:{self.output_id[:12]}"
+
+
+def read_only(value: Any) -> Any:
+    """Read-only view of a stored output without copying it (dicts as mappingproxy, lists as tuples)"""
+    if isinstance(value, dict):
+        return MappingProxyType(value)
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def json_default(value: Any) -> Any:
+    """json.dumps default that serializes read-only views and refs"""
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    if isinstance(value, OutputRef):
+        return value.output_id
+    return str(value)
+
+
+class StageOutputs:
+    """
+    In-memory arena of stage outputs keyed by ID.
+
+    Values are stored by reference, not copied: once put, an output belongs to the
+    store and must not be mutated. The default ID is stage_cache.hash_value(output),
+    so it doubles as the upstream fingerprint of dependent stages and identical
+    outputs are stored once.
+    """
+
+    def __init__(self):
+        self._outputs: Dict[str, Any] = {}
+
+    def put(self, stage: str, value: Any, output_id: Optional[str] = None) -> OutputRef:
+        """
+        Register an output under its content hash, or under output_id when given (a hash
+        that is already known, or a run-local name when no fingerprint is needed).
+        """
+        output_id = output_id or hash_value(value)
+        self._outputs[output_id] = value
+        return OutputRef(stage, output_id)
+
+    def get(self, ref: OutputRef) -> Any:
+        return read_only(self._outputs[ref.output_id])
+
+    def resolve(self, ref: OutputRef, key: Optional[str] = None, default: Any = None) -> Any:
+        """Output of a ref, or one top-level field of it"""
+        value = self._outputs.get(ref.output_id, default)
+        if key is not None:
+            value = value.get(key, default) if isinstance(value, dict) else default
+        return read_only(value)
+
+    def __contains__(self, ref: OutputRef) -> bool:
+        return ref.output_id in self._outputs
+
+    def __len__(self) -> int:
+        return len(self._outputs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """{output_id: output} for serialization; each shared output appears once"""
+        return dict(self._outputs)
+
+    def clear(self):
+        self._outputs.clear()
+
+
+@dataclass(frozen=True)
+class TreatmentReport:
+    """One treatment's report entry: its identity plus references to its stage outputs"""
+    treatment_id: str
+    treatment_name: str
+    outputs: Tuple[OutputRef, ...] = ()
+
+    @classmethod
+    def of(cls, treatment_id: str, treatment_name: str, refs: Mapping[str, OutputRef]) -> "TreatmentReport":
+        return cls(str(treatment_id), str(treatment_name), tuple(refs.values()))
+
+    def ref(self, stage: str) -> Optional[OutputRef]:
+        for ref in self.outputs:
+            if ref.stage == stage:
+                return ref
+        return None
+
+
+@dataclass(frozen=True)
+class ReportDocument:
+    """Immutable report over a StageOutputs store; sections are resolved on access, never copied"""
+    title: str
+    treatments: Tuple[TreatmentReport, ...]
+    store: StageOutputs = field(compare=False, repr=False)
+    sections: Tuple[str, ...] = ()
+    generated_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def section(self, treatment: TreatmentReport, stage: str, key: Optional[str] = None, default: Any = None) -> Any:
+        ref = treatment.ref(stage)
+        return default if ref is None else self.store.resolve(ref, key, default)
+
+    def iter_outputs(self, stage: str) -> Iterator[Tuple[TreatmentReport, Any]]:
+        for treatment in self.treatments:
+            ref = treatment.ref(stage)
+            if ref is not None:
+                yield treatment, self.store.get(ref)
+
+    def record(self, treatment: TreatmentReport) -> Mapping[str, Any]:
+        """Read-only treatment view: its input fields plus {stage: output}, without copying either"""
+        ref = treatment.ref(INPUT_STAGE)
+        inputs = self.store.get(ref) if ref is not None else {}
+        outputs = {ref.stage: self.store.get(ref) for ref in treatment.outputs if ref.stage != INPUT_STAGE}
+        return MappingProxyType(ChainMap(outputs, inputs))
+
+    def records(self) -> List[Mapping[str, Any]]:
+        return [self.record(treatment) for treatment in self.treatments]
+
+    def fingerprint(self) -> str:
+        """Content hash of the report, computed from output IDs without re-encoding the outputs"""
+        return hash_value({
+            "title": self.title,
+            "sections": list(self.sections),
+            "treatments": [
+                [t.treatment_id, t.treatment_name, [[ref.stage, ref.output_id] for ref in t.outputs]]
+                for t in self.treatments
+            ]
+        })
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form: treatments reference outputs by ID, each output listed once"""
+        referenced = {ref.output_id for t in self.treatments for ref in t.outputs}
+        return {
+            "title": self.title,
+            "generated_at": self.generated_at,
+            "sections": list(self.sections),
+            "treatments": [
+                {
+                    "treatment_id": t.treatment_id,
+                    "treatment_name": t.treatment_name,
+                    "outputs": {ref.stage: ref.output_id for ref in t.outputs}
+                }
+                for t in self.treatments
+            ],
+            "outputs": {
+                output_id: value for output_id, value in self.store.to_dict().items() if output_id in referenced
+            }
+        }
+
+    def to_json(self, indent: Optional[int] = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent, default=json_default)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], store: Optional[StageOutputs] = None) -> "ReportDocument":
+        store = store if store is not None else StageOutputs()
+        for output_id, value in data.get("outputs", {}).items():
+            store.put("", value, output_id=output_id)
+        treatments = tuple(
+            TreatmentReport(
+                str(t.get("treatment_id", "")), str(t.get("treatment_name", "")),
+                tuple(OutputRef(stage, output_id) for stage, output_id in t.get("outputs", {}).items())
+            )
+            for t in data.get("treatments", [])
+        )
+        return cls(data.get("title", ""), treatments, store, tuple(data.get("sections", ())),
+                   data.get("generated_at", ""))
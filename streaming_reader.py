@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Streaming Reader - memory-mapped reading of large TXT/HTML inputs
+Incremental UTF-8 decoding, streaming HTML text extraction, whitespace cleaning and
+word-window chunking, so peak memory tracks the chunk size instead of the file size
+"""
+
+import codecs
+import hashlib
+import mmap
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import List, Iterator
+
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+BLANK_LINES_PATTERN = re.compile(r'\n\s*\n')
+SPACES_PATTERN = re.compile(r' +')
+
+
+def _release(mapped: mmap.mmap, offset: int, length: int):
+    """Drop already-read pages of a window from the resident set (they stay in the page cache)"""
+    if hasattr(mmap, 'MADV_DONTNEED') and offset % mmap.PAGESIZE == 0:
+        mapped.madvise(mmap.MADV_DONTNEED, offset, min(length, len(mapped) - offset))
+
+
+def iter_decoded_chunks(file_path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[str]:
+    """
+    Yield decoded text from a memory-mapped file, one window at a time.
+
+    Multi-byte UTF-8 sequences split across windows are carried over by the
+    incremental decoder, so no character is corrupted at a boundary.
+    """
+    path = Path(file_path)
+    if path.stat().st_size == 0:
+        return
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for offset in range(0, len(mapped), chunk_bytes):
+            text = decoder.decode(mapped[offset:offset + chunk_bytes])
+            _release(mapped, offset, chunk_bytes)
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+def file_digest(file_path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> str:
+    """SHA-256 of a file's bytes, read through the same memory-mapped windows"""
+    hasher = hashlib.sha256()
+    path = Path(file_path)
+    if path.stat().st_size:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, len(mapped), chunk_bytes):
+                hasher.update(mapped[offset:offset + chunk_bytes])
+                _release(mapped, offset, chunk_bytes)
+    return hasher.hexdigest()
+
+
+class StreamingHTMLText(HTMLParser):
+    """Incremental HTML-to-text extractor that drops script and style contents"""
+
+    SKIPPED_TAGS = ('script', 'style')
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip_depth = 0
+        self._pieces: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._pieces.append(data)
+
+    def feed_text(self, html: str) -> str:
+        """Feed a piece of HTML and return the text extracted so far"""
+        self.feed(html)
+        return self._drain()
+
+    def finish(self) -> str:
+        self.close()
+        return self._drain()
+
+    def _drain(self) -> str:
+        text = "".join(self._pieces)
+        self._pieces = []
+        return text
+
+
+class WhitespaceCleaner:
+    """Streaming version of the blank-line and repeated-space cleanup applied to HTML text"""
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        # Hold back the part of a trailing whitespace run that may still merge with the
+        # next piece, reduced to what _clean needs so a long run is never rescanned
+        text = self._pending + text
+        body_end = len(text.rstrip())
+        tail = text[body_end:]
+        first_break = tail.find('\n')
+        if first_break < 0:
+            spaces = len(tail) - len(tail.rstrip(' '))
+            self._pending = " " if spaces else ""
+            return self._clean(text[:len(text) - spaces])
+        last_break = tail.rfind('\n')
+        breaks = "\n\n" if last_break != first_break else "\n"
+        self._pending = breaks + SPACES_PATTERN.sub(' ', tail[last_break + 1:])
+        return self._clean(text[:body_end + first_break])
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return self._clean(text)
+
+    def _clean(self, text: str) -> str:
+        text = BLANK_LINES_PATTERN.sub('\n\n', text)
+        return SPACES_PATTERN.sub(' ', text)
+
+
+class StreamingChunker:
+    """Turns a text stream into overlapping word-window chunks for the retrieval index"""
+
+    def __init__(self, chunk_words: int = 200, overlap: int = 40):
+        self.chunk_words = chunk_words
+        self.step = max(1, chunk_words - overlap)
+        self._words: List[str] = []
+        self._partial = ""
+        self.word_count = 0
+
+    def feed(self, text: str) -> List[str]:
+        text = self._partial + text
+        words = text.split()
+        # A word touching the end of the piece may continue in the next one
+        if words and not text[-1].isspace():
+            self._partial = words.pop()
+        else:
+            self._partial = ""
+        self.word_count += len(words)
+        self._words.extend(words)
+
+        chunks = []
+        while len(self._words) >= self.chunk_words:
+            chunks.append(" ".join(self._words[:self.chunk_words]))
+            del self._words[:self.step]
+        return chunks
+
+    def flush(self) -> List[str]:
+        if self._partial:
+            self._words.append(self._partial)
+            self.word_count += 1
+            self._partial = ""
+        chunks = [" ".join(self._words)] if self._words else []
+        self._words = []
+        return chunks
+
+
+def iter_clean_text(file_path: str, file_extension: str,
+                    chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[str]:
+    """
+    Yield cleaned text pieces from a .txt or .html file without loading it whole.
+
+    Args:
+        file_path: Path to the file
+        file_extension: '.txt', '.html' or '.htm'
+        chunk_bytes: Size of each memory-mapped window
+
+    Returns:
+        Iterator of text pieces (HTML is stripped of tags, scripts and styles)
+    """
+    if file_extension == '.txt':
+        yield from iter_decoded_chunks(file_path, chunk_bytes)
+        return
+
+    if file_extension not in ('.html', '.htm'):
+        raise ValueError(f"Streaming is not supported for {file_extension}")
+
+    extractor = StreamingHTMLText()
+    cleaner = WhitespaceCleaner()
+    for html in iter_decoded_chunks(file_path, chunk_bytes):
+        text = cleaner.feed(extractor.feed_text(html))
+        if text:
+            yield text
+    text = cleaner.feed(extractor.finish()) + cleaner.flush()
+    if text:
+        yield text
+
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Treatment Identity Index - stable treatment IDs across runs
+Maps each run's extracted treatments to persistent IDs by normalized name,
+fingerprints their source content and keeps per-stage results so unchanged
+treatments can skip description, risk and revenue analysis
+"""
+
+import difflib
+import hashlib
+import json
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, FrozenSet
+
+from knowledge_store import normalize_treatment_name
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS identities (
+    stable_id TEXT PRIMARY KEY,
+    normalized_name TEXT NOT NULL,
+    display_name TEXT,
+    category TEXT,
+    content_fingerprint TEXT,
+    first_seen TEXT,
+    last_seen TEXT,
+    run_count INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    stable_id TEXT NOT NULL REFERENCES identities(stable_id)
+);
+
+CREATE TABLE IF NOT EXISTS stage_results (
+    stable_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    content_fingerprint TEXT NOT NULL,
+    result_json TEXT NOT NULL,
+    updated_at TEXT,
+    PRIMARY KEY (stable_id, stage, content_fingerprint)
+);
+"""
+
+# Fuzzy name matches must be this close to count as the same treatment
+NAME_MATCH_CUTOFF = 0.9
+# Stage results kept per (stable_id, stage), newest first; older input versions are pruned
+STAGE_RESULT_VERSIONS = 5
+ROMAN_NUMERAL_PATTERN = re.compile(r"^(?=[ivxlcdm]+$)m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$")
+
+
+def distinguishing_tokens(normalized: str) -> FrozenSet[str]:
+    """Numbers and roman numerals in a name ("botox 20 units", "type ii facelift"); names differing in them never fuzzy-match"""
+    return frozenset(
+        token for token in normalized.split()
+        if any(c.isdigit() for c in token) or ROMAN_NUMERAL_PATTERN.match(token)
+    )
+
+
+def name_signature(name: str) -> str:
+    """Order-insensitive name key, so "Implants, Dental" matches "Dental Implants" """
+    return " ".join(sorted(normalize_treatment_name(name).split()))
+
+
+def content_fingerprint(treatment: Dict[str, Any], source_hashes: Dict[str, str]) -> str:
+    """
+    Fingerprint a treatment by the content of the sources it came from.
+
+    The name is deliberately left out: identity is resolved separately, so a
+    renamed extraction of unchanged sources still counts as unchanged.
+
+    Args:
+        treatment: Extracted treatment dict (treatment_name, source_files, raw_details)
+        source_hashes: File name -> sha256 of that file's content for the current run
+
+    Returns:
+        Hex digest that only changes when the treatment's source content changes
+    """
+    hasher = hashlib.sha256()
+    sources = treatment.get("source_files") or []
+    known = sorted(source_hashes[name] for name in sources if name in source_hashes)
+    if known:
+        for digest in known:
+            hasher.update(digest.encode("utf-8"))
+    else:
+        # No resolvable sources: fall back to the extracted details themselves
+        hasher.update(name_signature(treatment.get("treatment_name", "")).encode("utf-8"))
+        hasher.update(normalize_treatment_name(str(treatment.get("raw_details", ""))).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class TreatmentIdentityIndex:
+    """Persistent identity index and per-stage result cache keyed by stable treatment ID"""
+
+    def __init__(self, db_path: str = "./hackathon_output/treatment_identity.db"):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate_stage_results()
+        self.conn.executescript(SCHEMA)
+
+    def _migrate_stage_results(self):
+        """Older databases kept one stage result per (stable_id, stage); re-key them by fingerprint too"""
+        columns = self.conn.execute("PRAGMA table_info(stage_results)").fetchall()
+        if not columns or any(column["name"] == "content_fingerprint" and column["pk"] for column in columns):
+            return
+        with self.conn:
+            self.conn.execute("ALTER TABLE stage_results RENAME TO stage_results_old")
+            self.conn.executescript(SCHEMA)
+            self.conn.execute("INSERT OR IGNORE INTO stage_results SELECT stable_id, stage, content_fingerprint, "
+                              "result_json, updated_at FROM stage_results_old")
+            self.conn.execute("DROP TABLE stage_results_old")
+
+    def close(self):
+        self.conn.close()
+
+    def resolve(self, name: str, claimed: Optional[Set[str]] = None) -> Optional[str]:
+        """
+        Find the stable ID for a treatment name (alias, word-order signature, then fuzzy).
+
+        Fuzzy matching skips IDs in claimed (already taken by another treatment of the
+        current batch) and aliases whose numbers or roman numerals differ from the name's.
+        """
+        normalized = normalize_treatment_name(name)
+        if not normalized:
+            return None
+
+        for alias in (normalized, name_signature(name)):
+            row = self.conn.execute("SELECT stable_id FROM aliases WHERE alias = ?", (alias,)).fetchone()
+            if row:
+                return row["stable_id"]
+
+        claimed = claimed or set()
+        tokens = distinguishing_tokens(normalized)
+        candidates = {
+            row["alias"]: row["stable_id"] for row in self.conn.execute("SELECT alias, stable_id FROM aliases")
+            if row["stable_id"] not in claimed and distinguishing_tokens(row["alias"]) == tokens
+        }
+        matches = difflib.get_close_matches(normalized, list(candidates), n=1, cutoff=NAME_MATCH_CUTOFF)
+        return candidates[matches[0]] if matches else None
+
+    def register(self, treatment: Dict[str, Any], fingerprint: str,
+                 claimed: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """
+        Map an extracted treatment to its stable ID and record this sighting.
+
+        Args:
+            claimed: Stable IDs already assigned in the current batch (excluded from fuzzy matching)
+
+        Returns:
+            {"stable_id", "status"} where status is "new", "unchanged" or "changed"
+        """
+        name = treatment.get("treatment_name", "")
+        normalized = normalize_treatment_name(name)
+        now = datetime.now().isoformat()
+        stable_id = self.resolve(name, claimed)
+
+        with self.conn:
+            if stable_id is None:
+                stable_id = "TRT_" + hashlib.sha1(name_signature(name).encode("utf-8")).hexdigest()[:10].upper()
+                status = "new"
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO identities (stable_id, normalized_name, display_name, category, "
+                    "content_fingerprint, first_seen, last_seen, run_count) VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    (stable_id, normalized, name, treatment.get("category", ""), fingerprint, now, now)
+                )
+            else:
+                row = self.conn.execute(
+                    "SELECT content_fingerprint FROM identities WHERE stable_id = ?", (stable_id,)
+                ).fetchone()
+                status = "unchanged" if row and row["content_fingerprint"] == fingerprint else "changed"
+
+            self.conn.execute(
+                "UPDATE identities SET content_fingerprint = ?, last_seen = ?, display_name = ?, "
+                "run_count = run_count + 1 WHERE stable_id = ?",
+                (fingerprint, now, name, stable_id)
+            )
+            for alias in {normalized, name_signature(name)}:
+                if alias:
+                    self.conn.execute("INSERT OR IGNORE INTO aliases (alias, stable_id) VALUES (?, ?)",
+                                      (alias, stable_id))
+
+        return {"stable_id": stable_id, "status": status}
+
+    def register_batch(self, treatments: List[Dict[str, Any]], source_hashes: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Fingerprint and register a run's treatments, annotating each dict in place"""
+        identities = []
+        claimed: Set[str] = set()
+        for treatment in treatments:
+            fingerprint = content_fingerprint(treatment, source_hashes)
+            identity = self.register(treatment, fingerprint, claimed)
+            claimed.add(identity["stable_id"])
+            treatment["stable_id"] = identity["stable_id"]
+            treatment["content_fingerprint"] = fingerprint
+            treatment["identity_status"] = identity["status"]
+            identities.append(identity)
+        return identities
+
+    def get_stage_result(self, stable_id: str, stage: str, fingerprint: str) -> Optional[Any]:
+        """Previous result of a stage, only if it was computed from the same fingerprinted inputs"""
+        row = self.conn.execute(
+            "SELECT result_json FROM stage_results WHERE stable_id = ? AND stage = ? AND content_fingerprint = ?",
+            (stable_id, stage, fingerprint)
+        ).fetchone()
+        return json.loads(row["result_json"]) if row else None
+
+    def save_stage_result(self, stable_id: str, stage: str, fingerprint: str, result: Any):
+        """Store a stage result under its input fingerprint, keeping the newest STAGE_RESULT_VERSIONS per stage"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stage_results (stable_id, stage, content_fingerprint, result_json, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (stable_id, stage, fingerprint, json.dumps(result, default=str), datetime.now().isoformat())
+            )
+            self.conn.execute(
+                "DELETE FROM stage_results WHERE stable_id = ? AND stage = ? AND content_fingerprint NOT IN ("
+                "SELECT content_fingerprint FROM stage_results WHERE stable_id = ? AND stage = ? "
+                "ORDER BY updated_at DESC LIMIT ?)",
+                (stable_id, stage, stable_id, stage, STAGE_RESULT_VERSIONS)
+            )
+
+    def get(self, stable_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM identities WHERE stable_id = ?", (stable_id,)).fetchone()
+        return dict(row) if row else None